@@ -13,14 +13,11 @@ from locoei.utilis import PATH_PROCESSED
 
 if __name__ == "__main__":
     # Read controlled and uncontrolled emissions data.
-    path_uncntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-    )[0]
-    path_cntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+    path_uncntr_cntr_emisquant = glob.glob(
+        os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
     )[0]
+    uncntr_cntr_emisquant = pd.read_csv(path_uncntr_cntr_emisquant, index_col=0)
     # Output locations.
-    uncntr_emisquant = pd.read_csv(path_uncntr_emisquant, index_col=0)
     path_out_dir = os.path.join(PATH_PROCESSED, "report_summaries")
     path_statewide_19_sum = os.path.join(path_out_dir, "statewide_19_sum.xlsx")
     path_statewide_20_cap_ghg_cntr = os.path.join(
@@ -34,7 +31,7 @@ if __name__ == "__main__":
     )
     # Filter to 2019 and CO and get fuel usage.
     statewide_fuel_usage_19 = (
-        uncntr_emisquant.loc[
+        uncntr_cntr_emisquant.loc[
             lambda df: df.year.isin([2019]) & (df.pollutant.isin(["CO"]))
         ]
         .groupby(["year", "scc_description_level_4"])
@@ -45,7 +42,7 @@ if __name__ == "__main__":
     # Uncontrolled. Remove yardnames from the aggregation. Get emissions at
     # year, SCC, and county-level.
     uncntr_emisquant_no_yardnm = (
-        uncntr_emisquant.groupby(
+        uncntr_cntr_emisquant.groupby(
             [
                 "year",
                 "stcntyfips",
@@ -138,9 +135,8 @@ if __name__ == "__main__":
     )
     # Controlled. Remove yardnames from the aggregation. Get emissions at
     # year, SCC, and county-level.
-    cntr_emisquant = pd.read_csv(path_cntr_emisquant, index_col=0)
     cntr_emisquant_no_yardnm = (
-        cntr_emisquant.groupby(
+        uncntr_cntr_emisquant.groupby(
             [
                 "year",
                 "stcntyfips",
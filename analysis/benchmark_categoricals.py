@@ -0,0 +1,139 @@
+"""
+Benchmark the inventory stages with and without the categorical columns of
+locoei.schema. Each mode runs in a new process so that the peak resident set
+size (RSS) of one mode does not carry over to the other.
+Created by: Apoorb
+"""
+import time
+import multiprocessing
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
+from locoei.utilis import PATH_RAW, PATH_INTERIM, PATH_PROCESSED
+
+
+def get_peak_rss_mb():
+    """Peak RSS of the current process in MB. None where the resource module
+    is not available (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_stages(use_categoricals, path_raw_=PATH_RAW, path_interim_=PATH_INTERIM):
+    """Run the 2011-2050 inventory stages and get the stage run times and the
+    peak RSS."""
+    from locoei import schema
+
+    schema.USE_CATEGORICALS = use_categoricals
+    from locoei.fuelcsmp import get_fuel_consmp_by_cnty_carrier
+    from locoei.emisrt import get_emis_rt
+    from locoei.emisquant import get_emis_quant_from_df
+    from locoei.uncntr_cntr_emisquant import (
+        get_txled_factors,
+        get_controlled_txled,
+        get_deri_quantity_red,
+        get_deri_uncontrolled_quant,
+    )
+    from locoei.pipeline import map_rrgrp
+
+    path_county = os.path.join(path_raw_, "Texas_County_Boundaries.csv")
+    stage_times = {}
+    start_time = time.time()
+    fuel_consump = get_fuel_consmp_by_cnty_carrier(
+        path_natrail2020_=os.path.join(path_interim_, "North_American_Rail_Lines.csv"),
+        path_rail_carrier_grp_=os.path.join(path_raw_, "rail_carrier_grp2020.csv"),
+        path_fill_missing_yardnames_=os.path.join(
+            path_interim_,
+            "gis_debugging",
+            "north_america_rail_2021",
+            "filled_missing_yards.xlsx",
+        ),
+        path_fueluserail2019_=os.path.join(path_raw_, "RR_2019FuelUsage.csv"),
+        path_cls1_cntpct_=os.path.join(path_raw_, "2019CountyPct.csv"),
+        map_rrgrp_=map_rrgrp,
+    )
+    fuel_consump["year"] = 2019
+    stage_times["fuel_consump_sec"] = time.time() - start_time
+    start_time = time.time()
+    emis_rt = get_emis_rt(
+        path_exp_pol_list_=os.path.join(
+            path_interim_, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
+        ),
+        path_hap_speciation_=os.path.join(
+            path_interim_,
+            "epa_speciation_table",
+            "power_query",
+            "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+        ),
+        path_nox_pm10_hc_epa_em_fac_=os.path.join(
+            path_interim_,
+            "epa_emission_rates",
+            "epa_2009_emission_rates_nox_pm10_hc.xlsx",
+        ),
+    )
+    stage_times["emis_rt_sec"] = time.time() - start_time
+    start_time = time.time()
+    emis_quant_res = get_emis_quant_from_df(
+        fuel_consump_=fuel_consump,
+        emis_rt_=emis_rt,
+        path_proj_fac_=os.path.join(path_interim_, "Projection Factors 04132021.xlsx"),
+        path_county_=path_county,
+        path_ertac_2017_=os.path.join(path_interim_, "imputed_ertac_yard_2017.xlsx"),
+    )
+    stage_times["emis_quant_sec"] = time.time() - start_time
+    start_time = time.time()
+    emis_quant_agg = emis_quant_res["emis_quant_agg"]
+    get_controlled_txled(
+        emis_quant_agg_=emis_quant_agg,
+        txled_fac_=get_txled_factors(
+            path_txled_counties_=os.path.join(path_raw_, "txled_counties.csv"),
+            path_texas_counties_=path_county,
+        ),
+    )
+    get_deri_uncontrolled_quant(
+        emis_quant_agg_=emis_quant_agg,
+        deri_loco_nox_red_yr_prcd_emis_quant_region_=get_deri_quantity_red(
+            path_deri_loco_regions_=os.path.join(path_raw_, "deri_loco_regions.json"),
+            path_deri_loco_nox_red_yr_=os.path.join(
+                path_raw_, "DERI_List_20190831_Loco_Area_Summary.xlsx"
+            ),
+            path_texas_counties_=path_county,
+        ),
+    )
+    stage_times["cntr_uncntr_sec"] = time.time() - start_time
+    return {
+        "use_categoricals": use_categoricals,
+        **stage_times,
+        "total_sec": sum(stage_times.values()),
+        "emis_quant_mb": (
+            emis_quant_res["emis_quant"].memory_usage(deep=True).sum() / 1e6
+        ),
+        "emis_quant_agg_mb": emis_quant_agg.memory_usage(deep=True).sum() / 1e6,
+        "peak_rss_mb": get_peak_rss_mb(),
+    }
+
+
+def benchmark_categoricals(path_raw_=PATH_RAW, path_interim_=PATH_INTERIM):
+    """Run the stages without and with categoricals, each in a new process."""
+    mp_context = multiprocessing.get_context("spawn")
+    bench_res = []
+    for use_categoricals in (False, True):
+        with mp_context.Pool(1) as pool:
+            bench_res.append(
+                pool.apply(run_stages, (use_categoricals, path_raw_, path_interim_))
+            )
+    return pd.DataFrame(bench_res).set_index("use_categoricals")
+
+
+if __name__ == "__main__":
+    bench_categoricals = benchmark_categoricals()
+    print(bench_categoricals.T)
+    bench_categoricals.to_csv(
+        os.path.join(PATH_PROCESSED, "benchmark_categoricals.csv")
+    )
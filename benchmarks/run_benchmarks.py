@@ -0,0 +1,320 @@
+"""
+Time and memory profile the public stage functions on synthetic inputs and
+compare the results with a saved JSON baseline.
+
+Usage: python -m benchmarks.run_benchmarks [scale ...]
+The scales are the keys of benchmarks.synthetic.SCALES (default: tx). The
+results are saved as the baseline when there is no baseline yet; otherwise
+they are compared with it and the stages that got slower or use more memory
+than the tolerance are printed. The us48 scale runs get_emis_quant on the
+national emission quantities in one call and needs more than 8 GB of memory.
+"""
+import json
+import time
+import tracemalloc
+import platform
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from locoei.utilis import (
+    get_excel_cache_stats,
+    reset_excel_cache_stats,
+    write_artifact,
+)
+from locoei.profiling import get_peak_rss_mb
+from locoei.fuelcsmp import preprc_link, get_fuel_consmp_by_cnty_carrier
+from locoei.emisrt import get_emis_rt
+from locoei.emisquant import get_emis_quant
+from locoei.uncntr_cntr_emisquant import (
+    get_txled_factors,
+    get_deri_quantity_red,
+    get_uncntr_cntr_emis_quant,
+)
+from locoei.uncntr_cntr_cersxml_2011_2050 import generate_texaer_series
+from locoei.pipeline import map_rrgrp
+from benchmarks.synthetic import SCALES, make_scale_inputs
+
+PATH_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+PATH_BENCH_DATA = os.path.join(PATH_BENCHMARKS, "data")
+PATH_BASELINE = os.path.join(PATH_BENCHMARKS, "baseline.json")
+NON_POINT_SCC_LIST = [
+    "2285002006",
+    "2285002007",
+    "2285002008",
+    "2285002009",
+    "2285002010",
+]
+
+
+def measure_stage(stage_func, trace_memory=True, **kwargs) -> dict:
+    """
+    Run stage_func(**kwargs) and measure the wall time, CPU time, and the peak
+    memory allocated during the call (tracemalloc). tracemalloc slows down
+    code that creates many python objects; set trace_memory to False to only
+    time the stage.
+
+    Returns
+    -------
+    dict
+        result: stage_func return value.
+        metrics: wall_sec, cpu_sec, peak_mem_mb, peak_rss_mb, and n_rows of
+        the result when it is a dataframe.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    result = stage_func(**kwargs)
+    metrics = {
+        "wall_sec": time.perf_counter() - start_wall,
+        "cpu_sec": time.process_time() - start_cpu,
+    }
+    if trace_memory:
+        metrics["peak_mem_mb"] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    metrics["peak_rss_mb"] = get_peak_rss_mb()
+    if isinstance(result, pd.DataFrame):
+        metrics["n_rows"] = len(result)
+    return {"result": result, "metrics": metrics}
+
+
+def run_stage_benchmarks(
+    path_raw_, path_interim_, path_xml_templ_, states, xml_year=2020, trace_memory=True
+) -> dict:
+    """
+    Run the inventory stages on the inputs in path_raw_ and path_interim_ and
+    measure each stage. The fuel consumption and emission rates are written
+    to csv files in path_interim_ for get_emis_quant, and the combined
+    uncontrolled and controlled emission quantities to an artifact directory
+    for generate_texaer_series, which writes the xml_year TexAER xmls.
+
+    Returns
+    -------
+    dict
+        Metrics by stage name.
+    """
+    reset_excel_cache_stats()
+    path_county = os.path.join(path_raw_, "Texas_County_Boundaries.csv")
+    natrail_kwargs = dict(
+        path_natrail2020_=os.path.join(path_interim_, "North_American_Rail_Lines.csv"),
+        path_rail_carrier_grp_=os.path.join(path_raw_, "rail_carrier_grp2020.csv"),
+        path_fill_missing_yardnames_=os.path.join(
+            path_interim_,
+            "gis_debugging",
+            "north_america_rail_2021",
+            "filled_missing_yards.xlsx",
+        ),
+        map_rrgrp_=map_rrgrp,
+        filter_st=states,
+    )
+    stage_metrics = {}
+
+    def run_stage(stage_nm, stage_func, **kwargs):
+        stage_res = measure_stage(stage_func, trace_memory=trace_memory, **kwargs)
+        stage_metrics[stage_nm] = stage_res["metrics"]
+        print(f"{stage_nm}: {stage_res['metrics']['wall_sec']:.2f} sec")
+        return stage_res["result"]
+
+    run_stage("preprc_link", preprc_link, **natrail_kwargs)
+    fuel_consump = run_stage(
+        "get_fuel_consmp_by_cnty_carrier",
+        get_fuel_consmp_by_cnty_carrier,
+        path_fueluserail2019_=os.path.join(path_raw_, "RR_2019FuelUsage.csv"),
+        path_cls1_cntpct_=os.path.join(path_raw_, "2019CountyPct.csv"),
+        **natrail_kwargs,
+    )
+    fuel_consump["year"] = 2019
+    emis_rt = run_stage(
+        "get_emis_rt",
+        get_emis_rt,
+        path_exp_pol_list_=os.path.join(
+            path_interim_, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
+        ),
+        path_hap_speciation_=os.path.join(
+            path_interim_,
+            "epa_speciation_table",
+            "power_query",
+            "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+        ),
+        path_nox_pm10_hc_epa_em_fac_=os.path.join(
+            path_interim_,
+            "epa_emission_rates",
+            "epa_2009_emission_rates_nox_pm10_hc.xlsx",
+        ),
+    )
+    path_fuel_consump = os.path.join(path_interim_, "fuelconsump_2019_bench.csv")
+    path_emis_rt = os.path.join(path_interim_, "emission_factor_bench.csv")
+    fuel_consump.to_csv(path_fuel_consump)
+    emis_rt_long = emis_rt.to_long()
+    emis_rt_long.to_csv(path_emis_rt)
+    stage_metrics["get_emis_rt"]["n_rows"] = len(emis_rt_long)
+    emis_quant_res = run_stage(
+        "get_emis_quant",
+        get_emis_quant,
+        path_fuel_consump_=path_fuel_consump,
+        path_emis_rt_=path_emis_rt,
+        path_proj_fac_=os.path.join(path_interim_, "Projection Factors 04132021.xlsx"),
+        path_county_=path_county,
+        path_ertac_2017_=os.path.join(path_interim_, "imputed_ertac_yard_2017.xlsx"),
+    )
+    emis_quant_agg = emis_quant_res["emis_quant_agg"]
+    stage_metrics["get_emis_quant"]["n_rows"] = len(emis_quant_agg)
+    uncntr_cntr_emis_quant = run_stage(
+        "get_uncntr_cntr_emis_quant",
+        get_uncntr_cntr_emis_quant,
+        emis_quant_agg_=emis_quant_agg,
+        txled_fac_=get_txled_factors(
+            path_txled_counties_=os.path.join(path_raw_, "txled_counties.csv"),
+            path_texas_counties_=path_county,
+        ),
+        deri_loco_nox_red_yr_prcd_emis_quant_region_=get_deri_quantity_red(
+            path_deri_loco_regions_=os.path.join(path_raw_, "deri_loco_regions.json"),
+            path_deri_loco_nox_red_yr_=os.path.join(
+                path_raw_, "DERI_List_20190831_Loco_Area_Summary.xlsx"
+            ),
+            path_texas_counties_=path_county,
+        ),
+    )["uncntr_cntr_emis_quant"]
+    stage_metrics["get_uncntr_cntr_emis_quant"]["n_rows"] = len(
+        uncntr_cntr_emis_quant
+    )
+    path_uncntr_cntr_emis_quant = os.path.join(
+        path_interim_, "uncntr_cntr_emis_quant_bench"
+    )
+    write_artifact(uncntr_cntr_emis_quant, path_uncntr_cntr_emis_quant)
+    path_texaer_dir = os.path.join(path_interim_, "texaer_bench")
+    os.makedirs(path_texaer_dir, exist_ok=True)
+    counties_list = sorted(pd.read_csv(path_county).FIPS_ST_CNTY_CD.astype(str))
+    run_stage(
+        "generate_texaer_series",
+        generate_texaer_series,
+        years=[xml_year],
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emis_quant,
+        path_xml_templ_=path_xml_templ_,
+        tx_counties_list=counties_list,
+        non_point_scc_list=NON_POINT_SCC_LIST,
+        path_out_dir_=path_texaer_dir,
+        creation_datetime_="2021-06-01T10:00:00",
+    )
+    stage_metrics["excel_cache"] = get_excel_cache_stats()
+    return stage_metrics
+
+
+def run_benchmarks(
+    scales=("tx",), path_bench_data_=PATH_BENCH_DATA, trace_memory=True, seed=0
+) -> dict:
+    """
+    Generate the synthetic inputs for the scales (once; existing inputs are
+    reused) and run the stage benchmarks on them.
+
+    Returns
+    -------
+    dict
+        Benchmark results by scale with the input sizes and the stage metrics.
+    """
+    bench_res = {}
+    for scale in scales:
+        path_scale_dir = os.path.join(path_bench_data_, f"{scale}_seed{seed}")
+        path_inputs_json = os.path.join(path_scale_dir, "inputs.json")
+        if os.path.exists(path_inputs_json):
+            with open(path_inputs_json) as fi:
+                scale_inputs = json.load(fi)
+        else:
+            scale_inputs = make_scale_inputs(path_scale_dir, scale=scale, seed=seed)
+            with open(path_inputs_json, "w") as fo:
+                json.dump(scale_inputs, fo, indent=2)
+        print(f"Scale {scale}: {scale_inputs['n_links']} links.")
+        bench_res[scale] = {
+            "n_links": scale_inputs["n_links"],
+            "n_counties": scale_inputs["n_counties"],
+            "stages": run_stage_benchmarks(
+                path_raw_=scale_inputs["path_raw"],
+                path_interim_=scale_inputs["path_interim"],
+                path_xml_templ_=scale_inputs["path_xml_templ"],
+                states=tuple(scale_inputs["states"]),
+                trace_memory=trace_memory,
+            ),
+        }
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "scales": bench_res,
+    }
+
+
+def save_benchmark_baseline(bench_res_: dict, path_baseline_=PATH_BASELINE) -> None:
+    """Save the run_benchmarks results as the JSON baseline."""
+    with open(path_baseline_, "w") as fo:
+        json.dump(bench_res_, fo, indent=2)
+
+
+def compare_to_baseline(
+    bench_res_: dict,
+    baseline_: dict,
+    metrics=("wall_sec", "peak_mem_mb"),
+    tolerance=0.25,
+) -> pd.DataFrame:
+    """
+    Compare the stage metrics of bench_res_ with baseline_, both in the
+    run_benchmarks format. A stage regressed when a metric is more than
+    tolerance (fraction) above the baseline.
+
+    Returns
+    -------
+    pd.DataFrame
+        scale, stage, metric, baseline, current, ratio, and regressed columns.
+    """
+    comparison = []
+    for scale, scale_res in bench_res_["scales"].items():
+        if scale not in baseline_["scales"]:
+            continue
+        baseline_stages = baseline_["scales"][scale]["stages"]
+        for stage_nm, stage_metrics in scale_res["stages"].items():
+            for metric in metrics:
+                if metric not in stage_metrics or metric not in baseline_stages.get(
+                    stage_nm, {}
+                ):
+                    continue
+                comparison.append(
+                    {
+                        "scale": scale,
+                        "stage": stage_nm,
+                        "metric": metric,
+                        "baseline": baseline_stages[stage_nm][metric],
+                        "current": stage_metrics[metric],
+                    }
+                )
+    comparison = pd.DataFrame(
+        comparison,
+        columns=["scale", "stage", "metric", "baseline", "current"],
+    )
+    return comparison.assign(
+        ratio=lambda df: df.current / df.baseline,
+        regressed=lambda df: df.ratio > 1 + tolerance,
+    )
+
+
+if __name__ == "__main__":
+    scales = tuple(sys.argv[1:]) or ("tx",)
+    unknown_scales = set(scales) - set(SCALES)
+    assert not unknown_scales, f"Unknown scales {unknown_scales}; use {list(SCALES)}."
+    bench_res = run_benchmarks(scales=scales)
+    path_out_res = os.path.join(
+        PATH_BENCH_DATA, f"benchmark_{time.strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    )
+    save_benchmark_baseline(bench_res, path_out_res)
+    if os.path.exists(PATH_BASELINE):
+        with open(PATH_BASELINE) as fi:
+            baseline = json.load(fi)
+        bench_comparison = compare_to_baseline(bench_res, baseline)
+        print(bench_comparison.to_string(index=False))
+        regressions = bench_comparison.loc[lambda df: df.regressed]
+        if len(regressions):
+            print(f"{len(regressions)} regressions against {PATH_BASELINE}.")
+    else:
+        save_benchmark_baseline(bench_res)
+        print(f"Saved the baseline to {PATH_BASELINE}.")
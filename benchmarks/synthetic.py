@@ -0,0 +1,595 @@
+"""
+Generate synthetic inventory inputs at a configurable scale: national rail
+(NARL) links, RR_2019FuelUsage.csv style carrier fuel totals, class 1 county
+fuel mixes, ERTAC yards, and the small EPA, projection factor, TxLED, and DERI
+tables. The files use the same names and layout as data/raw and data/interim,
+so a generated directory can be passed as path_raw_ and path_interim_ to the
+locoei functions. Texas_County_Boundaries.csv has the counties of all the
+generated states.
+
+The values are random and only meant for timing and memory benchmarks; they
+pass the QC asserts of the pipeline (e.g. the 110 TxLED counties and the DERI
+NOx reduction total).
+"""
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import os
+
+# State FIPS and number of counties of the 48 contiguous states.
+CONTIGUOUS_STATES = {
+    "AL": (1, 67),
+    "AZ": (4, 15),
+    "AR": (5, 75),
+    "CA": (6, 58),
+    "CO": (8, 64),
+    "CT": (9, 8),
+    "DE": (10, 3),
+    "FL": (12, 67),
+    "GA": (13, 159),
+    "ID": (16, 44),
+    "IL": (17, 102),
+    "IN": (18, 92),
+    "IA": (19, 99),
+    "KS": (20, 105),
+    "KY": (21, 120),
+    "LA": (22, 64),
+    "ME": (23, 16),
+    "MD": (24, 24),
+    "MA": (25, 14),
+    "MI": (26, 83),
+    "MN": (27, 87),
+    "MS": (28, 82),
+    "MO": (29, 115),
+    "MT": (30, 56),
+    "NE": (31, 93),
+    "NV": (32, 17),
+    "NH": (33, 10),
+    "NJ": (34, 21),
+    "NM": (35, 33),
+    "NY": (36, 62),
+    "NC": (37, 100),
+    "ND": (38, 53),
+    "OH": (39, 88),
+    "OK": (40, 77),
+    "OR": (41, 36),
+    "PA": (42, 67),
+    "RI": (44, 5),
+    "SC": (45, 46),
+    "SD": (46, 66),
+    "TN": (47, 95),
+    "TX": (48, 254),
+    "UT": (49, 29),
+    "VT": (50, 14),
+    "VA": (51, 133),
+    "WA": (53, 39),
+    "WV": (54, 55),
+    "WI": (55, 72),
+    "WY": (56, 23),
+}
+SCALES = {
+    "tx": {"states": ("TX",), "links_per_county": 40},
+    "tx10x": {"states": ("TX",), "links_per_county": 400},
+    "us48": {"states": tuple(CONTIGUOUS_STATES), "links_per_county": 40},
+}
+CLS1_CARRIERS = ("BNSF", "KCS", "UP")
+CLS3_CARRIERS = tuple(f"C3{chr(65 + idx)}" for idx in range(20))
+# Dallas, Denton, and Tarrant counties, where DART and TRE run.
+DART_TRE_FIPS = (48113, 48121, 48439)
+SCC_DESC_4 = {
+    2285002006: "Line Haul Locomotives: Class I Operations",
+    2285002007: "Line Haul Locomotives: Class II / III Operations",
+    2285002008: "Line Haul Locomotives: Passenger Trains (Amtrak)",
+    2285002009: "Line Haul Locomotives: Commuter Lines",
+    2285002010: "Yard Locomotives",
+}
+CAP_POLLUTANTS = {
+    "CO": "Carbon Monoxide",
+    "NH3": "Ammonia",
+    "NOX": "Nitrogen Oxides",
+    "PM10-PRI": "PM10 Primary (Filt + Cond)",
+    "PM25-PRI": "PM2.5 Primary (Filt + Cond)",
+    "SO2": "Sulfur Dioxide",
+    "VOC": "Volatile Organic Compounds",
+}
+HAP_BY_PARENT = {
+    "PM25-PRI": {7440020: "Nickel", 7439965: "Manganese", 7440382: "Arsenic"},
+    "VOC": {
+        50000: "Formaldehyde",
+        75070: "Acetaldehyde",
+        71432: "Benzene",
+        1330207: "Xylenes",
+    },
+}
+DERI_AREAS = {
+    "Austin": "Austin",
+    "Beaumont/Port Arthur": "Beaumont",
+    "Dallas/Fort Worth": "Dallas/Fort Worth",
+    "Houston/Galveston/Brazoria": "Houston",
+    "San Antonio": "San Antonio",
+    "Tyler/Longview": "Tyler",
+}
+
+
+def get_synthetic_counties(states) -> pd.DataFrame:
+    """Get the county FIPS, county name, and state abbreviation of the
+    states. County FIPS are odd numbers like the real ones."""
+    county_list = []
+    for st in states:
+        st_fips, n_counties = CONTIGUOUS_STATES[st]
+        county_list.append(
+            pd.DataFrame(
+                {
+                    "CNTY_NM": [f"{st} County {idx:03d}" for idx in range(n_counties)],
+                    "FIPS_ST_CNTY_CD": st_fips * 1000 + 2 * np.arange(n_counties) + 1,
+                    "STATEAB": st,
+                }
+            )
+        )
+    counties = pd.concat(county_list, ignore_index=True)
+    counties.loc[lambda df: df.FIPS_ST_CNTY_CD == 48121, "CNTY_NM"] = "Denton"
+    return counties
+
+
+def get_synthetic_narl(
+    counties_: pd.DataFrame, links_per_county: int, rng_: np.random.Generator
+) -> pd.DataFrame:
+    """
+    Get synthetic NARL links. Each county has class 1 and class 3 main line
+    links with trackage rights, industrial leads, yards, and links on
+    networks that the inventory filters out (transit and abandoned lines).
+    Amtrak runs on main lines everywhere; DART and TRE only in the Dallas
+    area counties.
+    """
+    n_links = len(counties_) * links_per_county
+    county_idx = np.repeat(np.arange(len(counties_)), links_per_county)
+    stcntyfips = counties_.FIPS_ST_CNTY_CD.to_numpy()[county_idx]
+    net = rng_.choice(
+        np.array(["M", "I", "S", "O", "Y", "Z", "A"]),
+        size=n_links,
+        p=[0.3, 0.1, 0.05, 0.2, 0.25, 0.05, 0.05],
+    )
+    is_main = np.isin(net, ["M", "I", "S"])
+    cls1 = np.array(CLS1_CARRIERS, dtype=object)
+    cls3 = np.array(CLS3_CARRIERS, dtype=object)
+    rrowner1 = np.where(
+        rng_.random(n_links) < 0.7,
+        cls1[rng_.integers(0, len(cls1), n_links)],
+        cls3[rng_.integers(0, len(cls3), n_links)],
+    )
+    trkrghts1 = np.where(
+        rng_.random(n_links) < 0.3, cls3[rng_.integers(0, len(cls3), n_links)], None
+    )
+    trkrghts2 = np.where(
+        is_main & (rng_.random(n_links) < 0.2),
+        np.where(rng_.random(n_links) < 0.9, "AMTK", "NS"),
+        None,
+    )
+    is_dart_tre = is_main & np.isin(stcntyfips, DART_TRE_FIPS) & (net == "M")
+    trkrghts3 = np.where(
+        is_dart_tre, np.where(rng_.random(n_links) < 0.5, "DART", "TRE"), None
+    )
+    yardname = np.where(
+        net == "Y",
+        pd.Series(stcntyfips).astype(str).to_numpy()
+        + "_Yard"
+        + pd.Series(rng_.integers(0, 3, n_links)).astype(str).to_numpy(),
+        None,
+    )
+    # Some yards have no name in NARL and are filled manually.
+    yardname[(net == "Y") & (rng_.random(n_links) < 0.1)] = None
+    fraarcid = 100000 + np.arange(n_links)
+    narl = pd.DataFrame(
+        {
+            "FRAARCID": fraarcid,
+            "FRFRANODE": fraarcid * 2,
+            "STCNTYFIPS": stcntyfips,
+            "STATEAB": counties_.STATEAB.to_numpy()[county_idx],
+            "NET": net,
+            "MILES": np.where(
+                is_main, rng_.uniform(0.5, 5, n_links), rng_.uniform(0.01, 3, n_links)
+            ),
+            "SUBDIV": "synthetic",
+            "YARDNAME": yardname,
+            "RROWNER1": rrowner1,
+            "RROWNER2": None,
+            "RROWNER3": None,
+            "TRKRGHTS1": trkrghts1,
+            "TRKRGHTS2": trkrghts2,
+            "TRKRGHTS3": trkrghts3,
+        }
+    )
+    for trk_right_col in [f"TRKRGHTS{idx}" for idx in range(4, 10)]:
+        narl[trk_right_col] = None
+    return narl
+
+
+def get_synthetic_ertac_yards(
+    counties_: pd.DataFrame, rng_: np.random.Generator, yard_county_frac=0.3
+) -> pd.DataFrame:
+    """Get ERTAC yards in a random subset of the counties, with one or two
+    yards per county. The DERI region counties (the first 40 Texas counties
+    and Denton) always have yards."""
+    is_deri_county = (counties_.STATEAB == "TX") & (
+        (counties_.groupby("STATEAB").cumcount() < 40)
+        | (counties_.FIPS_ST_CNTY_CD == 48121)
+    )
+    has_yard = (
+        rng_.random(len(counties_)) < yard_county_frac
+    ) | is_deri_county.to_numpy()
+    yard_counties = counties_.loc[has_yard].reset_index(drop=True)
+    n_yards = rng_.integers(1, 3, len(yard_counties))
+    yard_idx = np.repeat(np.arange(len(yard_counties)), n_yards)
+    yard_no = np.concatenate([np.arange(n_yard) for n_yard in n_yards])
+    fips = yard_counties.FIPS_ST_CNTY_CD.to_numpy()[yard_idx]
+    ertac_yards = pd.DataFrame(
+        {
+            "State ID": fips // 1000,
+            "FIPS": fips,
+            "Yard Name": [
+                f"ErtacYard{fips_}_{no}" for fips_, no in zip(fips, yard_no)
+            ],
+            "EIS Facility ID": 1000 + np.arange(len(fips)),
+            "Site Latitude": rng_.uniform(26, 49, len(fips)),
+            "Site Longitude": rng_.uniform(-124, -67, len(fips)),
+            "Final 2016 Fuel Use": rng_.uniform(1e3, 1e6, len(fips)),
+        }
+    )
+    # prc_ertac_2017_yard_vals reads the first 39 columns.
+    for idx in range(39 - ertac_yards.shape[1]):
+        ertac_yards[f"Filler {idx}"] = idx
+    return ertac_yards
+
+
+def get_xml_templ_str(pollutants) -> str:
+    """Get a CERS xml template with the annual and ozone season day
+    reporting periods for the pollutants."""
+
+    def get_rp_emissions(pollutant):
+        return (
+            "<cer:ReportingPeriodEmissions>"
+            f"<cer:PollutantCode>{pollutant}</cer:PollutantCode>"
+            "<cer:TotalEmissions>0</cer:TotalEmissions>"
+            "<cer:EmissionsUnitofMeasureCode>TON</cer:EmissionsUnitofMeasureCode>"
+            "</cer:ReportingPeriodEmissions>"
+        )
+
+    rp_emissions = "".join(get_rp_emissions(pollutant) for pollutant in pollutants)
+    return (
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        '<hdr:Document xmlns:hdr="http://www.exchangenetwork.net/schema/header/2" '
+        'xmlns:cer="http://www.exchangenetwork.net/schema/cer/1" id="x">'
+        "<hdr:Header><hdr:CreationDateTime>2021</hdr:CreationDateTime></hdr:Header>"
+        '<hdr:Payload Operation="refresh"><cer:CERS>'
+        "<cer:EmissionsYear>2020</cer:EmissionsYear><cer:Location>"
+        "<cer:StateAndCountyFIPSCode>fips</cer:StateAndCountyFIPSCode>"
+        "<cer:TribalCode/><cer:LocationEmissionsProcess>"
+        "<cer:SourceClassificationCode>scc</cer:SourceClassificationCode>"
+        "<cer:ReportingPeriod><cer:ReportingPeriodTypeCode>A"
+        f"</cer:ReportingPeriodTypeCode>{rp_emissions}</cer:ReportingPeriod>"
+        "<cer:ReportingPeriod><cer:ReportingPeriodTypeCode>O3D"
+        f"</cer:ReportingPeriodTypeCode>{rp_emissions}</cer:ReportingPeriod>"
+        "</cer:LocationEmissionsProcess></cer:Location></cer:CERS></hdr:Payload>"
+        "</hdr:Document>\n"
+    )
+
+
+def write_epa_inputs(path_interim_: str, rng_: np.random.Generator) -> None:
+    """Write the expected pollutant list, HAP speciation, EPA 2009 emission
+    rates, and the projection factors."""
+    hap_pollutants = {
+        hap: hap_desc
+        for hap_by_code in HAP_BY_PARENT.values()
+        for hap, hap_desc in hap_by_code.items()
+    }
+    exp_pol_list = pd.DataFrame(
+        {
+            "EPA Tool?": "Y",
+            "SCC": list(SCC_DESC_4),
+            "SCC Description": list(SCC_DESC_4.values()),
+            "Sector": "Mobile - Locomotives",
+        }
+    )
+    for pollutant in list(CAP_POLLUTANTS) + [str(hap) for hap in hap_pollutants]:
+        exp_pol_list[pollutant] = "X"
+    pol_xwalk = pd.DataFrame(
+        {
+            "pollutant": list(CAP_POLLUTANTS) + [str(hap) for hap in hap_pollutants],
+            "poltype": ["CAP"] * len(CAP_POLLUTANTS) + ["HAP"] * len(hap_pollutants),
+            "poldesc": list(CAP_POLLUTANTS.values()) + list(hap_pollutants.values()),
+            "polcat": "synthetic",
+            "group": "synthetic",
+        }
+    )
+    path_pol_list_dir = os.path.join(path_interim_, "epa_pol_list")
+    os.makedirs(path_pol_list_dir, exist_ok=True)
+    with pd.ExcelWriter(
+        os.path.join(path_pol_list_dir, "np_expected_poll_list_complete_v1.xlsx")
+    ) as writer:
+        exp_pol_list.to_excel(
+            writer, sheet_name="NP Expected Pollutants List", index=False
+        )
+        pol_xwalk.to_excel(
+            writer, sheet_name="Xwalk_pollutant_descriptions", index=False
+        )
+    speciation = pd.DataFrame(
+        [
+            {
+                "Data Category Code": "NONPOINT",
+                "SCC Assignment": scc,
+                "SCC Description Level 1": "Mobile Sources",
+                "SCC Description Level 2": "Railroad Equipment",
+                "SCC Description Level 3": "Diesel",
+                "SCC Description Level 4": scc_desc_4,
+                "Sector Description": "Mobile - Locomotives",
+                "Output Pollutant Code": hap,
+                "Output Pollutant Description": hap_desc,
+                "Input Pollutant Code": parent,
+                "Input Pollutant Description": CAP_POLLUTANTS[parent],
+                "Multiplication Factor": rng_.uniform(1e-5, 1e-2),
+            }
+            for scc, scc_desc_4 in SCC_DESC_4.items()
+            for parent, hap_by_code in HAP_BY_PARENT.items()
+            for hap, hap_desc in hap_by_code.items()
+        ]
+    )
+    path_speciation_dir = os.path.join(
+        path_interim_, "epa_speciation_table", "power_query"
+    )
+    os.makedirs(path_speciation_dir, exist_ok=True)
+    with pd.ExcelWriter(
+        os.path.join(
+            path_speciation_dir,
+            "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+        )
+    ) as writer:
+        speciation.to_excel(
+            writer, sheet_name="Non Point 2020 Speciation Table", index=False
+        )
+    epa_rates = pd.MultiIndex.from_product(
+        [
+            [
+                "large_line_haul",
+                "small_rr",
+                "passenger_commuter",
+                "large_switch",
+                "small_switch",
+            ],
+            ["NOX", "PM10-PRI", "HC"],
+            range(2006, 2041),
+        ],
+        names=["carriers", "pollutant", "year"],
+    ).to_frame(index=False)
+    epa_rates["em_fac"] = rng_.uniform(0.5, 200, len(epa_rates))
+    path_epa_rates_dir = os.path.join(path_interim_, "epa_emission_rates")
+    os.makedirs(path_epa_rates_dir, exist_ok=True)
+    epa_rates.to_excel(
+        os.path.join(path_epa_rates_dir, "epa_2009_emission_rates_nox_pm10_hc.xlsx"),
+        index=False,
+    )
+    years = np.arange(2011, 2051)
+    proj_fac = pd.DataFrame(
+        {
+            "Year": years,
+            "Freight": rng_.uniform(0.8, 1.3, len(years)),
+            "Passenger": rng_.uniform(0.8, 1.3, len(years)),
+        }
+    )
+    with pd.ExcelWriter(
+        os.path.join(path_interim_, "Projection Factors 04132021.xlsx")
+    ) as writer:
+        pd.DataFrame([["Recommended projection factors"]]).to_excel(
+            writer, sheet_name="Recommended_Proj", index=False, header=False
+        )
+        proj_fac.to_excel(
+            writer, sheet_name="Recommended_Proj", index=False, startrow=1
+        )
+
+
+def write_txled_deri_inputs(
+    path_raw_: str, counties_: pd.DataFrame, rng_: np.random.Generator
+) -> None:
+    """Write the 110 TxLED counties, the DERI regions, and the DERI NOx
+    reductions. The DERI reductions add up to the total checked by
+    assert_deri_tot."""
+    tx_counties = counties_.loc[lambda df: df.STATEAB == "TX"].CNTY_NM.to_list()
+    txled_counties = tx_counties[:110]
+    with open(os.path.join(path_raw_, "txled_counties.csv"), "w") as fo:
+        for idx in range(0, len(txled_counties), 10):
+            fo.write(", ".join(txled_counties[idx : idx + 10]) + "\n")
+    deri_regions = {
+        "Austin": tx_counties[0:3],
+        "Beaumont": tx_counties[3:5],
+        "Dallas/Fort Worth": ["Denton"] + tx_counties[6:8],
+        "Houston": tx_counties[10:14],
+        "San Antonio": tx_counties[20:22],
+        "Tyler": tx_counties[30:31],
+    }
+    with open(os.path.join(path_raw_, "deri_loco_regions.json"), "w") as fo:
+        json.dump(
+            {
+                str(idx): {"region": region, "counties": counties}
+                for idx, (region, counties) in enumerate(deri_regions.items())
+            },
+            fo,
+        )
+    n_grants = 14
+    start_yr = rng_.integers(2011, 2030, n_grants)
+    activity_life = rng_.integers(3, 15, n_grants)
+    nox_red = rng_.uniform(100, 5000, n_grants)
+    deri_grants = pd.DataFrame(
+        {
+            "Area": [list(DERI_AREAS)[idx % len(DERI_AREAS)] for idx in range(n_grants)],
+            "Year": start_yr,
+            "Activity Life": activity_life,
+            "Bnefits Expiry Year": start_yr + activity_life,
+            "Total NOX Reduction (tons)": nox_red * 27206.2667 / nox_red.sum(),
+        }
+    )
+    with pd.ExcelWriter(
+        os.path.join(path_raw_, "DERI_List_20190831_Loco_Area_Summary.xlsx")
+    ) as writer:
+        deri_grants.to_excel(writer, sheet_name="Locomotive", index=False)
+
+
+def make_synthetic_inputs(
+    path_out_dir_: str, states=("TX",), links_per_county=40, seed=0
+) -> dict:
+    """
+    Write synthetic inputs for the states to path_out_dir_/raw and
+    path_out_dir_/interim.
+
+    Parameters
+    ----------
+    path_out_dir_:
+        Output directory.
+    states:
+        State abbreviations from CONTIGUOUS_STATES. Texas is always needed for
+        the TxLED and DERI inputs.
+    links_per_county:
+        Number of NARL links per county.
+    seed:
+        Random seed.
+
+    Returns
+    -------
+    dict
+        Paths of the generated directories and files, and the number of links
+        and counties.
+    """
+    assert "TX" in states, "TxLED and DERI inputs need Texas counties."
+    rng = np.random.default_rng(seed)
+    path_raw = os.path.join(path_out_dir_, "raw")
+    path_interim = os.path.join(path_out_dir_, "interim")
+    path_yard_fill_dir = os.path.join(
+        path_interim, "gis_debugging", "north_america_rail_2021"
+    )
+    for path_dir in (path_raw, path_interim, path_yard_fill_dir):
+        os.makedirs(path_dir, exist_ok=True)
+    counties = get_synthetic_counties(states)
+    counties.filter(items=["CNTY_NM", "FIPS_ST_CNTY_CD"]).to_csv(
+        os.path.join(path_raw, "Texas_County_Boundaries.csv"), index=False
+    )
+    carriers = CLS1_CARRIERS + CLS3_CARRIERS + ("AMTK", "DART", "TREX")
+    pd.DataFrame(
+        {
+            "carrier": carriers,
+            "rr_group": ["Class I"] * len(CLS1_CARRIERS)
+            + ["Class III"] * len(CLS3_CARRIERS)
+            + ["Passenger", "Commuter", "Commuter"],
+        }
+    ).to_csv(os.path.join(path_raw, "rail_carrier_grp2020.csv"))
+    narl = get_synthetic_narl(counties, links_per_county, rng)
+    narl.to_csv(os.path.join(path_interim, "North_American_Rail_Lines.csv"))
+    missing_yardnames = narl.loc[
+        lambda df: (df.NET == "Y") & df.YARDNAME.isna(), ["FRAARCID", "NET"]
+    ].rename(columns={"FRAARCID": "fraarcid", "NET": "net"})
+    missing_yardnames["yardname_filled_arcmap"] = (
+        missing_yardnames.fraarcid.astype(str) + "_FilledYard"
+    )
+    missing_yardnames.to_excel(
+        os.path.join(path_yard_fill_dir, "filled_missing_yards.xlsx"), index=False
+    )
+    n_states = len(states)
+    pd.DataFrame(
+        {
+            "RRCarrier": carriers,
+            "LineHaul": rng.uniform(1e5, 1e8, len(carriers)) * n_states,
+            "Yard": np.append(
+                rng.uniform(1e5, 1e7, len(carriers) - 3) * n_states,
+                [np.nan, np.nan, 5e4],
+            ),
+        }
+    ).to_csv(os.path.join(path_raw, "RR_2019FuelUsage.csv"), index=False)
+    cls1_freight_fips = np.sort(
+        narl.loc[
+            lambda df: df.RROWNER1.isin(CLS1_CARRIERS)
+            & df.NET.isin(["M", "I", "S"]),
+            "STCNTYFIPS",
+        ].unique()
+    )
+    county_pct = rng.uniform(0, 1, len(cls1_freight_fips))
+    pd.DataFrame(
+        {"FIPS": cls1_freight_fips, "CountyPct": county_pct / county_pct.sum()}
+    ).to_csv(os.path.join(path_raw, "2019CountyPct.csv"), index=False)
+    with pd.ExcelWriter(
+        os.path.join(path_interim, "imputed_ertac_yard_2017.xlsx")
+    ) as writer:
+        get_synthetic_ertac_yards(counties, rng).to_excel(
+            writer, sheet_name="2017 Emissions", index=False
+        )
+    write_epa_inputs(path_interim, rng)
+    write_txled_deri_inputs(path_raw, counties, rng)
+    pollutants = (
+        ["CO2"]
+        + list(CAP_POLLUTANTS)
+        + ["7439921"]
+        + [str(hap) for hap_by_code in HAP_BY_PARENT.values() for hap in hap_by_code]
+    )
+    path_xml_templ = os.path.join(path_interim, "xml_rail_templ_tti.xml")
+    with open(path_xml_templ, "w") as fo:
+        fo.write(get_xml_templ_str(pollutants))
+    return {
+        "path_raw": path_raw,
+        "path_interim": path_interim,
+        "path_xml_templ": path_xml_templ,
+        "states": tuple(states),
+        "n_links": len(narl),
+        "n_counties": len(counties),
+    }
+
+
+def write_multistate_inputs(synth_inputs_: dict) -> None:
+    """
+    Split the county boundaries and the class 1 county fuel mix of the
+    make_synthetic_inputs output by state into the layout of
+    multistate.get_state_input_paths: Texas keeps the files in path_raw, and
+    the other states get path_raw/states/{st} with their counties, county
+    fuel mix, and copies of the fuel usage, projection factor, and filled yard
+    name files. Texas_County_Boundaries.csv and 2019CountyPct.csv then only
+    have the Texas counties.
+    """
+    path_raw = synth_inputs_["path_raw"]
+    path_interim = synth_inputs_["path_interim"]
+    path_county = os.path.join(path_raw, "Texas_County_Boundaries.csv")
+    path_cls1_cntpct = os.path.join(path_raw, "2019CountyPct.csv")
+    counties = pd.read_csv(path_county)
+    cls1_cntpct = pd.read_csv(path_cls1_cntpct)
+    for st in synth_inputs_["states"]:
+        st_fips = CONTIGUOUS_STATES[st][0]
+        if st == "TX":
+            path_st_raw = path_raw
+            path_st_county = path_county
+        else:
+            path_st_raw = os.path.join(path_raw, "states", st)
+            path_st_county = os.path.join(path_st_raw, "County_Boundaries.csv")
+            os.makedirs(path_st_raw, exist_ok=True)
+            shutil.copyfile(
+                os.path.join(path_raw, "RR_2019FuelUsage.csv"),
+                os.path.join(path_st_raw, "RR_2019FuelUsage.csv"),
+            )
+            shutil.copyfile(
+                os.path.join(path_interim, "Projection Factors 04132021.xlsx"),
+                os.path.join(path_st_raw, "Projection Factors 04132021.xlsx"),
+            )
+            shutil.copyfile(
+                os.path.join(
+                    path_interim,
+                    "gis_debugging",
+                    "north_america_rail_2021",
+                    "filled_missing_yards.xlsx",
+                ),
+                os.path.join(path_st_raw, "filled_missing_yards.xlsx"),
+            )
+        counties.loc[lambda df: df.FIPS_ST_CNTY_CD // 1000 == st_fips].to_csv(
+            path_st_county, index=False
+        )
+        cls1_cntpct.loc[lambda df: df.FIPS // 1000 == st_fips].assign(
+            CountyPct=lambda df: df.CountyPct / df.CountyPct.sum()
+        ).to_csv(os.path.join(path_st_raw, "2019CountyPct.csv"), index=False)
+
+
+def make_scale_inputs(path_out_dir_: str, scale="tx", seed=0) -> dict:
+    """Write synthetic inputs for one of the SCALES."""
+    return make_synthetic_inputs(path_out_dir_, seed=seed, **SCALES[scale])
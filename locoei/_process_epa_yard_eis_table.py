@@ -7,17 +7,17 @@ from locoerlt.utilis import PATH_RAW, PATH_PROCESSED, get_snake_case_dict
 path_epa_yard_info = os.path.join(
     PATH_RAW, "eis_report_16580", "fac_conf_proc_unit_16580.csv"
 )
-path_cntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+path_uncntr_cntr_emisquant = glob.glob(
+    os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
 )[0]
 path_yard_prcs = os.path.join(
     PATH_PROCESSED, "imputed_ertac_yard_2017_with_eis_unit_prc.xlsx"
 )
 
-cntr_emisquant = pd.read_csv(path_cntr_emisquant)
+uncntr_cntr_emisquant = pd.read_csv(path_uncntr_cntr_emisquant)
 epa_yard_info = pd.read_csv(path_epa_yard_info)
 yards_2020 = (
-    cntr_emisquant.loc[
+    uncntr_cntr_emisquant.loc[
         lambda df: (df.scc_description_level_4 == "Yard Locomotives")
         & (df.year == 2020)
     ]
@@ -10,7 +10,12 @@ import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
-from locoerlt.utilis import PATH_RAW, PATH_INTERIM
+from locoei.utilis import PATH_RAW, PATH_INTERIM
+
+ns = {
+    "header": "http://www.exchangenetwork.net/schema/header/2",
+    "payload": "http://www.exchangenetwork.net/schema/cer/1",
+}
 
 
 def set_document_id(
@@ -19,13 +24,24 @@ def set_document_id(
     templ_root_.set("id", doc_id)
 
 
+def get_creation_datetime() -> str:
+    """Get the current time in the CERS header CreationDateTime format."""
+    ts = time.time()
+    st = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%dT%H:%M:%S")
+    return st
+
+
 def set_creation_datetime(
-    templ_root_header_: xml.etree.ElementTree.Element, ns
+    templ_root_header_: xml.etree.ElementTree.Element, ns, creation_datetime_=None
 ) -> None:
+    """
+    Set the header CreationDateTime. Uses the current time when
+    creation_datetime_ is None; pass a fixed value to get reproducible files.
+    """
     creation_datetime = templ_root_header_.find("header:CreationDateTime", ns)
-    ts = time.time()
-    st = datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%dT%H:%M:%S")
-    creation_datetime.text = st
+    if creation_datetime_ is None:
+        creation_datetime_ = get_creation_datetime()
+    creation_datetime.text = creation_datetime_
 
 
 def set_data_cat_prop(
@@ -368,39 +384,47 @@ def register_all_namespaces(filename):
         ET.register_namespace(ns, namespaces[ns])
 
 
-if __name__ == "__main__":
-    path_emis_rate = glob.glob(
-        os.path.join(PATH_INTERIM, f"emission_factor_[" f"0-9]*-*-*.csv")
-    )[0]
-    tti_pol_list_a = set(pd.read_csv(path_emis_rate).pollutant.unique())
-    tti_pol_list_o3d = set(["NOX", "VOC", "CO"])
-    path_dir_templ = os.path.join(PATH_RAW, "ERG")
-    path_templ = os.path.join(path_dir_templ, "rail2020-Uncontrolled.xml")
-    path_out_templ = os.path.join(PATH_INTERIM, "xml_rail_templ_tti.xml")
-    register_all_namespaces(path_templ)
-    templ_tree = ET.parse(path_templ)
+def get_xml_templ(
+    path_templ_: str,
+    path_emis_rate_: str,
+    path_out_templ_: str,
+    tti_pol_list_o3d_=("NOX", "VOC", "CO"),
+) -> None:
+    """
+    Convert ERG's xml template to the TTI template with the pollutants in the
+    emission rate table and write it to path_out_templ_.
+    """
+    tti_pol_list_a = set(pd.read_csv(path_emis_rate_).pollutant.unique())
+    register_all_namespaces(path_templ_)
+    templ_tree = ET.parse(path_templ_)
     templ_root = templ_tree.getroot()
-    print_xml_lines(tree_elem=templ_root, max_lines=40)
-    ns = {
-        "header": "http://www.exchangenetwork.net/schema/header/2",
-        "payload": "http://www.exchangenetwork.net/schema/cer/1",
-    }
-
     set_document_id(templ_root_=templ_root)
-    print(templ_root.attrib)
-    templ_root_header = modify_template_header(templ_root_=templ_root, ns=ns)
-    print_xml_lines(tree_elem=templ_root, max_lines=40)
+    modify_template_header(templ_root_=templ_root, ns=ns)
     modify_payload(
         templ_root_=templ_root,
         tti_pol_list_a_=tti_pol_list_a,
-        tti_pol_list_o3d_=tti_pol_list_o3d,
+        tti_pol_list_o3d_=set(tti_pol_list_o3d_),
         ns=ns,
     )
-    templ_tree.write(path_out_templ, encoding="utf-8", xml_declaration=True)
+    templ_tree.write(path_out_templ_, encoding="utf-8", xml_declaration=True)
     lxml_etree_root = lxml_etree.parse(
-        str(path_out_templ),
+        str(path_out_templ_),
         parser=lxml_etree.XMLParser(remove_blank_text=True, remove_comments=True),
     )
     lxml_etree_root.write(
-        str(path_out_templ), pretty_print=True, encoding="utf-8", xml_declaration=True
+        str(path_out_templ_), pretty_print=True, encoding="utf-8", xml_declaration=True
+    )
+
+
+if __name__ == "__main__":
+    path_emis_rate = glob.glob(
+        os.path.join(PATH_INTERIM, f"emission_factor_[" f"0-9]*-*-*.csv")
+    )[0]
+    path_dir_templ = os.path.join(PATH_RAW, "ERG")
+    path_templ = os.path.join(path_dir_templ, "rail2020-Uncontrolled.xml")
+    path_out_templ = os.path.join(PATH_INTERIM, "xml_rail_templ_tti.xml")
+    get_xml_templ(
+        path_templ_=path_templ,
+        path_emis_rate_=path_emis_rate,
+        path_out_templ_=path_out_templ,
     )
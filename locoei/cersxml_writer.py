@@ -0,0 +1,341 @@
+"""
+Stream the uncontrolled and controlled CERS xmls to file one county
+Location block at a time. The document before and after the Location blocks
+is serialized once, and every Location block is written already indented,
+so the full tree is never held in memory and there is no unformatted file to
+re-parse for pretty printing. The Location block is compiled once per
+document into literal text and value slots, and each county is rendered by
+filling the slots.
+"""
+import xml.etree.ElementTree as ET
+from lxml import etree as lxml_etree
+from xml.sax.saxutils import escape as xml_escape
+import copy
+import re
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
+from locoei.cersxml_templ import (
+    set_creation_datetime,
+    set_document_id,
+    register_all_namespaces,
+)
+from locoei.profiling import profile_stage
+
+ns = {
+    "header": "http://www.exchangenetwork.net/schema/header/2",
+    "payload": "http://www.exchangenetwork.net/schema/cer/1",
+}
+LOCATION_MARKER_TAG = f"{{{ns['payload']}}}LocationStreamMarker"
+
+
+def get_pretty_xml(xml_elem: ET.Element, xml_declaration=False) -> bytes:
+    """
+    Pretty print an ElementTree element through lxml with blank text and
+    comments removed.
+    """
+    lxml_root = lxml_etree.fromstring(
+        ET.tostring(xml_elem),
+        parser=lxml_etree.XMLParser(remove_blank_text=True, remove_comments=True),
+    )
+    return lxml_etree.tostring(
+        lxml_root.getroottree(),
+        pretty_print=True,
+        encoding="UTF-8",
+        xml_declaration=xml_declaration,
+    )
+
+
+@profile_stage
+def get_xml_shell(
+    path_xml_templ, doc_id, year_=None, creation_datetime_=None
+) -> dict:
+    """
+    Get the template with the document id, creation time, and emissions year
+    set and the Location element removed.
+
+    Returns
+    -------
+    dict
+        "head" and "tail": bytes written before and after the Location
+        blocks. "location_templ": the Location template element. "depth_shell":
+        Document/Payload/CERS elements used to serialize a Location block at
+        the same depth as in the full document.
+    """
+    templ_tree = ET.parse(path_xml_templ)
+    templ_root = templ_tree.getroot()
+    templ_root_header = templ_root.find("header:Header", ns)
+    set_document_id(templ_root, doc_id=doc_id)
+    set_creation_datetime(
+        templ_root_header, ns=ns, creation_datetime_=creation_datetime_
+    )
+    cers_template = templ_tree.find(".//payload:Location/...", ns)
+    location_template = templ_tree.find(".//payload:Location", ns)
+    cers_template.remove(location_template)
+    if year_ is not None:
+        year_elem = cers_template.find("payload:EmissionsYear", ns)
+        year_elem.text = f"{year_}"
+    # Locations go at the end of CERS, after the template elements.
+    ET.SubElement(cers_template, LOCATION_MARKER_TAG)
+    shell_lines = get_pretty_xml(templ_root, xml_declaration=True).splitlines(
+        keepends=True
+    )
+    marker_idx = [
+        idx
+        for idx, line in enumerate(shell_lines)
+        if b"LocationStreamMarker" in line
+    ]
+    assert len(marker_idx) == 1, "Expected one Location marker in the xml shell."
+    templ_payload = templ_root.find("header:Payload", ns)
+    assert templ_payload.find("payload:CERS", ns) is cers_template, (
+        "Expected Location under Document/Payload/CERS. The depth shell "
+        "assumes this nesting."
+    )
+    depth_shell_root = ET.Element(templ_root.tag)
+    depth_shell_cers = ET.SubElement(
+        ET.SubElement(depth_shell_root, templ_payload.tag), cers_template.tag
+    )
+    return {
+        "head": b"".join(shell_lines[: marker_idx[0]]),
+        "tail": b"".join(shell_lines[marker_idx[0] + 1 :]),
+        "location_templ": location_template,
+        "depth_shell": {"root": depth_shell_root, "cers": depth_shell_cers},
+    }
+
+
+@profile_stage
+def get_emisquant_value_index(
+    emisquant_fil_scc_: pd.DataFrame, pol_ton_col: str, pol_ton_daily_col: str
+) -> dict:
+    """
+    Index the xml emission values by (county, scc, pollutant, reporting
+    period type code), where the reporting period is "A" for the annual and
+    "O3D" for the ozone season day emissions.
+
+    Returns
+    -------
+    dict
+        "values": emission value string by (stcntyfips_str, ssc_str,
+        pollutant_str, "A" or "O3D"). "county_scc": set of (stcntyfips_str,
+        ssc_str) with data.
+    """
+    # Keep the first row for duplicate keys, same as .values[0] on a group.
+    emisquant_fil_scc_dedup = emisquant_fil_scc_.drop_duplicates(
+        subset=["stcntyfips_str", "ssc_str", "pollutant_str"], keep="first"
+    )
+    value_index = {}
+    for reporting_period_type, pol_col in (
+        ("A", pol_ton_col),
+        ("O3D", pol_ton_daily_col),
+    ):
+        value_index.update(
+            zip(
+                zip(
+                    emisquant_fil_scc_dedup.stcntyfips_str,
+                    emisquant_fil_scc_dedup.ssc_str,
+                    emisquant_fil_scc_dedup.pollutant_str,
+                    [reporting_period_type] * len(emisquant_fil_scc_dedup),
+                ),
+                emisquant_fil_scc_dedup[pol_col],
+            )
+        )
+    return {
+        "values": value_index,
+        "county_scc": set(
+            zip(emisquant_fil_scc_dedup.stcntyfips_str, emisquant_fil_scc_dedup.ssc_str)
+        ),
+    }
+
+
+def get_location_block(location_elem: ET.Element, depth_shell: dict) -> bytes:
+    """
+    Serialize a Location element with the indentation it has in the full
+    document.
+    """
+    depth_shell["cers"].append(location_elem)
+    try:
+        shell_lines = get_pretty_xml(depth_shell["root"]).splitlines(keepends=True)
+    finally:
+        depth_shell["cers"].remove(location_elem)
+    # Drop the Document, Payload, and CERS start and end tags.
+    return b"".join(shell_lines[3:-3])
+
+
+@profile_stage
+def compile_location_templ(xml_shell: dict, non_point_scc_list) -> dict:
+    """
+    Serialize the Location block for all SCCs once, with numbered slots in
+    place of the FIPS code and the annual and ozone season day TotalEmissions
+    values.
+
+    Returns
+    -------
+    dict
+        "literals": bytes between the slots. "slot_keys": b"FIPS" or the slot
+        number, in document order. "slot_info": (scc, pollutant, reporting
+        period type code, template value) by slot number.
+    """
+    location_elem = copy.deepcopy(xml_shell["location_templ"])
+    fips_elem = location_elem.find("payload:StateAndCountyFIPSCode", ns)
+    fips_elem.text = "__SLOT_FIPS__"
+    locationemissionsprocess_template = location_elem.find(
+        "payload:LocationEmissionsProcess", ns
+    )
+    location_elem.remove(locationemissionsprocess_template)
+    slot_info = []
+    for scc in non_point_scc_list:
+        locationemissionsprocess_elem = copy.deepcopy(
+            locationemissionsprocess_template
+        )
+        scc_elem = locationemissionsprocess_elem.find(
+            "payload:SourceClassificationCode", ns
+        )
+        scc_elem.text = scc
+        for reporting_period_type in ("A", "O3D"):
+            reportingperiodemissions = locationemissionsprocess_elem.findall(
+                f"*/[payload:ReportingPeriodTypeCode='{reporting_period_type}']"
+                "/payload:ReportingPeriodEmissions",
+                ns,
+            )
+            for reportingperiodemission in reportingperiodemissions:
+                cur_pollutant = reportingperiodemission.find(
+                    "payload:PollutantCode", ns
+                ).text
+                cur_pollutant_emission = reportingperiodemission.find(
+                    "payload:TotalEmissions", ns
+                )
+                assert cur_pollutant_emission.text is not None, (
+                    "Template TotalEmissions should have a value. Empty "
+                    "elements serialize differently."
+                )
+                slot_info.append(
+                    (
+                        scc,
+                        cur_pollutant,
+                        reporting_period_type,
+                        cur_pollutant_emission.text,
+                    )
+                )
+                cur_pollutant_emission.text = f"__SLOT_{len(slot_info) - 1}__"
+        location_elem.append(locationemissionsprocess_elem)
+    location_block_parts = re.split(
+        rb"__SLOT_(FIPS|\d+)__",
+        get_location_block(location_elem, xml_shell["depth_shell"]),
+    )
+    return {
+        "literals": location_block_parts[0::2],
+        "slot_keys": [
+            slot_key if slot_key == b"FIPS" else int(slot_key)
+            for slot_key in location_block_parts[1::2]
+        ],
+        "slot_info": slot_info,
+    }
+
+
+def get_emis_slot_array(
+    emisquant_value_index, location_templ_compiled: dict, tx_counties_list
+) -> dict:
+    """
+    Get the emissions by county (rows) and compiled template slot (columns).
+    Slots of a county and SCC without data are flagged in "has_data" and keep
+    the template value.
+    """
+    emis_slot_array = np.zeros(
+        (len(tx_counties_list), len(location_templ_compiled["slot_info"]))
+    )
+    has_data = np.zeros(emis_slot_array.shape, dtype=bool)
+    for county_idx, county in enumerate(tx_counties_list):
+        for slot_idx, (scc, pollutant, reporting_period_type, _) in enumerate(
+            location_templ_compiled["slot_info"]
+        ):
+            if (county, scc) in emisquant_value_index["county_scc"]:
+                emis_slot_array[county_idx, slot_idx] = float(
+                    emisquant_value_index["values"][
+                        (county, scc, pollutant, reporting_period_type)
+                    ]
+                )
+                has_data[county_idx, slot_idx] = True
+    return {"emis": emis_slot_array, "has_data": has_data}
+
+
+def render_location_block(
+    location_templ_compiled: dict, county, emis_slot_row, has_data_row
+) -> bytes:
+    """
+    Fill the compiled Location block slots of a county. Emissions are written
+    with repr, which gives the same text as pandas astype(str).
+    """
+    slot_text = [
+        repr(emis).encode() if has_data else templ_value.encode()
+        for emis, has_data, (_, _, _, templ_value) in zip(
+            emis_slot_row.tolist(),
+            has_data_row.tolist(),
+            location_templ_compiled["slot_info"],
+        )
+    ]
+    fips_text = xml_escape(f"{county}").encode()
+    location_block_parts = [location_templ_compiled["literals"][0]]
+    for slot_key, literal in zip(
+        location_templ_compiled["slot_keys"], location_templ_compiled["literals"][1:]
+    ):
+        location_block_parts.append(
+            fips_text if slot_key == b"FIPS" else slot_text[slot_key]
+        )
+        location_block_parts.append(literal)
+    return b"".join(location_block_parts)
+
+
+@profile_stage
+def write_uncntr_cntr_xml_stream(
+    path_xml_templ,
+    emisquant_value_index,
+    tx_counties_list,
+    non_point_scc_list,
+    doc_id,
+    path_out_xml,
+    year_=None,
+    creation_datetime_=None,
+) -> None:
+    """
+    Write the uncontrolled or controlled CERS xml one county Location block
+    at a time. Counties and SCCs without emissions keep the template values.
+
+    Parameters
+    ----------
+    emisquant_value_index:
+        Output of get_emisquant_value_index.
+    year_:
+        Emissions year. The template year is kept when None.
+    creation_datetime_:
+        Header CreationDateTime. The current time is used when None.
+    """
+    register_all_namespaces(path_xml_templ)
+    xml_shell = get_xml_shell(
+        path_xml_templ=path_xml_templ,
+        doc_id=doc_id,
+        year_=year_,
+        creation_datetime_=creation_datetime_,
+    )
+    location_templ_compiled = compile_location_templ(
+        xml_shell=xml_shell, non_point_scc_list=non_point_scc_list
+    )
+    emis_slot_array = get_emis_slot_array(
+        emisquant_value_index=emisquant_value_index,
+        location_templ_compiled=location_templ_compiled,
+        tx_counties_list=tx_counties_list,
+    )
+    with open(path_out_xml, "wb") as fo:
+        fo.write(xml_shell["head"])
+        for county_idx, county in enumerate(tx_counties_list):
+            fo.write(
+                render_location_block(
+                    location_templ_compiled=location_templ_compiled,
+                    county=county,
+                    emis_slot_row=emis_slot_array["emis"][county_idx],
+                    has_data_row=emis_slot_array["has_data"][county_idx],
+                )
+            )
+        fo.write(xml_shell["tail"])
@@ -0,0 +1,211 @@
+"""
+Apply the emission control strategies to the aggregate emission quantities
+in one pass. Each strategy declares a multiplicative factor or an additive
+offset (in US tons) over a subset of the control keys: county, SCC
+description, pollutant, and year. The strategies are looked up once into
+arrays aligned with the emission rows, and the controlled and uncontrolled
+totals are computed from the same arrays.
+"""
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
+from locoei.profiling import profile_stage
+
+CONTROL_KEY_COLS = ("stcntyfips", "scc_description_level_4", "pollutant", "year")
+CONTROL_DEFAULTS = {"factor": 1.0, "offset": 0.0}
+# prefix: prefix of the variant emission quantity columns.
+# cols: output columns of the variant, after the base and strategy columns.
+CONTROL_VARIANTS = {
+    "cntr": {
+        "prefix": "controlled",
+        "cols": ["controlled_em_quant", "controlled_em_quant_ton"],
+    },
+    "uncntr": {
+        "prefix": "uncontrolled",
+        "cols": ["em_quant_ton", "uncontrolled_em_quant_ton"],
+    },
+}
+
+ControlStrategy = namedtuple(
+    "ControlStrategy",
+    ["name", "kind", "variant", "values", "value_col", "attr_cols"],
+)
+ControlStrategy.__doc__ = """
+An emission control strategy.
+
+name:
+    Unique strategy name.
+kind:
+    "factor": em_quant is multiplied by value_col.
+    "offset": value_col (US tons) is added to the emission quantity in tons.
+variant:
+    Key of CONTROL_VARIANTS: "cntr" for the controlled emissions or
+    "uncntr" for the uncontrolled emissions.
+values:
+    Dataframe with the key columns (a subset of CONTROL_KEY_COLS), value_col,
+    and attr_cols. The key columns are unique. Emission rows without a match
+    get the default value of the kind (factor 1, offset 0).
+value_col:
+    Factor or offset column.
+attr_cols:
+    Columns of values copied to the matched emission rows, e.g. the region of
+    a DERI offset. NaN for the rows without a match.
+"""
+
+
+def get_control_key_cols(strategy_: ControlStrategy) -> list:
+    """Key columns of the strategy values, in CONTROL_KEY_COLS order."""
+    return [col for col in CONTROL_KEY_COLS if col in strategy_.values.columns]
+
+
+def get_key_codes(key_vals_, uniques) -> np.ndarray:
+    """Position of each of key_vals_ in uniques; -1 when not in uniques.
+    Categoricals are looked up by category."""
+    uniques = pd.Index(uniques)
+    if isinstance(key_vals_.dtype, pd.CategoricalDtype):
+        cat_codes = uniques.get_indexer(key_vals_.cat.categories)
+        key_cat_codes = key_vals_.cat.codes.to_numpy()
+        return np.where(key_cat_codes >= 0, cat_codes[key_cat_codes], -1)
+    return uniques.get_indexer(key_vals_)
+
+
+def get_control_row_idx(
+    emis_quant_agg_: pd.DataFrame, strategy_values_: pd.DataFrame, key_cols
+) -> np.ndarray:
+    """
+    Get the strategy_values_ row matching each emission row on key_cols; -1
+    when there is no match. The key values are coded per column and the codes
+    combined into one integer, so the lookup runs on integer arrays.
+    """
+    emis_codes = np.zeros(len(emis_quant_agg_), dtype=np.int64)
+    strategy_codes = np.zeros(len(strategy_values_), dtype=np.int64)
+    no_match = np.zeros(len(emis_quant_agg_), dtype=bool)
+    n_codes = 1
+    for col in key_cols:
+        col_uniques = pd.unique(strategy_values_[col].dropna().to_numpy())
+        col_emis_codes = get_key_codes(emis_quant_agg_[col], col_uniques)
+        no_match |= col_emis_codes == -1
+        emis_codes = emis_codes * len(col_uniques) + col_emis_codes
+        strategy_codes = strategy_codes * len(col_uniques) + get_key_codes(
+            strategy_values_[col], col_uniques
+        )
+        n_codes *= len(col_uniques)
+    assert len(np.unique(strategy_codes)) == len(strategy_codes), (
+        f"Control keys {key_cols} are not unique."
+    )
+    strategy_row_by_code = np.full(n_codes, -1)
+    strategy_row_by_code[strategy_codes] = np.arange(len(strategy_values_))
+    return np.where(
+        no_match, -1, strategy_row_by_code[np.where(no_match, 0, emis_codes)]
+    )
+
+
+@profile_stage
+def apply_controls(
+    emis_quant_agg_: pd.DataFrame, strategies, us_ton_to_grams=907185
+) -> pd.DataFrame:
+    """
+    Apply the control strategies to emis_quant_agg_ in one pass.
+
+    Parameters
+    ----------
+    emis_quant_agg_:
+        Aggregate emission quantities (grams) with the CONTROL_KEY_COLS.
+    strategies:
+        List of ControlStrategy.
+    us_ton_to_grams:
+        Grams per US ton.
+
+    Returns
+    -------
+    pd.DataFrame
+        emis_quant_agg_ columns, the value and attribute columns of each
+        strategy, em_quant_ton, and the controlled and uncontrolled emission
+        quantities in grams and tons. The variant emission quantity is
+        em_quant times the factors of the variant, plus its offsets.
+    """
+    strategy_nms = [strategy.name for strategy in strategies]
+    assert len(set(strategy_nms)) == len(strategy_nms), "Duplicate strategies."
+    emis_quant_ctrl = emis_quant_agg_.reset_index(drop=True)
+    em_quant = emis_quant_ctrl.em_quant.to_numpy()
+    variant_arrays = {
+        variant: {"factor": np.ones(len(em_quant)), "offset": None}
+        for variant in CONTROL_VARIANTS
+    }
+    strategy_cols = {}
+    for strategy in strategies:
+        assert strategy.kind in CONTROL_DEFAULTS, f"Unknown kind {strategy.kind}."
+        assert (
+            strategy.variant in CONTROL_VARIANTS
+        ), f"Unknown variant {strategy.variant}."
+        row_idx = get_control_row_idx(
+            emis_quant_ctrl, strategy.values, get_control_key_cols(strategy)
+        )
+        strategy_values = strategy.values.reset_index(drop=True)
+        for col in list(strategy.attr_cols) + [strategy.value_col]:
+            # reindex on the row positions puts NaN for the rows without a
+            # match (-1).
+            strategy_cols[col] = strategy_values[col].reindex(row_idx).to_numpy()
+        strategy_vals = np.nan_to_num(
+            strategy_cols[strategy.value_col].astype(float),
+            nan=CONTROL_DEFAULTS[strategy.kind],
+        )
+        strategy_cols[strategy.value_col] = strategy_vals
+        variant_array = variant_arrays[strategy.variant]
+        if strategy.kind == "factor":
+            variant_array["factor"] = variant_array["factor"] * strategy_vals
+        elif variant_array["offset"] is None:
+            variant_array["offset"] = strategy_vals
+        else:
+            variant_array["offset"] = variant_array["offset"] + strategy_vals
+    variant_cols = {"em_quant_ton": em_quant / us_ton_to_grams}
+    for variant, variant_array in variant_arrays.items():
+        variant_prefix = CONTROL_VARIANTS[variant]["prefix"]
+        variant_em_quant = em_quant * variant_array["factor"]
+        variant_em_quant_ton = variant_em_quant / us_ton_to_grams
+        if variant_array["offset"] is not None:
+            variant_em_quant = (
+                variant_em_quant + variant_array["offset"] * us_ton_to_grams
+            )
+            variant_em_quant_ton = variant_em_quant_ton + variant_array["offset"]
+        variant_cols[f"{variant_prefix}_em_quant"] = variant_em_quant
+        variant_cols[f"{variant_prefix}_em_quant_ton"] = variant_em_quant_ton
+    return emis_quant_ctrl.assign(**strategy_cols, **variant_cols)
+
+
+def get_control_variant(
+    emis_quant_ctrl_: pd.DataFrame, strategies, variant: str
+) -> pd.DataFrame:
+    """
+    Select the columns of one variant from the apply_controls output: the
+    emission quantity columns, the columns of the strategies of the variant,
+    and the CONTROL_VARIANTS output columns of the variant.
+    """
+    strategy_cols = {
+        col
+        for strategy in strategies
+        for col in list(strategy.attr_cols) + [strategy.value_col]
+    }
+    variant_strategy_cols = [
+        col
+        for strategy in strategies
+        if strategy.variant == variant
+        for col in list(strategy.attr_cols) + [strategy.value_col]
+    ]
+    variant_out_cols = {"em_quant_ton"} | {
+        f"{variant_info['prefix']}_em_quant{suffix}"
+        for variant_info in CONTROL_VARIANTS.values()
+        for suffix in ["", "_ton"]
+    }
+    base_cols = [
+        col
+        for col in emis_quant_ctrl_.columns
+        if (col not in strategy_cols) and (col not in variant_out_cols)
+    ]
+    return emis_quant_ctrl_.filter(
+        items=base_cols + variant_strategy_cols + CONTROL_VARIANTS[variant]["cols"]
+    )
@@ -12,9 +12,14 @@ from locoei.utilis import (
     get_out_file_tsmp,
     cleanup_prev_output,
     xwalk_ssc_desc_4_rr_grp_netgrp,
+    read_excel_cached,
 )
+from locoei.emisrt import EmissionFactorCube
+from locoei.schema import cast_categoricals
+from locoei.profiling import profile_stage
 
 
+@profile_stage
 def process_proj_fac(
     path_proj_fac_: str,
     freight_rr_group=("Class I", "Class III"),
@@ -26,12 +31,11 @@ def process_proj_fac(
 
     Return projection factors by railroad groups.
     """
-    x1 = pd.ExcelFile(path_proj_fac_)
-    freight_proj_fac = x1.parse(
-        "Recommended_Proj", skiprows=1, usecols=["Year", "Freight"]
+    freight_proj_fac = read_excel_cached(
+        path_proj_fac_, "Recommended_Proj", skiprows=1, usecols=["Year", "Freight"]
     ).rename(columns={"Year": "year", "Freight": "proj_fac"})
-    pass_commute_proj_fac = x1.parse(
-        "Recommended_Proj", skiprows=1, usecols=["Year", "Passenger"]
+    pass_commute_proj_fac = read_excel_cached(
+        path_proj_fac_, "Recommended_Proj", skiprows=1, usecols=["Year", "Passenger"]
     ).rename(columns={"Year": "year", "Passenger": "proj_fac"})
 
     freight_proj_fac_1 = freight_proj_fac.assign(
@@ -55,7 +59,7 @@ def process_county(county_df_: pd.DataFrame) -> pd.DataFrame:
     county_df_fil_ = county_df_.filter(items=["CNTY_NM", "FIPS_ST_CNTY_CD"]).rename(
         columns={"CNTY_NM": "county_name", "FIPS_ST_CNTY_CD": "stcntyfips"}
     )
-    return county_df_fil_
+    return cast_categoricals(county_df_fil_)
 
 
 def project_filt_fuel_consump(
@@ -90,26 +94,110 @@ def project_filt_fuel_consump(
     return fuel_consump_prj_
 
 
+def get_proj_fac_array(proj_fac_: pd.DataFrame, rr_groups, years) -> np.ndarray:
+    """
+    Get the projection factors as a (rr_group x year) array. Missing
+    projection factors are null.
+    """
+    return (
+        proj_fac_.pivot(index="rr_group", columns="year", values="proj_fac")
+        .reindex(index=list(rr_groups), columns=list(years))
+        .to_numpy(dtype=float)
+    )
+
+
+@profile_stage
+def project_fuel_consump_by_cnty_grp(
+    fuel_consump_: pd.DataFrame,
+    proj_fac_: pd.DataFrame,
+    years=np.arange(2011, 2051),
+) -> pd.DataFrame:
+    """
+    Sum the 2019 link fuel consumption and miles by county, carrier, friylab,
+    rr_netgrp, and rr_group, then project the group fuel consumption to years.
+    The projection factors only depend on rr_group and year, so summing
+    before projecting gives the same totals as summing the projected link
+    fuel consumption (project_filt_fuel_consump), up to floating point
+    rounding. The projection factors are kept as a (rr_group x year) array,
+    so memory grows with groups x years instead of links x years.
+    """
+    grp_cols = ["stcntyfips", "carrier", "friylab", "rr_netgrp", "rr_group"]
+    # Links with a null group column are dropped, same as groupby.
+    fuel_consump_fil = (
+        fuel_consump_.filter(items=grp_cols + ["miles", "link_fuel_consmp"])
+        .dropna(subset=grp_cols)
+        .reset_index(drop=True)
+    )
+    grp_codes, grp_keys = pd.MultiIndex.from_frame(
+        fuel_consump_fil[grp_cols]
+    ).factorize(sort=True)
+    grp_fuel_consmp_miles = fuel_consump_fil.groupby(grp_codes)[
+        ["link_fuel_consmp", "miles"]
+    ].sum()
+    grp_rr_group_codes, rr_groups = pd.factorize(
+        grp_keys.get_level_values(grp_cols.index("rr_group"))
+    )
+    proj_fac_arr = get_proj_fac_array(proj_fac_, rr_groups=rr_groups, years=years)
+    # (year x group) outer product of the projection factors and group fuel.
+    # Null projected fuel sums to 0 in the link level groupby.
+    grp_fuel_consmp_by_yr = np.nan_to_num(
+        proj_fac_arr[grp_rr_group_codes].T
+        * grp_fuel_consmp_miles.link_fuel_consmp.to_numpy(),
+        nan=0.0,
+    )
+    grp_miles = grp_fuel_consmp_miles.miles.to_numpy()
+    fuel_consump_prj_by_grp = pd.DataFrame(
+        {"year": np.repeat(np.asarray(years, dtype=int), len(grp_keys))}
+    )
+    # Take the group columns from the first link of each group, so that the
+    # column dtypes (e.g. categoricals) are kept.
+    grp_first_rows = np.empty(len(grp_keys), dtype=np.int64)
+    grp_first_rows[grp_codes[::-1]] = np.arange(len(grp_codes))[::-1]
+    grp_rows = np.tile(grp_first_rows, len(years))
+    for grp_col in grp_cols:
+        fuel_consump_prj_by_grp[grp_col] = fuel_consump_fil[grp_col].array.take(
+            grp_rows
+        )
+    fuel_consump_prj_by_grp[
+        "county_carr_friy_yardnm_fuel_consmp_by_yr"
+    ] = grp_fuel_consmp_by_yr.ravel()
+    fuel_consump_prj_by_grp["county_carr_friy_yardnm_miles_by_yr"] = np.tile(
+        grp_miles, len(years)
+    )
+    return fuel_consump_prj_by_grp
+
+
 def merge_cnty_nm_to_fuel_proj(
     fuel_consump_prj_: pd.DataFrame, county_df_fil_: pd.DataFrame
 ) -> pd.DataFrame:
     """
     Add county names to the fuel consumption dataset.
     """
-    fuel_consump_prj_by_cnty_ = (
+    fuel_consump_prj_by_grp_ = (
         fuel_consump_prj_.groupby(
-            ["year", "stcntyfips", "carrier", "friylab", "rr_netgrp", "rr_group"]
+            ["year", "stcntyfips", "carrier", "friylab", "rr_netgrp", "rr_group"],
+            observed=True,
         )
         .agg(
             county_carr_friy_yardnm_fuel_consmp_by_yr=("link_fuel_consmp_by_yr", "sum"),
             county_carr_friy_yardnm_miles_by_yr=("miles", "sum"),
         )
         .reset_index()
-        .merge(county_df_fil_, on="stcntyfips", how="outer")
     )
-    return fuel_consump_prj_by_cnty_
+    return merge_cnty_nm_to_fuel_proj_grp(fuel_consump_prj_by_grp_, county_df_fil_)
+
+
+def merge_cnty_nm_to_fuel_proj_grp(
+    fuel_consump_prj_by_grp_: pd.DataFrame, county_df_fil_: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Add county names to the fuel consumption dataset summed by year and
+    county, carrier, friylab, rr_netgrp, and rr_group.
+    """
+    return fuel_consump_prj_by_grp_.merge(county_df_fil_, on="stcntyfips", how="outer")
 
 
+@profile_stage
 def add_scc_desc_to_fuel_proj_cnty(
     fuel_consump_prj_by_cnty_: pd.DataFrame,
     xwalk_ssc_desc_4_rr_grp_netgrp=xwalk_ssc_desc_4_rr_grp_netgrp,
@@ -117,17 +205,21 @@ def add_scc_desc_to_fuel_proj_cnty(
     """
     Add EPA SCC description to fuel consumption + county name + Projection data.
     """
-    xwalk_ssc_desc_4_rr_grp_netgrp_df_ = pd.read_csv(
-        xwalk_ssc_desc_4_rr_grp_netgrp, sep=","
-    ).assign(
-        scc_description_level_4=lambda df: (df.scc_description_level_4.str.strip())
+    # The default xwalk is a module level StringIO; rewind it so the function
+    # can be called more than once.
+    xwalk_ssc_desc_4_rr_grp_netgrp.seek(0)
+    xwalk_ssc_desc_4_rr_grp_netgrp_df_ = cast_categoricals(
+        pd.read_csv(xwalk_ssc_desc_4_rr_grp_netgrp, sep=",").assign(
+            scc_description_level_4=lambda df: (df.scc_description_level_4.str.strip())
+        )
     )
 
+    # Subset checks so that states without Amtrak, DART, or TREX pass.
     assert set(
         fuel_consump_prj_by_cnty_.loc[
             lambda df: (df.rr_group == "Passenger"), "rr_netgrp"
         ].unique()
-    ) == {"Freight"}, (
+    ) <= {"Freight"}, (
         "Above mapping does not consider Amtrak on industrial leads and "
         "yards. This is inline with how fuel consumption is coded for Amtrak."
     )
@@ -137,7 +229,7 @@ def add_scc_desc_to_fuel_proj_cnty(
             lambda df: ((df.rr_group == "Commuter") & (df.carrier == "DART")),
             "rr_netgrp",
         ].unique()
-    ) == {"Freight"}, (
+    ) <= {"Freight"}, (
         "Above mapping does not consider DART on industrial leads and "
         "yards. This is inline with how fuel consumption is coded for DART."
     )
@@ -147,7 +239,7 @@ def add_scc_desc_to_fuel_proj_cnty(
             lambda df: ((df.rr_group == "Commuter") & (df.carrier == "TREX")),
             "rr_netgrp",
         ].unique()
-    ) == {"Freight", "Industrial", "Yard"}, (
+    ) <= {"Freight", "Industrial", "Yard"}, (
         "Above mapping considers TREX on Freight, industrial leads, and "
         "yards. This is inline with how fuel consumption is coded for TREX."
     )
@@ -158,17 +250,23 @@ def add_scc_desc_to_fuel_proj_cnty(
     return fuel_consump_prj_by_cnty_scc_
 
 
-def prc_ertac_2017_yard_vals(path_ertac_2017_: str, fuel_consump_: pd.DataFrame):
+def prc_ertac_2017_yard_vals(
+    path_ertac_2017_: str, fuel_consump_: pd.DataFrame, state_fips=48
+):
     """
-    Clean fuel consumption by yard from ERTAC 2017 data.
+    Clean fuel consumption by yard from ERTAC 2017 data for the state with
+    FIPS code state_fips (48: Texas).
     """
-    x1 = pd.ExcelFile(path_ertac_2017_)
-    ertac_2017_yard = x1.parse("2017 Emissions", usecols=range(0, 39))
+    ertac_2017_yard = read_excel_cached(
+        path_ertac_2017_, "2017 Emissions", usecols=range(0, 39)
+    )
     ertac_2017_yard_tx = (
         ertac_2017_yard.rename(
             columns=get_snake_case_dict(columns=ertac_2017_yard.columns)
         )
-        .loc[lambda df: (df.state_id == 48) & (df.final_2016_fuel_use != 0)]
+        .loc[
+            lambda df: (df.state_id == state_fips) & (df.final_2016_fuel_use != 0)
+        ]
         .rename(columns={"yard_name": "yardname_v1", "fips": "stcntyfips"})
         .filter(
             items=[
@@ -184,6 +282,7 @@ def prc_ertac_2017_yard_vals(path_ertac_2017_: str, fuel_consump_: pd.DataFrame)
     return ertac_2017_yard_tx
 
 
+@profile_stage
 def distr_yard_fuel_usage_by_ertac_2017_yard_vals(
     fuel_consump_prj_by_cnty_scc_: pd.DataFrame, ertac_2017_yard_vals_: pd.DataFrame
 ):
@@ -222,13 +321,16 @@ def distr_yard_fuel_usage_by_ertac_2017_yard_vals(
         fuel_consump_prj_by_cnty_scc_.loc[
             lambda df: df.scc_description_level_4 == "Yard Locomotives"
         ]
-        .groupby(["year", "stcntyfips", "county_name", "scc_description_level_4"])
+        .groupby(
+            ["year", "stcntyfips", "county_name", "scc_description_level_4"],
+            observed=True,
+        )
         .county_carr_friy_yardnm_fuel_consmp_by_yr.sum()
         .reset_index()
         .assign(
             st_yard_industrial_fuel_consmp_by_yr=lambda df: (
                 df.groupby("year").county_carr_friy_yardnm_fuel_consmp_by_yr.transform(
-                    sum
+                    "sum"
                 )
             ),
             county_carr_friy_yardnm_fuel_consmp_by_yr=np.nan,
@@ -236,7 +338,7 @@ def distr_yard_fuel_usage_by_ertac_2017_yard_vals(
         .merge(ertac_2017_yard_vals_, on=["stcntyfips"])
         .assign(
             tot_st_yard_fuel_usage=lambda df: (
-                df.groupby(["year"]).final_2016_fuel_use.transform(sum)
+                df.groupby(["year"]).final_2016_fuel_use.transform("sum")
             ),
             state_to_yard_mix=lambda df: (
                 df.final_2016_fuel_use / df.tot_st_yard_fuel_usage
@@ -267,6 +369,13 @@ def distr_yard_fuel_usage_by_ertac_2017_yard_vals(
                 "site_longitude",
             ]
         )
+        # Same dtypes as the non-yard rows so that the concat keeps them.
+        .astype(
+            {
+                col: fuel_consump_prj_by_cnty_scc_not_yards[col].dtype
+                for col in ["carrier", "friylab", "rr_netgrp", "rr_group"]
+            }
+        )
     )
 
     test_fuel_df = pd.merge(
@@ -296,31 +405,310 @@ def distr_yard_fuel_usage_by_ertac_2017_yard_vals(
     return fuel_consump_prj_by_cnty_scc_prc
 
 
+@profile_stage
+def apply_emis_fac_cube(
+    fuel_consump_prj_by_cnty_scc_prc_: pd.DataFrame,
+    emis_fac_cube_: EmissionFactorCube,
+) -> pd.DataFrame:
+    """
+    Multiply the fuel consumption by the emission factors of every pollutant
+    of the row's SCC and year. The emission factors are looked up in the cube
+    by the integer scc and year codes of the rows and broadcast against the
+    fuel consumption, instead of merging the long emission rate table on
+    scc_description_level_4 and year.
+
+    Rows without emission factors are kept with null emission factors, as in
+    an outer merge. Emission factors without fuel consumption rows are
+    dropped; they have no county.
+    """
+    # Same row order as the outer merge on scc_description_level_4 and year.
+    fuel_consump_ = fuel_consump_prj_by_cnty_scc_prc_.sort_values(
+        ["scc_description_level_4", "year"], kind="stable"
+    ).reset_index(drop=True)
+    scc_codes = emis_fac_cube_.get_scc_codes(fuel_consump_.scc_description_level_4)
+    yr_codes = emis_fac_cube_.get_year_codes(fuel_consump_.year)
+    matched_rows = np.flatnonzero((scc_codes >= 0) & (yr_codes >= 0))
+    # (row x pollutant) emission factors.
+    em_fac_by_row = emis_fac_cube_.em_fac[
+        scc_codes[matched_rows], :, yr_codes[matched_rows]
+    ]
+    row_idx, pol_idx = np.nonzero(emis_fac_cube_.has_em_fac[scc_codes[matched_rows]])
+    em_fac = em_fac_by_row[row_idx, pol_idx]
+    fuel_rows = matched_rows[row_idx]
+    scc_rate_cols = [
+        col for col in emis_fac_cube_.scc_cols if col not in fuel_consump_.columns
+    ]
+    emis_quant_ = fuel_consump_.take(fuel_rows).reset_index(drop=True)
+    for col in scc_rate_cols:
+        emis_quant_[col] = emis_fac_cube_.scc_df[col].array.take(scc_codes[fuel_rows])
+    for col in emis_fac_cube_.pol_cols:
+        emis_quant_[col] = emis_fac_cube_.pol_df[col].array.take(pol_idx)
+    emis_quant_["em_fac"] = em_fac
+    if len(matched_rows) < len(fuel_consump_):
+        emis_quant_ = pd.concat(
+            [emis_quant_, fuel_consump_.drop(index=matched_rows)], ignore_index=True
+        )
+    emis_quant_["em_quant"] = (
+        emis_quant_.em_fac * emis_quant_.county_carr_friy_yardnm_fuel_consmp_by_yr
+    )
+    emis_quant_["year"] = emis_quant_.year.astype("Int32")
+    return emis_quant_
+
+
+EMIS_QUANT_DIMS = {
+    "county": {
+        "key": "stcntyfips",
+        "natural_key": ["stcntyfips"],
+        "cols": ["stcntyfips", "county_name"],
+    },
+    "scc": {
+        "key": "scc_id",
+        "natural_key": ["scc"],
+        "cols": [
+            "dat_cat_code",
+            "sector_description",
+            "scc_description_level_1",
+            "scc_description_level_2",
+            "scc_description_level_3",
+            "scc",
+            "scc_description_level_4",
+        ],
+    },
+    "facility": {
+        "key": "facility_id",
+        "natural_key": ["eis_facility_id", "yardname_v1"],
+        "cols": ["eis_facility_id", "yardname_v1"],
+        "attr_cols": ["site_latitude", "site_longitude"],
+    },
+    "pollutant": {
+        "key": "pollutant_id",
+        "natural_key": ["pollutant"],
+        "cols": ["pol_type", "pollutant", "pol_desc"],
+    },
+}
+EMIS_QUANT_AGG_COLS = [
+    "year",
+    "stcntyfips",
+    "county_name",
+    "dat_cat_code",
+    "sector_description",
+    "scc_description_level_1",
+    "scc_description_level_2",
+    "scc_description_level_3",
+    "scc",
+    "scc_description_level_4",
+    "eis_facility_id",
+    "yardname_v1",
+    "pol_type",
+    "pollutant",
+    "pol_desc",
+    "em_fac",
+    "em_quant",
+    "county_carr_friy_yardnm_fuel_consmp_by_yr",
+    "county_carr_friy_yardnm_miles_by_yr",
+    "site_latitude",
+    "site_longitude",
+]
+
+
+def get_row_codes(df_: pd.DataFrame, cols) -> np.ndarray:
+    """Get integer codes for the unique combinations of cols in df_ rows."""
+    codes = np.zeros(len(df_), dtype=np.int64)
+    for col in cols:
+        col_codes, col_uniques = pd.factorize(df_[col])
+        codes = codes * len(col_uniques) + col_codes
+    return pd.factorize(codes)[0]
+
+
+def get_emis_quant_dim(emis_quant_: pd.DataFrame, dim_: dict) -> dict:
+    """
+    Get a dimension table from the emission quantity rows. The dimension ids
+    follow the sort order of the dimension columns, so that a groupby on the
+    ids sorts the same way as a groupby on the columns. Dimension rows with
+    missing values in the dimension columns are dropped.
+
+    Returns
+    -------
+    dict
+        dim: dimension table with the dimension key as the first column.
+        row_keys: dimension key of every emis_quant_ row.
+        row_valid: False for the emis_quant_ rows without a dimension row.
+    """
+    dim_cols = dim_["cols"] + dim_.get("attr_cols", [])
+    codes = get_row_codes(emis_quant_, dim_["natural_key"])
+    first_rows = np.empty(codes.max() + 1, dtype=np.int64)
+    first_rows[codes[::-1]] = np.arange(len(codes))[::-1]
+    dim = emis_quant_[dim_cols].take(first_rows).reset_index(drop=True)
+    # Rows with a missing natural key are dropped, so their other columns are
+    # not checked.
+    key_valid = emis_quant_[dim_["natural_key"]].notna().all(axis=1).to_numpy()
+    for col in dim_cols:
+        row_vals = emis_quant_[col].to_numpy()
+        dim_vals = dim[col].to_numpy()[codes]
+        diff_rows = np.flatnonzero((row_vals != dim_vals) & key_valid)
+        assert (
+            pd.isna(row_vals[diff_rows]) & pd.isna(dim_vals[diff_rows])
+        ).all(), f"{col} should only have one value per {dim_['natural_key']}."
+    dim_valid = dim[dim_["cols"]].notna().all(axis=1).to_numpy()
+    row_valid = dim_valid[codes]
+    dim = dim.loc[dim_valid]
+    if dim_["key"] in dim_["natural_key"]:
+        row_keys = emis_quant_[dim_["key"]].to_numpy()
+        dim = dim.sort_values(dim_["cols"]).reset_index(drop=True)
+    else:
+        dim_ids = np.full(len(dim_valid), -1, dtype=np.int64)
+        dim_ids[dim_valid] = dim.groupby(
+            dim_["cols"], sort=True, observed=True
+        ).ngroup()
+        row_keys = dim_ids[codes]
+        dim.insert(0, dim_["key"], dim_ids[dim_valid])
+        dim = dim.sort_values(dim_["key"]).reset_index(drop=True)
+    return {"dim": dim, "row_keys": row_keys, "row_valid": row_valid}
+
+
+@profile_stage
+def get_emis_quant_star(
+    emis_quant_: pd.DataFrame, emis_quant_dims_=EMIS_QUANT_DIMS
+) -> dict:
+    """
+    Aggregate the emission quantities into a fact table with integer keys
+    (year, stcntyfips, scc_id, facility_id, pollutant_id) and dimension tables
+    with the county, scc, facility, and pollutant descriptions. The groupby
+    runs on the integer keys; the descriptions are joined back with
+    join_emis_quant_dims. Rows with missing keys or descriptions are dropped,
+    as in a groupby on the descriptive columns.
+
+    Returns
+    -------
+    dict
+        emis_quant_fact: aggregate emission quantities by the integer keys.
+        emis_quant_dims: dict of dimension tables.
+    """
+    emis_quant_keys = pd.DataFrame({"year": emis_quant_.year.array})
+    row_valid = emis_quant_.year.notna().to_numpy()
+    emis_quant_dims = {}
+    for dim_nm, dim_ in emis_quant_dims_.items():
+        emis_quant_dim = get_emis_quant_dim(emis_quant_, dim_)
+        emis_quant_keys[dim_["key"]] = emis_quant_dim["row_keys"]
+        row_valid &= emis_quant_dim["row_valid"]
+        emis_quant_dims[dim_nm] = emis_quant_dim["dim"]
+    measure_cols = [
+        "em_fac",
+        "em_quant",
+        "county_carr_friy_yardnm_fuel_consmp_by_yr",
+        "county_carr_friy_yardnm_miles_by_yr",
+    ]
+    for col in measure_cols:
+        emis_quant_keys[col] = emis_quant_[col].to_numpy()
+    emis_quant_fact = (
+        emis_quant_keys.loc[row_valid]
+        .groupby(["year"] + [dim_["key"] for dim_ in emis_quant_dims_.values()])
+        .agg(
+            em_fac=("em_fac", "mean"),
+            em_quant=("em_quant", "sum"),
+            county_carr_friy_yardnm_fuel_consmp_by_yr=(
+                "county_carr_friy_yardnm_fuel_consmp_by_yr",
+                "sum",
+            ),
+            county_carr_friy_yardnm_miles_by_yr=(
+                "county_carr_friy_yardnm_miles_by_yr",
+                "sum",
+            ),
+        )
+        .reset_index()
+    )
+    return {"emis_quant_fact": emis_quant_fact, "emis_quant_dims": emis_quant_dims}
+
+
+@profile_stage
+def join_emis_quant_dims(
+    emis_quant_fact_: pd.DataFrame,
+    emis_quant_dims_: dict,
+    emis_quant_dim_defs_=EMIS_QUANT_DIMS,
+) -> pd.DataFrame:
+    """
+    Join the dimension descriptions to the emission quantity fact table. The
+    columns are in the emis_quant_agg order (EMIS_QUANT_AGG_COLS).
+    """
+    emis_quant_agg = emis_quant_fact_.copy()
+    for dim_nm, dim_ in emis_quant_dim_defs_.items():
+        dim = emis_quant_dims_[dim_nm].set_index(dim_["key"])
+        dim_rows = dim.index.get_indexer(emis_quant_fact_[dim_["key"]])
+        assert (dim_rows >= 0).all(), f"Fact table has keys missing from {dim_nm}."
+        dim_vals = dim.take(dim_rows)
+        for col in dim_vals.columns:
+            emis_quant_agg[col] = dim_vals[col].array
+    return emis_quant_agg.filter(items=EMIS_QUANT_AGG_COLS)
+
+
+@profile_stage
 def get_emis_quant(
     path_fuel_consump_: str,
     path_emis_rt_: str,
     path_proj_fac_: str,
     path_county_: str,
     path_ertac_2017_: str,
+    link_resolution=False,
 ) -> dict:
     """
     Get the emission quantity using the fuel consumption, emission rates,
     projection factors, and county name datasets.
+
+    The link fuel consumption is summed by county, carrier, friylab,
+    rr_netgrp, and rr_group before it is projected. Set link_resolution to
+    True to project every link instead; the projected link fuel consumption
+    is then also returned as fuel_consump_prj.
+    """
+    fuel_consump_ = cast_categoricals(pd.read_csv(path_fuel_consump_, index_col=0))
+    emis_rt_ = cast_categoricals(pd.read_csv(path_emis_rt_, index_col=0))
+    return get_emis_quant_from_df(
+        fuel_consump_=fuel_consump_,
+        emis_rt_=emis_rt_,
+        path_proj_fac_=path_proj_fac_,
+        path_county_=path_county_,
+        path_ertac_2017_=path_ertac_2017_,
+        link_resolution=link_resolution,
+    )
+
+
+@profile_stage
+def get_emis_quant_from_df(
+    fuel_consump_: pd.DataFrame,
+    emis_rt_: pd.DataFrame,
+    path_proj_fac_: str,
+    path_county_: str,
+    path_ertac_2017_: str,
+    state_fips=48,
+    link_resolution=False,
+) -> dict:
+    """
+    Same as get_emis_quant, but takes the fuel consumption and emission rate
+    dataframes directly instead of reading them from csv files. emis_rt_ can
+    be the long emission rate table or an EmissionFactorCube. state_fips
+    selects the ERTAC yards of the state.
     """
-    fuel_consump_ = pd.read_csv(path_fuel_consump_, index_col=0)
-    emis_rt_ = pd.read_csv(path_emis_rt_, index_col=0)
     proj_fac_ = process_proj_fac(path_proj_fac_)
     county_df_ = pd.read_csv(path_county_)
     county_df_fil_ = process_county(county_df_)
-    fuel_consump_prj_ = project_filt_fuel_consump(fuel_consump_, proj_fac_)
-    fuel_consump_prj_by_cnty_ = merge_cnty_nm_to_fuel_proj(
-        fuel_consump_prj_, county_df_fil_
-    )
+    if link_resolution:
+        fuel_consump_prj_ = project_filt_fuel_consump(fuel_consump_, proj_fac_)
+        fuel_consump_prj_by_cnty_ = merge_cnty_nm_to_fuel_proj(
+            fuel_consump_prj_, county_df_fil_
+        )
+    else:
+        fuel_consump_prj_by_grp_ = project_fuel_consump_by_cnty_grp(
+            fuel_consump_, proj_fac_
+        )
+        fuel_consump_prj_by_cnty_ = merge_cnty_nm_to_fuel_proj_grp(
+            fuel_consump_prj_by_grp_, county_df_fil_
+        )
     fuel_consump_prj_by_cnty_scc_ = add_scc_desc_to_fuel_proj_cnty(
         fuel_consump_prj_by_cnty_
     )
     ertac_2017_yard_vals = prc_ertac_2017_yard_vals(
-        path_ertac_2017_=path_ertac_2017_, fuel_consump_=fuel_consump_
+        path_ertac_2017_=path_ertac_2017_,
+        fuel_consump_=fuel_consump_,
+        state_fips=state_fips,
     )
 
     fuel_consump_prj_by_cnty_scc_prc = distr_yard_fuel_usage_by_ertac_2017_yard_vals(
@@ -328,59 +716,28 @@ def get_emis_quant(
         ertac_2017_yard_vals_=ertac_2017_yard_vals,
     )
 
-    emis_quant_ = (
-        fuel_consump_prj_by_cnty_scc_prc.merge(
-            emis_rt_,
-            left_on=["scc_description_level_4", "year"],
-            right_on=["scc_description_level_4", "anals_yr"],
-            how="outer",
-        )
-        .assign(
-            em_quant=lambda df: df.em_fac
-            * df.county_carr_friy_yardnm_fuel_consmp_by_yr,
-            year=lambda df: df.year.astype("Int32"),
-        )
-        .drop(columns=["anals_yr", "em_units"])
+    if not isinstance(emis_rt_, EmissionFactorCube):
+        emis_rt_ = EmissionFactorCube.from_long(emis_rt_)
+    emis_quant_ = apply_emis_fac_cube(
+        fuel_consump_prj_by_cnty_scc_prc_=fuel_consump_prj_by_cnty_scc_prc,
+        emis_fac_cube_=emis_rt_,
     )
 
-    emis_quant_agg = (
-        emis_quant_.groupby(
-            [
-                "year",
-                "stcntyfips",
-                "county_name",
-                "dat_cat_code",
-                "sector_description",
-                "scc_description_level_1",
-                "scc_description_level_2",
-                "scc_description_level_3",
-                "scc",
-                "scc_description_level_4",
-                "eis_facility_id",
-                "yardname_v1",
-                "pol_type",
-                "pollutant",
-                "pol_desc",
-            ]
-        )
-        .agg(
-            em_fac=("em_fac", "mean"),
-            em_quant=("em_quant", "sum"),
-            county_carr_friy_yardnm_fuel_consmp_by_yr=(
-                "county_carr_friy_yardnm_fuel_consmp_by_yr",
-                "sum",
-            ),
-            county_carr_friy_yardnm_miles_by_yr=(
-                "county_carr_friy_yardnm_miles_by_yr",
-                "sum",
-            ),
-            site_latitude=("site_latitude", "first"),
-            site_longitude=("site_longitude", "first"),
-        )
-        .reset_index()
+    emis_quant_star = get_emis_quant_star(emis_quant_)
+    emis_quant_agg = join_emis_quant_dims(
+        emis_quant_fact_=emis_quant_star["emis_quant_fact"],
+        emis_quant_dims_=emis_quant_star["emis_quant_dims"],
     )
 
-    return {"emis_quant": emis_quant_, "emis_quant_agg": emis_quant_agg}
+    emis_quant_res = {
+        "emis_quant": emis_quant_,
+        "emis_quant_agg": emis_quant_agg,
+        "emis_quant_fact": emis_quant_star["emis_quant_fact"],
+        "emis_quant_dims": emis_quant_star["emis_quant_dims"],
+    }
+    if link_resolution:
+        emis_quant_res["fuel_consump_prj"] = fuel_consump_prj_
+    return emis_quant_res
 
 
 if __name__ == "__main__":
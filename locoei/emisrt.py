@@ -6,11 +6,20 @@ import inflection
 import pandas as pd
 import os
 import sys
+from scipy import sparse
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
-from locoei.utilis import PATH_INTERIM, get_out_file_tsmp, cleanup_prev_output
+from locoei.utilis import (
+    PATH_INTERIM,
+    get_out_file_tsmp,
+    cleanup_prev_output,
+    read_excel_cached,
+)
+from locoei.schema import cast_categoricals
+from locoei.profiling import profile_stage
 
 
+@profile_stage
 def expected_pol_list(path_exp_pol_list_: str) -> pd.DataFrame:
     """
     Get the expected list of pollutants from the 2017 expected list of
@@ -29,9 +38,8 @@ def expected_pol_list(path_exp_pol_list_: str) -> pd.DataFrame:
     pd.DataFrame
         Dataframe of expected list of pollutants.
     """
-    x_pol = pd.ExcelFile(path_exp_pol_list_)
-    pol_df = x_pol.parse("NP Expected Pollutants List")
-    pol_lab = x_pol.parse("Xwalk_pollutant_descriptions")
+    pol_df = read_excel_cached(path_exp_pol_list_, "NP Expected Pollutants List")
+    pol_lab = read_excel_cached(path_exp_pol_list_, "Xwalk_pollutant_descriptions")
     pol_cols = [
         col
         for col in pol_df.columns
@@ -67,6 +75,7 @@ def expected_pol_list(path_exp_pol_list_: str) -> pd.DataFrame:
     return pol_df_fil_
 
 
+@profile_stage
 def hap_speciation_mult(path_hap_speciation_: str) -> pd.DataFrame:
     """
     Use the most recent EPA speciation table. This speciation table would
@@ -82,8 +91,9 @@ def hap_speciation_mult(path_hap_speciation_: str) -> pd.DataFrame:
     pd.DataFrame
         Cleaned speciation table.
     """
-    x_hap = pd.ExcelFile(path_hap_speciation_)
-    speciation_2020 = x_hap.parse("Non Point 2020 Speciation Table")
+    speciation_2020 = read_excel_cached(
+        path_hap_speciation_, "Non Point 2020 Speciation Table"
+    )
 
     hap_rename_map = {
         col: inflection.underscore(col).replace(" ", "_")
@@ -141,6 +151,7 @@ def pb_speciation_builder(speciation_2020_fil_: pd.DataFrame) -> pd.DataFrame:
     return pb_speciation_df
 
 
+@profile_stage
 def epa_tech_report_fac(path_nox_pm10_hc_epa_em_fac_: str) -> pd.DataFrame:
     """
     Use the 2009 (most recent) EPA technical highlights emission factors for
@@ -171,7 +182,7 @@ def epa_tech_report_fac(path_nox_pm10_hc_epa_em_fac_: str) -> pd.DataFrame:
         ],
         "large_switch": "Yard Locomotives",
     }
-    nox_pm10_hc_epa_em_fac = pd.read_excel(path_nox_pm10_hc_epa_em_fac_)
+    nox_pm10_hc_epa_em_fac = read_excel_cached(path_nox_pm10_hc_epa_em_fac_)
     nox_pm10_hc_epa_em_fac_impute_ = (
         nox_pm10_hc_epa_em_fac.assign(
             year=lambda df: np.select(
@@ -433,84 +444,113 @@ def create_voc_fac(epa_2009_rts: pd.DataFrame) -> pd.DataFrame:
     return voc_epa_em_fac_impute
 
 
-def explode_speciation(speciation_2020_fil_: pd.DataFrame) -> pd.DataFrame:
+def get_speciation_matrices(speciation_2020_fil_: pd.DataFrame) -> dict:
     """
-    Create extra rows in the speciation data for different years.
+    Get the speciation profiles as one sparse (HAP x parent pollutant) matrix
+    of multiplication factors per SCC. The HAP and parent pollutant axes are
+    shared by all the SCCs.
+
+    Returns
+    -------
+    dict
+        speciation_mats: scipy.sparse.csr_matrix by scc.
+        hap_pollutants: output pollutant code by HAP row.
+        parent_pollutants: input pollutant code by parent pollutant column.
+        speciation_rows: one speciation table row per scc and HAP, with the
+            HAP row (hap_code) of the speciation matrices.
     """
-    speciation_2020_fil_1 = speciation_2020_fil_.assign(
-        anals_yr=[list(np.arange(2011, 2051, 1))] * len(speciation_2020_fil_)
-    ).explode("anals_yr")
-    return speciation_2020_fil_1
+    hap_codes, hap_pollutants = pd.factorize(speciation_2020_fil_.output_pollutant_code)
+    parent_codes, parent_pollutants = pd.factorize(
+        speciation_2020_fil_.input_pollutant_code
+    )
+    multiplication_factor = speciation_2020_fil_.multiplication_factor.to_numpy(
+        dtype=float
+    )
+    speciation_mats = {}
+    for scc, scc_rows in speciation_2020_fil_.groupby("scc").indices.items():
+        speciation_mats[scc] = sparse.csr_matrix(
+            (
+                multiplication_factor[scc_rows],
+                (hap_codes[scc_rows], parent_codes[scc_rows]),
+            ),
+            shape=(len(hap_pollutants), len(parent_pollutants)),
+        )
+    speciation_rows = (
+        speciation_2020_fil_.assign(hap_code=hap_codes)
+        .drop_duplicates(["scc", "output_pollutant_code"])
+        .reset_index(drop=True)
+    )
+    return {
+        "speciation_mats": speciation_mats,
+        "hap_pollutants": hap_pollutants,
+        "parent_pollutants": parent_pollutants,
+        "speciation_rows": speciation_rows,
+    }
 
 
+def speciate(speciation_mats_: dict, parent_vals_by_scc: dict) -> dict:
+    """
+    Multiply each SCC's speciation matrix by the SCC's (parent pollutant x
+    year) emission rates or quantities to get the (HAP x year) values.
+    """
+    return {
+        scc: speciation_mats_[scc] @ parent_vals
+        for scc, parent_vals in parent_vals_by_scc.items()
+        if scc in speciation_mats_
+    }
+
+
+@profile_stage
 def hap_fac(
     voc_pm25_em_fac_list: list[pd.DataFrame],
-    speciation_2020_fil_expd_: pd.DataFrame,
+    speciation_2020_fil_: pd.DataFrame,
     pol_type="HAP",
 ) -> pd.DataFrame:
     """
     Get the emission rate for HAPs by using the PM 2.5 and VOC emission rates
     and multiplication factor from speciation table to convert them to
-    different HAP pollutant emission rate.
+    different HAP pollutant emission rate. The speciation table is applied as
+    a sparse (HAP x parent pollutant) matrix per SCC to the (parent pollutant
+    x year) emission rates of the SCC.
     """
     voc_pm25_fac_df_1 = pd.concat(voc_pm25_em_fac_list)
-
-    hap_em_fac_df_1 = (
-        speciation_2020_fil_expd_.merge(
-            (
-                voc_pm25_fac_df_1.rename(columns={"em_fac": "em_fac_input_pol"}).drop(
-                    columns=["pol_type"]
-                )
-            ),
-            left_on=[
-                "dat_cat_code",
-                "scc",
-                "scc_description_level_1",
-                "scc_description_level_2",
-                "scc_description_level_3",
-                "scc_description_level_4",
-                "sector_description",
-                "input_pollutant_code",
-                "input_pollutant_description",
-                "anals_yr",
-            ],
-            right_on=[
-                "dat_cat_code",
-                "scc",
-                "scc_description_level_1",
-                "scc_description_level_2",
-                "scc_description_level_3",
-                "scc_description_level_4",
-                "sector_description",
-                "pollutant",
-                "pol_desc",
-                "anals_yr",
-            ],
-            how="left",
-        )
-        .drop(columns=["pollutant", "pol_desc"])
-        .assign(em_fac=lambda df: df.em_fac_input_pol * df.multiplication_factor)
-        .drop(columns=["em_fac_input_pol"])
+    speciation_mats_dict = get_speciation_matrices(speciation_2020_fil_)
+    parent_pollutants = speciation_mats_dict["parent_pollutants"]
+    years = np.sort(voc_pm25_fac_df_1.anals_yr.astype(int).unique())
+    voc_pm25_fac_df_2 = voc_pm25_fac_df_1.loc[
+        lambda df: df.pollutant.isin(parent_pollutants)
+    ]
+    parent_em_fac_by_scc = {}
+    for scc, scc_rows in voc_pm25_fac_df_2.groupby("scc").indices.items():
+        voc_pm25_fac_scc = voc_pm25_fac_df_2.iloc[scc_rows]
+        parent_em_fac = np.full((len(parent_pollutants), len(years)), np.nan)
+        parent_em_fac[
+            parent_pollutants.get_indexer(voc_pm25_fac_scc.pollutant),
+            np.searchsorted(years, voc_pm25_fac_scc.anals_yr.astype(int)),
+        ] = voc_pm25_fac_scc.em_fac.to_numpy(dtype=float)
+        parent_em_fac_by_scc[scc] = parent_em_fac
+    hap_em_fac_by_scc = speciate(
+        speciation_mats_=speciation_mats_dict["speciation_mats"],
+        parent_vals_by_scc=parent_em_fac_by_scc,
     )
-    rename_hap_map = {
-        "dat_cat_code",
-        "scc",
-        "scc_description_level_1",
-        "scc_description_level_2",
-        "scc_description_level_3",
-        "scc_description_level_4",
-        "sector_description",
-        "output_pollutant_code",
-        "output_pollutant_description",
-        "input_pollutant_code",
-        "input_pollutant_description",
-        "multiplication_factor",
-        "anals_yr",
-        "em_units",
-        "em_fac",
-    }
+    speciation_rows = speciation_mats_dict["speciation_rows"]
+    # SCCs without parent emission rates get null HAP emission rates.
+    hap_em_fac = np.full((len(speciation_rows), len(years)), np.nan)
+    for scc, scc_rows in speciation_rows.groupby("scc").indices.items():
+        if scc in hap_em_fac_by_scc:
+            hap_em_fac[scc_rows] = hap_em_fac_by_scc[scc][
+                speciation_rows.hap_code.to_numpy()[scc_rows]
+            ]
+    assert voc_pm25_fac_df_1.em_units.nunique() == 1, "Rates have mixed units."
     hap_em_fac_df_2 = (
-        hap_em_fac_df_1.assign(pol_type=pol_type)
+        speciation_rows.loc[np.repeat(speciation_rows.index, len(years))]
+        .reset_index(drop=True)
+        .assign(
+            pol_type=pol_type,
+            anals_yr=np.tile(years, len(speciation_rows)),
+            em_units=voc_pm25_fac_df_1.em_units.iloc[0],
+            em_fac=hap_em_fac.ravel(),
+        )
         .rename(
             columns={
                 "output_pollutant_code": "pollutant",
@@ -538,45 +578,203 @@ def hap_fac(
     return hap_em_fac_df_2
 
 
-if __name__ == "__main__":
-    st = get_out_file_tsmp()
-    # Expected Pollutant List: NEI 2017-->Nonpoint-->Expected Pollutant List
-    # for Nonpoint SCCs
-    # https://www.epa.gov/air-emissions-inventories/2017-national-emissions
-    # -inventory-nei-data
-    # https://www.epa.gov/sites/production/files/2018-07
-    # /np_expected_poll_list_complete_v1.xlsx
-    path_exp_pol_list = os.path.join(
-        PATH_INTERIM, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
-    )
-    # Hazardous air pollutants speciation table from EPA NEI 2017 supporting
-    # docs: NEI 2017 --> Supporting Data and Summaries --> nonpoint/
-    # --> 2017Rail_HAP_AugmentationProfileAssignmentFactors_20200128.xlsx
-    # https://www.epa.gov/air-emissions-inventories/2017-national-emissions
-    # -inventory-nei-data
-    # https://gaftp.epa.gov/air/nei/2017/doc/supporting_data/nonpoint
-    # /2017Rail_HAP_AugmentationProfileAssignmentFactors_20200128.xlsx
-    path_hap_speciation = os.path.join(
-        PATH_INTERIM,
-        "epa_speciation_table",
-        "power_query",
-        "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
-    )
+class EmissionFactorCube:
+    """
+    Emission factors as a contiguous (scc x pollutant x year) array.
 
-    # Emission factors table.
-    path_nox_pm10_hc_epa_em_fac = os.path.join(
-        PATH_INTERIM, "epa_emission_rates", "epa_2009_emission_rates_nox_pm10_hc.xlsx"
-    )
+    The axes are integer coded: scc_df has the SCC descriptions by scc code,
+    pol_df has the pollutant type and description by pollutant code, and
+    years has the analysis year by year code. has_em_fac flags the
+    (scc, pollutant) pairs with emission factors. Use to_long to export the
+    emission factors in long format.
+    """
 
-    # Final Output
-    path_emission_fac_out = os.path.join(PATH_INTERIM, f"emission_factor_{st}.csv")
-    path_emission_fac_out_pat = os.path.join(PATH_INTERIM, r"emission_factor_*-*-*.csv")
-    cleanup_prev_output(path_emission_fac_out_pat)
+    scc_cols = [
+        "dat_cat_code",
+        "scc",
+        "scc_description_level_1",
+        "scc_description_level_2",
+        "scc_description_level_3",
+        "scc_description_level_4",
+        "sector_description",
+    ]
+    pol_cols = ["pollutant", "pol_type", "pol_desc"]
+
+    def __init__(
+        self,
+        scc_df: pd.DataFrame,
+        pol_df: pd.DataFrame,
+        years,
+        em_fac: np.ndarray,
+        has_em_fac: np.ndarray,
+        em_units="grams/gallon",
+    ):
+        self.scc_df = scc_df.reset_index(drop=True)
+        self.pol_df = pol_df.reset_index(drop=True)
+        self.years = np.asarray(years, dtype=int)
+        self.em_fac = np.ascontiguousarray(em_fac, dtype=float)
+        self.has_em_fac = has_em_fac
+        self.em_units = em_units
+        assert self.em_fac.shape == (
+            len(self.scc_df),
+            len(self.pol_df),
+            len(self.years),
+        ), "Emission factor array does not match the scc, pollutant, and year axes."
+        assert (
+            self.scc_df.scc_description_level_4.is_unique
+        ), "Each scc_description_level_4 should map to one scc."
+
+    @classmethod
+    def from_em_fac_list(cls, em_fac_list: list[pd.DataFrame]):
+        """
+        Build the cube from the emission rates of each pollutant group, as
+        returned by co2_fac, so2_fac, hap_fac, etc. The scc and pollutant axes
+        are in order of first appearance, and each group fills its own slice
+        of the array.
+        """
+        em_units = pd.unique(
+            np.concatenate([em_fac_df.em_units.unique() for em_fac_df in em_fac_list])
+        )
+        assert len(em_units) == 1, "Emission rates have mixed units."
+        # HAP codes come in as integers from the speciation table. Keep all the
+        # pollutant codes as strings, like after a csv round trip.
+        scc_df = pd.concat(
+            [
+                em_fac_df.drop_duplicates("scc").filter(items=cls.scc_cols)
+                for em_fac_df in em_fac_list
+            ]
+        ).drop_duplicates("scc")
+        pol_df = (
+            pd.concat(
+                [
+                    em_fac_df.drop_duplicates("pollutant").filter(items=cls.pol_cols)
+                    for em_fac_df in em_fac_list
+                ]
+            )
+            .assign(pollutant=lambda df: df.pollutant.astype(str))
+            .drop_duplicates("pollutant")
+        )
+        years = np.unique(
+            np.concatenate(
+                [em_fac_df.anals_yr.astype(int).unique() for em_fac_df in em_fac_list]
+            )
+        )
+        scc_index = pd.Index(scc_df.scc)
+        pol_index = pd.Index(pol_df.pollutant)
+        em_fac = np.full((len(scc_df), len(pol_df), len(years)), np.nan)
+        n_em_fac = np.zeros(em_fac.shape, dtype=int)
+        for em_fac_df in em_fac_list:
+            em_fac_idx = (
+                scc_index.get_indexer(em_fac_df.scc),
+                pol_index.get_indexer(em_fac_df.pollutant.astype(str)),
+                np.searchsorted(years, em_fac_df.anals_yr.astype(int)),
+            )
+            em_fac[em_fac_idx] = em_fac_df.em_fac.to_numpy(dtype=float)
+            np.add.at(n_em_fac, em_fac_idx, 1)
+        assert (
+            n_em_fac.max() <= 1
+        ), "Emission rates have duplicate scc, pollutant, and year rows."
+        return cls(
+            scc_df=cast_categoricals(scc_df),
+            pol_df=cast_categoricals(pol_df),
+            years=years,
+            em_fac=em_fac,
+            has_em_fac=n_em_fac.any(axis=2),
+            em_units=em_units[0],
+        )
+
+    @classmethod
+    def from_long(cls, emis_rt_: pd.DataFrame):
+        """Build the cube from a long format table, such as the emission
+        factor csv."""
+        assert not emis_rt_.duplicated(
+            ["scc", "pollutant", "anals_yr"]
+        ).any(), "Emission rates have duplicate scc, pollutant, and year rows."
+        assert emis_rt_.em_units.nunique() == 1, "Emission rates have mixed units."
+        scc_codes, scc_uniques = pd.factorize(emis_rt_.scc)
+        pol_codes, pol_uniques = pd.factorize(emis_rt_.pollutant)
+        yr_codes, yr_uniques = pd.factorize(emis_rt_.anals_yr.astype(int), sort=True)
+        # First rows are in the same order as the factorized codes.
+        scc_df = emis_rt_.drop_duplicates("scc").filter(items=cls.scc_cols)
+        pol_df = emis_rt_.drop_duplicates("pollutant").filter(items=cls.pol_cols)
+        em_fac = np.full((len(scc_uniques), len(pol_uniques), len(yr_uniques)), np.nan)
+        em_fac[scc_codes, pol_codes, yr_codes] = emis_rt_.em_fac.to_numpy(dtype=float)
+        has_em_fac = np.zeros((len(scc_uniques), len(pol_uniques)), dtype=bool)
+        has_em_fac[scc_codes, pol_codes] = True
+        return cls(
+            scc_df=scc_df,
+            pol_df=pol_df,
+            years=yr_uniques,
+            em_fac=em_fac,
+            has_em_fac=has_em_fac,
+            em_units=emis_rt_.em_units.iloc[0],
+        )
 
-    pol_df_fil = expected_pol_list(path_exp_pol_list)
-    speciation_2020_fil = hap_speciation_mult(path_hap_speciation)
+    def get_scc_codes(self, scc_description_level_4: pd.Series) -> np.ndarray:
+        """Get the scc codes for the SCC descriptions; -1 when missing."""
+        return pd.Index(self.scc_df.scc_description_level_4).get_indexer(
+            scc_description_level_4
+        )
+
+    def get_year_codes(self, years: pd.Series) -> np.ndarray:
+        """Get the year codes for the years; -1 when missing."""
+        return pd.Index(self.years).get_indexer(years)
+
+    def to_long(self) -> pd.DataFrame:
+        """Get the emission factors in long format, one row per scc,
+        pollutant, and year. Rows are ordered by pollutant, scc, and year, so
+        that from_long gives back the same axes."""
+        pol_codes, scc_codes = np.nonzero(self.has_em_fac.T)
+        n_years = len(self.years)
+        emis_rt_long = pd.concat(
+            [
+                self.scc_df.iloc[np.repeat(scc_codes, n_years)].reset_index(drop=True),
+                self.pol_df.iloc[np.repeat(pol_codes, n_years)].reset_index(drop=True),
+            ],
+            axis=1,
+        ).assign(
+            anals_yr=np.tile(self.years, len(scc_codes)),
+            em_fac=self.em_fac[scc_codes, pol_codes].ravel(),
+            em_units=self.em_units,
+        )
+        return emis_rt_long
+
+
+@profile_stage
+def get_emis_rt(
+    path_exp_pol_list_: str,
+    path_hap_speciation_: str,
+    path_nox_pm10_hc_epa_em_fac_: str,
+    pre_2011_sulfur_ppm=500,
+    post_2011_sulfur_ppm=15,
+) -> EmissionFactorCube:
+    """
+    Get the GHG, CAP, and HAP emission rates for 2011 to 2050.
+
+    Parameters
+    ----------
+    path_exp_pol_list_:
+        Path to the expected list of pollutants xlsx.
+    path_hap_speciation_:
+        Path to the speciation data.
+    path_nox_pm10_hc_epa_em_fac_:
+        Excel file created from power BI. Contains NOx, PM10, and HC rates from
+        2006 to 2040 in long format.
+    pre_2011_sulfur_ppm:
+        2011 and pre-2011 sulfur content.
+    post_2011_sulfur_ppm:
+        2012 and post-2012 sulfur content.
+
+    Returns
+    -------
+    EmissionFactorCube
+        Emission rates for all pollutants. Use to_long to export them in long
+        format.
+    """
+    pol_df_fil = expected_pol_list(path_exp_pol_list_)
+    speciation_2020_fil = hap_speciation_mult(path_hap_speciation_)
     pb_speciation_2011 = pb_speciation_builder(speciation_2020_fil)
-    nox_pm10_hc_epa_em_fac_impute = epa_tech_report_fac(path_nox_pm10_hc_epa_em_fac)
+    nox_pm10_hc_epa_em_fac_impute = epa_tech_report_fac(path_nox_pm10_hc_epa_em_fac_)
     em_fac_df_template = em_fac_template(
         all_pol_df=pol_df_fil, speciation_df=speciation_2020_fil
     )
@@ -585,7 +783,11 @@ if __name__ == "__main__":
     em_fac_res_dict["co2"] = co2_fac(em_fac_df_template_=em_fac_df_template)
     em_fac_res_dict["co"] = co_fac(em_fac_df_template_=em_fac_df_template)
     em_fac_res_dict["nh3"] = nh3_fac(em_fac_df_template_=em_fac_df_template)
-    em_fac_res_dict["so2"] = so2_fac(em_fac_df_template_=em_fac_df_template)
+    em_fac_res_dict["so2"] = so2_fac(
+        em_fac_df_template_=em_fac_df_template,
+        pre_2011_sulfur_ppm=pre_2011_sulfur_ppm,
+        post_2011_sulfur_ppm=post_2011_sulfur_ppm,
+    )
     em_fac_res_dict["nox"] = epa_2009_proj_table_fac(
         em_fac_df_template_=em_fac_df_template,
         pollutant="NOX",
@@ -608,22 +810,57 @@ if __name__ == "__main__":
         pollutant="VOC",
         epa_2009_rts=voc_epa_em_fac_impute,
     )
-    speciation_2020_fil_expd = explode_speciation(
-        speciation_2020_fil_=speciation_2020_fil
-    )
-
-    pb_speciation_2011_expd = explode_speciation(
-        speciation_2020_fil_=pb_speciation_2011
-    )
     em_fac_res_dict["hap"] = hap_fac(
         voc_pm25_em_fac_list=[em_fac_res_dict["pm25"], em_fac_res_dict["voc"]],
-        speciation_2020_fil_expd_=speciation_2020_fil_expd,
+        speciation_2020_fil_=speciation_2020_fil,
     )
 
     em_fac_res_dict["pb"] = hap_fac(
         voc_pm25_em_fac_list=[em_fac_res_dict["pm10"]],
-        speciation_2020_fil_expd_=pb_speciation_2011_expd,
+        speciation_2020_fil_=pb_speciation_2011,
         pol_type="CAP",
     )
-    ghg_cap_hap_em_fac = pd.concat(em_fac_res_dict.values())
-    ghg_cap_hap_em_fac.to_csv(path_emission_fac_out)
+    return EmissionFactorCube.from_em_fac_list(list(em_fac_res_dict.values()))
+
+
+if __name__ == "__main__":
+    st = get_out_file_tsmp()
+    # Expected Pollutant List: NEI 2017-->Nonpoint-->Expected Pollutant List
+    # for Nonpoint SCCs
+    # https://www.epa.gov/air-emissions-inventories/2017-national-emissions
+    # -inventory-nei-data
+    # https://www.epa.gov/sites/production/files/2018-07
+    # /np_expected_poll_list_complete_v1.xlsx
+    path_exp_pol_list = os.path.join(
+        PATH_INTERIM, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
+    )
+    # Hazardous air pollutants speciation table from EPA NEI 2017 supporting
+    # docs: NEI 2017 --> Supporting Data and Summaries --> nonpoint/
+    # --> 2017Rail_HAP_AugmentationProfileAssignmentFactors_20200128.xlsx
+    # https://www.epa.gov/air-emissions-inventories/2017-national-emissions
+    # -inventory-nei-data
+    # https://gaftp.epa.gov/air/nei/2017/doc/supporting_data/nonpoint
+    # /2017Rail_HAP_AugmentationProfileAssignmentFactors_20200128.xlsx
+    path_hap_speciation = os.path.join(
+        PATH_INTERIM,
+        "epa_speciation_table",
+        "power_query",
+        "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+    )
+
+    # Emission factors table.
+    path_nox_pm10_hc_epa_em_fac = os.path.join(
+        PATH_INTERIM, "epa_emission_rates", "epa_2009_emission_rates_nox_pm10_hc.xlsx"
+    )
+
+    # Final Output
+    path_emission_fac_out = os.path.join(PATH_INTERIM, f"emission_factor_{st}.csv")
+    path_emission_fac_out_pat = os.path.join(PATH_INTERIM, r"emission_factor_*-*-*.csv")
+    cleanup_prev_output(path_emission_fac_out_pat)
+
+    ghg_cap_hap_em_fac = get_emis_rt(
+        path_exp_pol_list_=path_exp_pol_list,
+        path_hap_speciation_=path_hap_speciation,
+        path_nox_pm10_hc_epa_em_fac_=path_nox_pm10_hc_epa_em_fac,
+    )
+    ghg_cap_hap_em_fac.to_long().to_csv(path_emission_fac_out)
@@ -6,6 +6,10 @@ import pandas as pd
 import numpy as np
 import os
 import sys
+import json
+import shutil
+import tempfile
+from scipy import sparse
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
 from locoei.utilis import (
@@ -14,9 +18,207 @@ from locoei.utilis import (
     get_out_file_tsmp,
     cleanup_prev_output,
     read_shapefile,
+    read_excel_cached,
 )
+from locoei.schema import cast_categoricals
+from locoei.profiling import profile_stage
 
 
+def get_natrail_raw_cols(path_natrail2020_: str) -> dict:
+    """Map the snake_case national rail column names to the raw csv names."""
+    natrail_raw_cols = pd.read_csv(path_natrail2020_, nrows=0).columns
+    return {inflection.underscore(col): col for col in natrail_raw_cols}
+
+
+NATRAIL_PARTITION_SOURCE_FILE = "_source.json"
+
+
+def get_natrail_source_stamp(path_natrail2020_: str) -> dict:
+    """Get the size and modification time of the national rail dataset."""
+    natrail_stat = os.stat(path_natrail2020_)
+    return {"size": natrail_stat.st_size, "mtime_ns": natrail_stat.st_mtime_ns}
+
+
+def natrail_st_partitions_are_current(
+    path_natrail2020_: str, path_st_partition_dir_: str
+) -> bool:
+    """
+    Check that the per-state partitions in path_st_partition_dir_ were written
+    from the current path_natrail2020_ (same size and modification time).
+    """
+    path_source = os.path.join(path_st_partition_dir_, NATRAIL_PARTITION_SOURCE_FILE)
+    if not os.path.exists(path_source):
+        return False
+    with open(path_source) as fi:
+        partition_source_stamp = json.load(fi)
+    return partition_source_stamp == get_natrail_source_stamp(path_natrail2020_)
+
+
+def write_natrail_st_partitions(
+    path_natrail2020_: str, path_st_partition_dir_: str, chunksize=200000
+) -> list:
+    """
+    Split the national rail dataset into one csv per state, reading it in
+    chunks. All values are read and written as text so the partitions parse
+    to the same values as the national file. The size and modification time
+    of the national file are saved in the directory (see
+    natrail_st_partitions_are_current). The partitions are written to a
+    temporary directory that replaces path_st_partition_dir_ once all states
+    are written, so an interrupted run leaves no partial partitions.
+
+    Returns
+    -------
+    list
+        States written.
+    """
+    stateab_col = get_natrail_raw_cols(path_natrail2020_)["stateab"]
+    natrail_source_stamp = get_natrail_source_stamp(path_natrail2020_)
+    path_st_partition_dir_ = os.path.abspath(path_st_partition_dir_)
+    path_tmp_dir = tempfile.mkdtemp(
+        prefix=f".{os.path.basename(path_st_partition_dir_)}_",
+        dir=os.path.dirname(path_st_partition_dir_),
+    )
+    try:
+        states_written = set()
+        for natrail_chunk in pd.read_csv(
+            path_natrail2020_, dtype=str, keep_default_na=False, chunksize=chunksize
+        ):
+            for st, natrail_chunk_st in natrail_chunk.groupby(stateab_col):
+                natrail_chunk_st.to_csv(
+                    os.path.join(path_tmp_dir, f"North_American_Rail_Lines_{st}.csv"),
+                    mode="a",
+                    header=st not in states_written,
+                    index=False,
+                )
+                states_written.add(st)
+        with open(os.path.join(path_tmp_dir, NATRAIL_PARTITION_SOURCE_FILE), "w") as fo:
+            json.dump(natrail_source_stamp, fo)
+        if os.path.exists(path_st_partition_dir_):
+            shutil.rmtree(path_st_partition_dir_)
+        os.rename(path_tmp_dir, path_st_partition_dir_)
+    finally:
+        if os.path.exists(path_tmp_dir):
+            shutil.rmtree(path_tmp_dir)
+    return sorted(states_written)
+
+
+@profile_stage
+def read_natrail(
+    path_natrail2020_: str,
+    filter_st=("TX",),
+    filter_net=None,
+    usecols=None,
+    path_st_partition_dir_=None,
+    chunksize=200000,
+) -> pd.DataFrame:
+    """
+    Read the national rail dataset chunk by chunk, keeping only the rows in
+    filter_st and filter_net, so that memory use depends on the filtered
+    states and not the whole network.
+
+    path_natrail2020_:
+        Path to national rail dataset.
+    filter_st:
+        States to keep.
+    filter_net:
+        Network classifiers (NET) to keep. All are kept when None.
+    usecols:
+        snake_case columns to read. All columns are read when None.
+    path_st_partition_dir_:
+        Directory with the per-state partitions written by
+        write_natrail_st_partitions. When given, only the filter_st partitions
+        are read, and the partitions are (re)written first if they are missing
+        or were written from a different path_natrail2020_.
+    chunksize:
+        Rows per chunk.
+    Returns
+    -------
+    pd.DataFrame
+        National rail data with the raw column names.
+    """
+    natrail_raw_cols = get_natrail_raw_cols(path_natrail2020_)
+    raw_usecols = None
+    if usecols is not None:
+        raw_usecols = [natrail_raw_cols[col] for col in usecols]
+    stateab_col = natrail_raw_cols["stateab"]
+    net_col = natrail_raw_cols["net"]
+    if path_st_partition_dir_ is not None:
+        path_st_partitions = [
+            os.path.join(path_st_partition_dir_, f"North_American_Rail_Lines_{st}.csv")
+            for st in filter_st
+        ]
+        if not natrail_st_partitions_are_current(
+            path_natrail2020_, path_st_partition_dir_
+        ):
+            write_natrail_st_partitions(
+                path_natrail2020_=path_natrail2020_,
+                path_st_partition_dir_=path_st_partition_dir_,
+                chunksize=chunksize,
+            )
+        # A state without rail lines has no partition.
+        path_natrail_list = [
+            path_st_partition
+            for path_st_partition in path_st_partitions
+            if os.path.exists(path_st_partition)
+        ]
+    else:
+        path_natrail_list = [path_natrail2020_]
+    natrail_chunk_list = []
+    for path_natrail in path_natrail_list:
+        for natrail_chunk in pd.read_csv(
+            path_natrail, usecols=raw_usecols, chunksize=chunksize
+        ):
+            natrail_chunk_fil = natrail_chunk.loc[
+                lambda df: df[stateab_col].isin(filter_st)
+            ]
+            if filter_net is not None:
+                natrail_chunk_fil = natrail_chunk_fil.loc[
+                    lambda df: df[net_col].isin(filter_net)
+                ]
+            natrail_chunk_list.append(natrail_chunk_fil)
+    if not sum(len(natrail_chunk) for natrail_chunk in natrail_chunk_list):
+        raise ValueError(
+            f"No rail lines in {path_natrail2020_} for states {list(filter_st)}"
+            f" and networks {filter_net}."
+        )
+    natrail = pd.concat(natrail_chunk_list, ignore_index=True)
+    return natrail
+
+
+def explode_trk_right_oper(
+    strail_2020_: pd.DataFrame, trk_right_cols: tuple
+) -> pd.DataFrame:
+    """
+    Get one row per link and unique operator (owner or trackage rights
+    holder). The owner/trackage rights columns are flattened row-wise into
+    one array, nulls are dropped, and duplicate (link, carrier) pairs are
+    removed, without a python call per link.
+
+    Returns
+    -------
+    pd.DataFrame
+        Links without the trk_right_cols, repeated once per operator, with the
+        operator in the carrier column. The link index is kept, same as
+        explode.
+    """
+    trk_right_cols = list(trk_right_cols)
+    oper_flat = strail_2020_[trk_right_cols].to_numpy(dtype=object).ravel()
+    link_pos_flat = np.repeat(np.arange(len(strail_2020_)), len(trk_right_cols))
+    link_oper = (
+        pd.DataFrame(
+            {"link_pos": link_pos_flat, "carrier": oper_flat}, copy=False
+        )
+        .loc[lambda df: df.carrier.notna()]
+        .drop_duplicates(subset=["link_pos", "carrier"])
+    )
+    return (
+        strail_2020_.drop(columns=trk_right_cols)
+        .iloc[link_oper.link_pos.to_numpy()]
+        .assign(carrier=link_oper.carrier.to_numpy())
+    )
+
+
+@profile_stage
 def preprc_link(
     path_natrail2020_: str,
     path_rail_carrier_grp_: str,
@@ -39,6 +241,8 @@ def preprc_link(
     filter_st=("TX",),
     filter_rrgrp=("Freight", "Industrial", "Yard"),
     map_friylab={"Freight": "Fcat", "Industrial": "IYcat", "Yard": "IYcat"},
+    natrail_usecols=None,
+    path_natrail_st_partition_dir_=None,
 ) -> pd.DataFrame:
     """
     Pre-process national rail link data.
@@ -59,26 +263,35 @@ def preprc_link(
     map_friylab:
         Line haul fuel consumption  uses freight and industrial networks.
         and yard switching fuel consumption uses yard network.
+    natrail_usecols:
+        snake_case national rail columns to read. All columns are read when
+        None.
+    path_natrail_st_partition_dir_:
+        Directory with per-state partitions of the national rail dataset. See
+        read_natrail.
     Returns
     -------
     pd.DataFrame
         Processed national rail dataset.
     """
-    natrail2020 = pd.read_csv(path_natrail2020_)
-    missing_yardnames = pd.read_excel(path_fill_missing_yardnames_)
+    natrail2020 = read_natrail(
+        path_natrail2020_=path_natrail2020_,
+        filter_st=filter_st,
+        filter_net=[net for net, rrgrp in map_rrgrp_.items() if rrgrp in filter_rrgrp],
+        usecols=natrail_usecols,
+        path_st_partition_dir_=path_natrail_st_partition_dir_,
+    )
+    missing_yardnames = read_excel_cached(path_fill_missing_yardnames_)
     rail_carrier_grp = pd.read_csv(path_rail_carrier_grp_, index_col=0)
     natrail2020_1 = natrail2020.rename(
         columns={col: inflection.underscore(col) for col in natrail2020.columns}
     ).assign(rr_netgrp=lambda df: df.net.map(map_rrgrp_))
     strail_2020 = natrail2020_1.loc[
         lambda df: (df.stateab.isin(filter_st)) & (df.rr_netgrp.isin(filter_rrgrp))
-    ].assign(all_oper=lambda df: df[list(trk_right_cols)].apply(set, axis=1))
+    ]
     strail_2020_preprocess = (
-        strail_2020.explode("all_oper")
-        .dropna(subset=["all_oper"])
-        .drop(columns=list(trk_right_cols))
-        .loc[lambda df: df.all_oper != "NS"]  # Based on Madhu's SQL code
-        .rename(columns={"all_oper": "carrier"})
+        explode_trk_right_oper(strail_2020, trk_right_cols=trk_right_cols)
+        .loc[lambda df: df.carrier != "NS"]  # Based on Madhu's SQL code
         .merge(missing_yardnames, on=["fraarcid", "net"], how="left")
         .assign(
             yardname=lambda df: np.select(
@@ -104,9 +317,65 @@ def preprc_link(
         )
         == 0
     ), "Check why there are missing yardnames after imputation."
-    return strail_2020_preprocess
+    return cast_categoricals(strail_2020_preprocess)
+
+
+def get_milemix_alloc_matrix(
+    links_: pd.DataFrame, alloc_cols: list, milemix_cols: list
+) -> dict:
+    """
+    Get the sparse fuel allocation matrix for the links: one row per link and
+    one column per unique alloc_cols total (e.g. county, carrier, friylab).
+    The values are the link mile mix: link miles over the total miles of the
+    links with the same milemix_cols. The fuel by link is then the product of
+    the matrix and the fuel vector by alloc column, and the matrix can be
+    reused for every fuel vector (year, scenario, projection factor).
+
+    Returns
+    -------
+    dict
+        alloc_mat: scipy.sparse.csr_matrix (links x alloc totals).
+        alloc_keys: pd.MultiIndex of the alloc_cols values by column.
+        alloc_codes: column of each link.
+        totnetmiles, milemx: total miles and mile mix by link.
+    """
+    alloc_codes, alloc_keys = pd.MultiIndex.from_frame(links_[alloc_cols]).factorize()
+    alloc_keys = alloc_keys.set_names(alloc_cols)
+    milemix_codes = pd.MultiIndex.from_frame(links_[milemix_cols]).factorize()[0]
+    assert (alloc_codes >= 0).all() and (
+        milemix_codes >= 0
+    ).all(), "Links have missing allocation keys."
+    miles = links_.miles.to_numpy()
+    totnetmiles = (
+        pd.Series(miles).groupby(milemix_codes).sum().to_numpy()[milemix_codes]
+    )
+    milemx = miles / totnetmiles
+    alloc_mat = sparse.csr_matrix(
+        (milemx, (np.arange(len(links_)), alloc_codes)),
+        shape=(len(links_), len(alloc_keys)),
+    )
+    return {
+        "alloc_mat": alloc_mat,
+        "alloc_keys": alloc_keys,
+        "alloc_codes": alloc_codes,
+        "totnetmiles": totnetmiles,
+        "milemx": milemx,
+    }
+
+
+def get_alloc_vals(alloc_keys_: pd.MultiIndex, vals_: pd.DataFrame) -> pd.DataFrame:
+    """
+    Align the values with the allocation matrix columns. alloc_keys_ names are
+    the vals_ key columns. Allocation totals without values are null.
+    """
+    return (
+        vals_.set_index(list(alloc_keys_.names))
+        .reindex(alloc_keys_)
+        .reset_index(drop=True)
+    )
 
 
+@profile_stage
 def preprc_fuelusg(path_fueluserail2019_: str) -> pd.DataFrame:
     """
     Function to process 2019 statewide fuel usage data.
@@ -140,6 +409,7 @@ def preprc_fuelusg(path_fueluserail2019_: str) -> pd.DataFrame:
     return fueluserail2019_preprc
 
 
+@profile_stage
 def get_class_1_freight_fuel_consump(
     fueluse2019_preprc_: pd.DataFrame,
     strail_2020_preprocess_: pd.DataFrame,
@@ -174,7 +444,7 @@ def get_class_1_freight_fuel_consump(
         ]
         .assign(
             st_fuel_consmp_all_cls1=lambda df: (
-                df.groupby("friylab").st_fuel_consmp.transform(sum)
+                df.groupby("friylab", observed=True).st_fuel_consmp.transform("sum")
             )
         )
         .merge(cls1_cntpct_prc, on="carrier", how="inner")
@@ -195,34 +465,44 @@ def get_class_1_freight_fuel_consump(
         .drop(columns="fips")
     )
 
-    def get_county_milemix(strail_2020_preprocess__=strail_2020_preprocess_):
-        """Get the county level milemix by carrier."""
-        strail_2020_preprocess__1 = strail_2020_preprocess__.loc[
-            lambda df: (
-                (df.carrier.isin(list(cls1_carriers_))) & (df.friylab.isin(["Fcat"]))
-            )
-        ].assign(
-            stcntyfips=lambda df: df.stcntyfips.astype(int),
-            totnetmiles=lambda df: df.groupby(
-                ["stcntyfips", "friylab"]
-            ).miles.transform(sum),
-            milemx=lambda df: df.miles / df.totnetmiles,
+    strail_2020_preprocess_1 = strail_2020_preprocess_.loc[
+        lambda df: (
+            (df.carrier.isin(list(cls1_carriers_))) & (df.friylab.isin(["Fcat"]))
         )
-        assert (
-            strail_2020_preprocess__1.groupby(["stcntyfips", "friylab"])
-            .milemx.sum()
-            .mean()
-            == 1
-        )
-        return strail_2020_preprocess__1
-
-    strail_2020_preprocess_1 = get_county_milemix()
-
-    fueluse2019_preprc_cls1_freight_milemx = strail_2020_preprocess_1.merge(
-        fueluse2019_preprc_cls1_freight,
-        on=["stcntyfips", "carrier", "friylab"],
-        how="left",
-    ).assign(link_fuel_consmp=lambda df: df.milemx * df.cnty_cls1_all_fuel_consmp)
+    ].assign(stcntyfips=lambda df: df.stcntyfips.astype(int))
+    # County mile mix over all class 1 carriers, allocated to the county
+    # fuel by carrier.
+    cnty_milemx_alloc = get_milemix_alloc_matrix(
+        links_=strail_2020_preprocess_1,
+        alloc_cols=["stcntyfips", "carrier", "friylab"],
+        milemix_cols=["stcntyfips", "friylab"],
+    )
+    assert (
+        strail_2020_preprocess_1.assign(milemx=cnty_milemx_alloc["milemx"])
+        .groupby(["stcntyfips", "friylab"], observed=True)
+        .milemx.sum()
+        .mean()
+        == 1
+    )
+    cls1_freight_alloc_vals = get_alloc_vals(
+        alloc_keys_=cnty_milemx_alloc["alloc_keys"],
+        vals_=fueluse2019_preprc_cls1_freight,
+    )
+    fueluse2019_preprc_cls1_freight_milemx = pd.concat(
+        [
+            strail_2020_preprocess_1.assign(
+                totnetmiles=cnty_milemx_alloc["totnetmiles"],
+                milemx=cnty_milemx_alloc["milemx"],
+            ).reset_index(drop=True),
+            cls1_freight_alloc_vals.iloc[cnty_milemx_alloc["alloc_codes"]].reset_index(
+                drop=True
+            ),
+        ],
+        axis=1,
+    ).assign(
+        link_fuel_consmp=cnty_milemx_alloc["alloc_mat"]
+        @ cls1_freight_alloc_vals.cnty_cls1_all_fuel_consmp.to_numpy()
+    )
 
     assert fueluse2019_preprc_cls1_freight_milemx.link_fuel_consmp.isna().sum() == 0, (
         "County fuel distribution data has counties with a distribution "
@@ -233,6 +513,7 @@ def get_class_1_freight_fuel_consump(
     return fueluse2019_preprc_cls1_freight_milemx
 
 
+@profile_stage
 def get_cls1_yard_cls1_indus_cls3_passenger_commuter_fuel_consump(
     fueluse2019_preprc_: pd.DataFrame,
     strail_2020_preprocess_: pd.DataFrame,
@@ -255,32 +536,38 @@ def get_cls1_yard_cls1_indus_cls3_passenger_commuter_fuel_consump(
         individual link.
     """
 
+    strail_2020_preprocess_1 = strail_2020_preprocess_.loc[
+        lambda df: (
+            (~df.carrier.isin(list(cls1_carriers_)))
+            | ((df.carrier.isin(list(cls1_carriers_))) & (df.friylab.isin(["IYcat"])))
+        )
+    ]
+    st_milemx_alloc = get_milemix_alloc_matrix(
+        links_=strail_2020_preprocess_1,
+        alloc_cols=["carrier", "friylab"],
+        milemix_cols=["friylab", "carrier"],
+    )
+    st_fuel_consmp = get_alloc_vals(
+        alloc_keys_=st_milemx_alloc["alloc_keys"], vals_=fueluse2019_preprc_
+    ).st_fuel_consmp.to_numpy()
+    link_fuel_consmp = st_milemx_alloc["alloc_mat"] @ st_fuel_consmp
+    # Removes DART's industrial and Yard rows. They have null fuel
+    # consumption.
+    has_fuel = ~np.isnan(st_fuel_consmp[st_milemx_alloc["alloc_codes"]])
     fueluse2019_preprc_cls1_yi_cls3_comut_pasng_milemx = (
-        strail_2020_preprocess_.loc[
-            lambda df: (
-                (~df.carrier.isin(list(cls1_carriers_)))
-                | (
-                    (df.carrier.isin(list(cls1_carriers_)))
-                    & (df.friylab.isin(["IYcat"]))
-                )
-            )
-        ]
-        .merge(fueluse2019_preprc_, on=["carrier", "friylab"], how="left")
-        .loc[lambda df: ~df.st_fuel_consmp.isna()]
-        # Removes DART's industrial and Yard rows. They have null fuel
-        # consumption.
-        .assign(
-            totnetmiles=lambda df: df.groupby(["friylab", "carrier"]).miles.transform(
-                sum
-            ),
-            milemx=lambda df: df.miles / df.totnetmiles,
-            link_fuel_consmp=lambda df: df.milemx * df.st_fuel_consmp,
+        strail_2020_preprocess_1.assign(
+            st_fuel_consmp=st_fuel_consmp[st_milemx_alloc["alloc_codes"]],
+            totnetmiles=st_milemx_alloc["totnetmiles"],
+            milemx=st_milemx_alloc["milemx"],
+            link_fuel_consmp=link_fuel_consmp,
         )
+        .loc[has_fuel]
         .reset_index(drop=True)
     )
     return fueluse2019_preprc_cls1_yi_cls3_comut_pasng_milemx
 
 
+@profile_stage
 def get_fuel_consmp_by_cnty_carrier(
     path_natrail2020_: str,
     path_rail_carrier_grp_: str,
@@ -290,6 +577,7 @@ def get_fuel_consmp_by_cnty_carrier(
     map_rrgrp_: dict,
     cls1_carriers_=("BNSF", "KCS", "UP"),
     filter_st=("TX",),
+    path_natrail_st_partition_dir_=None,
 ) -> pd.DataFrame:
     """
     Use statewide fuel usage, proportion of fuel usage by county and national
@@ -320,6 +608,9 @@ def get_fuel_consmp_by_cnty_carrier(
         Class 1 carriers in Texas.
     filter_st:
         Filter state: Texas for this study.
+    path_natrail_st_partition_dir_:
+        Directory with per-state partitions of the national rail dataset.
+        The national file is read in chunks when None.
 
     Returns
     -------
@@ -333,6 +624,7 @@ def get_fuel_consmp_by_cnty_carrier(
         path_fill_missing_yardnames_=path_fill_missing_yardnames_,
         map_rrgrp_=map_rrgrp_,
         filter_st=filter_st,
+        path_natrail_st_partition_dir_=path_natrail_st_partition_dir_,
     )
     fueluse2019_preprc = preprc_fuelusg(path_fueluserail2019_=path_fueluserail2019_)
     txrail_milemx_cls1_19 = get_class_1_freight_fuel_consump(
@@ -0,0 +1,262 @@
+"""
+Run the whole inventory in memory, from the raw data to the uncontrolled and
+controlled emission quantities. The dataframes are passed directly between
+the steps instead of being written to csv files and read back. Outputs are
+only written to disk when requested.
+"""
+import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
+from locoei.utilis import (
+    PATH_RAW,
+    PATH_INTERIM,
+    PATH_PROCESSED,
+    get_excel_cache_stats,
+    reset_excel_cache_stats,
+    write_artifact,
+)
+from locoei.fuelcsmp import get_fuel_consmp_by_cnty_carrier
+from locoei.emisrt import get_emis_rt
+from locoei.emisquant import get_emis_quant_from_df
+from locoei.uncntr_cntr_emisquant import (
+    get_txled_factors,
+    get_deri_quantity_red,
+    get_uncntr_cntr_emis_quant,
+)
+from locoei.controls import get_control_variant
+from locoei.pipeline import map_rrgrp
+from locoei.profiling import profile_run, profile_stage, write_profile_report
+
+INVENTORY_OUTPUT_FILES = {
+    "fuel_consump": "fuelconsump_2019_tx.csv",
+    "emis_rt": "emission_factor.csv",
+    "emis_quant": "emis_quant_loco.csv",
+    "emis_quant_agg": "emis_quant_loco_agg.csv",
+    "emis_quant_fact": "emis_quant_loco_fact.csv",
+    "emis_quant_dim_county": "emis_quant_loco_dim_county.csv",
+    "emis_quant_dim_scc": "emis_quant_loco_dim_scc.csv",
+    "emis_quant_dim_facility": "emis_quant_loco_dim_facility.csv",
+    "emis_quant_dim_pollutant": "emis_quant_loco_dim_pollutant.csv",
+    "txled_fac": "txled_factors_by_county_prc.csv",
+    "uncntr_cntr_emis_quant": "uncntr_cntr_emis_quant.csv",
+    "cntr_emis_quant": "cntr_emis_quant.csv",
+    "uncntr_emis_quant": "uncntr_emis_quant.csv",
+    "deri_emis_red_by_yard_summary": "deri_factors_by_county_prc.csv",
+}
+
+
+@profile_stage
+def write_inventory_outputs(
+    inventory_: dict, path_out_dir_: str, outputs_to_write=None, output_format="csv"
+) -> None:
+    """
+    Write the dataframes returned by run_inventory to csv files or artifacts
+    in path_out_dir_.
+
+    inventory_:
+        dict returned by run_inventory.
+    path_out_dir_:
+        Output directory.
+    outputs_to_write:
+        Keys of INVENTORY_OUTPUT_FILES to write. All outputs are written when
+        None.
+    output_format:
+        "csv": csv files named by INVENTORY_OUTPUT_FILES.
+        "parquet": artifact directories (utilis.write_artifact) partitioned
+        by year and pollutant, named by INVENTORY_OUTPUT_FILES without the
+        extension.
+    """
+    assert output_format in ("csv", "parquet"), (
+        f"Unknown output format {output_format}."
+    )
+    if outputs_to_write is None:
+        outputs_to_write = INVENTORY_OUTPUT_FILES.keys()
+    unknown_outputs = set(outputs_to_write) - set(INVENTORY_OUTPUT_FILES)
+    assert not unknown_outputs, f"Unknown inventory outputs: {unknown_outputs}."
+    if not os.path.exists(path_out_dir_):
+        os.makedirs(path_out_dir_)
+    for output_nm in outputs_to_write:
+        path_out = os.path.join(path_out_dir_, INVENTORY_OUTPUT_FILES[output_nm])
+        if output_format == "parquet":
+            write_artifact(inventory_[output_nm], os.path.splitext(path_out)[0])
+        else:
+            inventory_[output_nm].to_csv(path_out)
+
+
+@profile_stage
+def run_inventory(
+    path_raw_=PATH_RAW,
+    path_interim_=PATH_INTERIM,
+    map_rrgrp_=map_rrgrp,
+    cls1_carriers=("BNSF", "KCS", "UP"),
+    filter_st=("TX",),
+    pre_2011_sulfur_ppm=500,
+    post_2011_sulfur_ppm=15,
+    path_out_dir_=None,
+    outputs_to_write=None,
+    output_format="csv",
+    profile=False,
+) -> dict:
+    """
+    Get the fuel consumption, emission rates, emission quantities, and the
+    TxLED controlled and DERI uncontrolled emission quantities in one call.
+
+    Parameters
+    ----------
+    path_raw_, path_interim_:
+        Raw and interim data directories. The input files are the same as the
+        ones used by the individual scripts.
+    map_rrgrp_
+        xwalk b/w national rail link classifiers and rail groups.
+    cls1_carriers
+        Class 1 carriers in the state.
+    filter_st:
+        Filter state.
+    pre_2011_sulfur_ppm, post_2011_sulfur_ppm:
+        Fuel sulfur content used for the SO2 emission rates.
+    path_out_dir_:
+        Directory to write the outputs to. Nothing is written when None.
+    outputs_to_write:
+        Keys of INVENTORY_OUTPUT_FILES to write when path_out_dir_ is given.
+        All outputs are written when None.
+    output_format:
+        "csv" or "parquet"; see write_inventory_outputs.
+    profile:
+        Record the wall time, CPU time, peak RSS delta, and row counts of each
+        stage. The records are returned as the profile_report dataframe and,
+        when path_out_dir_ is given, written to run_report.json and
+        run_report.txt in path_out_dir_.
+
+    Returns
+    -------
+    dict
+        Dataframes keyed by the INVENTORY_OUTPUT_FILES keys, and profile_report
+        when profile is True.
+    """
+    if profile:
+        with profile_run() as profile_records:
+            inventory = run_inventory(
+                path_raw_=path_raw_,
+                path_interim_=path_interim_,
+                map_rrgrp_=map_rrgrp_,
+                cls1_carriers=cls1_carriers,
+                filter_st=filter_st,
+                pre_2011_sulfur_ppm=pre_2011_sulfur_ppm,
+                post_2011_sulfur_ppm=post_2011_sulfur_ppm,
+                path_out_dir_=path_out_dir_,
+                outputs_to_write=outputs_to_write,
+                output_format=output_format,
+            )
+        if path_out_dir_ is not None:
+            write_profile_report(profile_records, path_out_dir_)
+        inventory["profile_report"] = pd.DataFrame(profile_records)
+        return inventory
+    reset_excel_cache_stats()
+    path_county = os.path.join(path_raw_, "Texas_County_Boundaries.csv")
+    fuel_consump = get_fuel_consmp_by_cnty_carrier(
+        path_natrail2020_=os.path.join(path_interim_, "North_American_Rail_Lines.csv"),
+        path_rail_carrier_grp_=os.path.join(path_raw_, "rail_carrier_grp2020.csv"),
+        path_fill_missing_yardnames_=os.path.join(
+            path_interim_,
+            "gis_debugging",
+            "north_america_rail_2021",
+            "filled_missing_yards.xlsx",
+        ),
+        path_fueluserail2019_=os.path.join(path_raw_, "RR_2019FuelUsage.csv"),
+        path_cls1_cntpct_=os.path.join(path_raw_, "2019CountyPct.csv"),
+        map_rrgrp_=map_rrgrp_,
+        cls1_carriers_=cls1_carriers,
+        filter_st=filter_st,
+    )
+    fuel_consump["year"] = 2019
+    emis_rt = get_emis_rt(
+        path_exp_pol_list_=os.path.join(
+            path_interim_, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
+        ),
+        path_hap_speciation_=os.path.join(
+            path_interim_,
+            "epa_speciation_table",
+            "power_query",
+            "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+        ),
+        path_nox_pm10_hc_epa_em_fac_=os.path.join(
+            path_interim_,
+            "epa_emission_rates",
+            "epa_2009_emission_rates_nox_pm10_hc.xlsx",
+        ),
+        pre_2011_sulfur_ppm=pre_2011_sulfur_ppm,
+        post_2011_sulfur_ppm=post_2011_sulfur_ppm,
+    )
+    emis_quant_res = get_emis_quant_from_df(
+        fuel_consump_=fuel_consump,
+        emis_rt_=emis_rt,
+        path_proj_fac_=os.path.join(path_interim_, "Projection Factors 04132021.xlsx"),
+        path_county_=path_county,
+        path_ertac_2017_=os.path.join(path_interim_, "imputed_ertac_yard_2017.xlsx"),
+    )
+    emis_quant_agg = emis_quant_res["emis_quant_agg"]
+    txled_fac = get_txled_factors(
+        path_txled_counties_=os.path.join(path_raw_, "txled_counties.csv"),
+        path_texas_counties_=path_county,
+    )
+    deri_loco_nox_red_yr_prcd_emis_quant_region = get_deri_quantity_red(
+        path_deri_loco_regions_=os.path.join(path_raw_, "deri_loco_regions.json"),
+        path_deri_loco_nox_red_yr_=os.path.join(
+            path_raw_, "DERI_List_20190831_Loco_Area_Summary.xlsx"
+        ),
+        path_texas_counties_=path_county,
+    )
+    # TxLED and DERI are applied in one pass; the controlled and uncontrolled
+    # emissions are sibling columns of uncntr_cntr_emis_quant, and
+    # cntr_emis_quant and uncntr_emis_quant are its column subsets.
+    uncntr_cntr_emis_quant_res = get_uncntr_cntr_emis_quant(
+        emis_quant_agg_=emis_quant_agg,
+        txled_fac_=txled_fac,
+        deri_loco_nox_red_yr_prcd_emis_quant_region_=deri_loco_nox_red_yr_prcd_emis_quant_region,
+    )
+    uncntr_cntr_emis_quant = uncntr_cntr_emis_quant_res["uncntr_cntr_emis_quant"]
+    control_strategies = uncntr_cntr_emis_quant_res["control_strategies"]
+    inventory = {
+        "fuel_consump": fuel_consump,
+        "emis_rt": emis_rt.to_long(),
+        "emis_quant": emis_quant_res["emis_quant"],
+        "emis_quant_agg": emis_quant_agg,
+        "emis_quant_fact": emis_quant_res["emis_quant_fact"],
+        **{
+            f"emis_quant_dim_{dim_nm}": emis_quant_dim
+            for dim_nm, emis_quant_dim in emis_quant_res["emis_quant_dims"].items()
+        },
+        "txled_fac": txled_fac,
+        "uncntr_cntr_emis_quant": uncntr_cntr_emis_quant,
+        "cntr_emis_quant": get_control_variant(
+            uncntr_cntr_emis_quant, control_strategies, "cntr"
+        ),
+        "uncntr_emis_quant": get_control_variant(
+            uncntr_cntr_emis_quant, control_strategies, "uncntr"
+        ),
+        "deri_emis_red_by_yard_summary": uncntr_cntr_emis_quant_res[
+            "deri_emis_red_by_yard_summary"
+        ],
+    }
+    excel_cache_stats = get_excel_cache_stats()
+    print(
+        f"Excel cache: {excel_cache_stats['hits']} hits, "
+        f"{excel_cache_stats['misses']} misses."
+    )
+    if path_out_dir_ is not None:
+        write_inventory_outputs(
+            inventory_=inventory,
+            path_out_dir_=path_out_dir_,
+            outputs_to_write=outputs_to_write,
+            output_format=output_format,
+        )
+    return inventory
+
+
+if __name__ == "__main__":
+    inventory_res = run_inventory(
+        path_out_dir_=os.path.join(PATH_PROCESSED, "inventory"),
+        outputs_to_write=("uncntr_cntr_emis_quant",),
+    )
@@ -0,0 +1,268 @@
+"""
+Run the fuel consumption, emission rate, and emission quantity steps for
+several states. The national rail links, statewide fuel usage, and county
+tables are partitioned by state and each state is run in a worker process. The
+per-state emission quantities are merged into one national table.
+
+The statewide fuel usage, class 1 county fuel mix, county boundaries,
+projection factors, and filled yard names are read per state (see
+get_state_input_paths). The national rail links, carrier groups, EPA emission
+rates, and ERTAC yards are shared by all the states.
+
+TxLED and DERI controls are Texas specific and are not applied here; use
+run_inventory for the Texas controlled and uncontrolled emission quantities.
+"""
+import time
+import pandas as pd
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
+from locoei.utilis import PATH_RAW, PATH_INTERIM, PATH_PROCESSED
+from locoei.fuelcsmp import (
+    get_fuel_consmp_by_cnty_carrier,
+    preprc_fuelusg,
+    write_natrail_st_partitions,
+    natrail_st_partitions_are_current,
+)
+from locoei.emisrt import get_emis_rt, EmissionFactorCube
+from locoei.emisquant import get_emis_quant_from_df
+from locoei.pipeline import map_rrgrp
+
+CLS1_CARRIERS_BY_ST = {"TX": ("BNSF", "KCS", "UP")}
+
+
+def get_state_input_paths(st, path_raw_=PATH_RAW, path_interim_=PATH_INTERIM) -> dict:
+    """
+    Get the paths to the statewide fuel usage, class 1 county fuel usage mix,
+    county boundary, projection factor, and filled yard name files for a
+    state. Texas uses the files in path_raw_ and path_interim_. Other states
+    use the files with the same names in path_raw_/states/{st}, with the
+    county boundaries in County_Boundaries.csv (CNTY_NM and FIPS_ST_CNTY_CD
+    columns) and the filled yard names in filled_missing_yards.xlsx.
+    """
+    if st == "TX":
+        path_st_raw = path_raw_
+        path_county = os.path.join(path_raw_, "Texas_County_Boundaries.csv")
+        path_proj_fac = os.path.join(path_interim_, "Projection Factors 04132021.xlsx")
+        path_fill_missing_yardnames = os.path.join(
+            path_interim_,
+            "gis_debugging",
+            "north_america_rail_2021",
+            "filled_missing_yards.xlsx",
+        )
+    else:
+        path_st_raw = os.path.join(path_raw_, "states", st)
+        path_county = os.path.join(path_st_raw, "County_Boundaries.csv")
+        path_proj_fac = os.path.join(path_st_raw, "Projection Factors 04132021.xlsx")
+        path_fill_missing_yardnames = os.path.join(
+            path_st_raw, "filled_missing_yards.xlsx"
+        )
+    return {
+        "path_fueluserail2019": os.path.join(path_st_raw, "RR_2019FuelUsage.csv"),
+        "path_cls1_cntpct": os.path.join(path_st_raw, "2019CountyPct.csv"),
+        "path_county": path_county,
+        "path_proj_fac": path_proj_fac,
+        "path_fill_missing_yardnames": path_fill_missing_yardnames,
+    }
+
+
+def get_state_fips(path_county_: str) -> int:
+    """Get the two digit state FIPS code from the county boundary file."""
+    county_fips = pd.read_csv(path_county_, usecols=["FIPS_ST_CNTY_CD"])
+    state_fips = (county_fips.FIPS_ST_CNTY_CD // 1000).unique()
+    assert len(state_fips) == 1, f"{path_county_} has counties from several states."
+    return int(state_fips[0])
+
+
+def get_state_cls1_carriers(
+    path_fueluserail2019_: str, path_rail_carrier_grp_: str
+) -> tuple:
+    """Get the class 1 carriers with fuel usage in the state."""
+    rail_carrier_grp = pd.read_csv(path_rail_carrier_grp_, index_col=0)
+    fueluse_carriers = set(preprc_fuelusg(path_fueluserail2019_).carrier)
+    return tuple(
+        sorted(
+            rail_carrier_grp.loc[
+                lambda df: (df.rr_group == "Class I")
+                & (df.carrier.isin(fueluse_carriers)),
+                "carrier",
+            ].unique()
+        )
+    )
+
+
+def get_state_emis_quant(
+    st,
+    emis_rt_: EmissionFactorCube,
+    path_raw_,
+    path_interim_,
+    map_rrgrp_,
+    cls1_carriers,
+    path_natrail_st_partition_dir_,
+) -> dict:
+    """
+    Run the fuel consumption and emission quantity steps for one state.
+
+    Returns
+    -------
+    dict
+        emis_quant_agg: aggregate emission quantities with a stateab column.
+        metrics: dict with the state run time and throughput.
+    """
+    start_time = time.time()
+    path_st_inputs = get_state_input_paths(st, path_raw_, path_interim_)
+    path_rail_carrier_grp = os.path.join(path_raw_, "rail_carrier_grp2020.csv")
+    if cls1_carriers is None:
+        cls1_carriers = get_state_cls1_carriers(
+            path_fueluserail2019_=path_st_inputs["path_fueluserail2019"],
+            path_rail_carrier_grp_=path_rail_carrier_grp,
+        )
+    fuel_consump = get_fuel_consmp_by_cnty_carrier(
+        path_natrail2020_=os.path.join(path_interim_, "North_American_Rail_Lines.csv"),
+        path_rail_carrier_grp_=path_rail_carrier_grp,
+        path_fill_missing_yardnames_=path_st_inputs["path_fill_missing_yardnames"],
+        path_fueluserail2019_=path_st_inputs["path_fueluserail2019"],
+        path_cls1_cntpct_=path_st_inputs["path_cls1_cntpct"],
+        map_rrgrp_=map_rrgrp_,
+        cls1_carriers_=cls1_carriers,
+        filter_st=(st,),
+        path_natrail_st_partition_dir_=path_natrail_st_partition_dir_,
+    )
+    fuel_consump["year"] = 2019
+    emis_quant_res = get_emis_quant_from_df(
+        fuel_consump_=fuel_consump,
+        emis_rt_=emis_rt_,
+        path_proj_fac_=path_st_inputs["path_proj_fac"],
+        path_county_=path_st_inputs["path_county"],
+        path_ertac_2017_=os.path.join(path_interim_, "imputed_ertac_yard_2017.xlsx"),
+        state_fips=get_state_fips(path_st_inputs["path_county"]),
+    )
+    emis_quant_agg = emis_quant_res["emis_quant_agg"]
+    emis_quant_agg.insert(1, "stateab", st)
+    run_time_sec = time.time() - start_time
+    n_links = fuel_consump.fraarcid.nunique()
+    return {
+        "emis_quant_agg": emis_quant_agg,
+        "metrics": {
+            "stateab": st,
+            "n_links": n_links,
+            "n_emis_quant_agg_rows": len(emis_quant_agg),
+            "run_time_sec": run_time_sec,
+            "links_per_sec": n_links / run_time_sec,
+        },
+    }
+
+
+def run_multistate_inventory(
+    states,
+    path_raw_=PATH_RAW,
+    path_interim_=PATH_INTERIM,
+    map_rrgrp_=map_rrgrp,
+    cls1_carriers_by_st=None,
+    pre_2011_sulfur_ppm=500,
+    post_2011_sulfur_ppm=15,
+    workers=1,
+    path_natrail_st_partition_dir_=None,
+) -> dict:
+    """
+    Get the emission quantities for several states, one state per worker.
+
+    Parameters
+    ----------
+    states:
+        State abbreviations (STATEAB in the national rail data).
+    path_raw_, path_interim_:
+        Raw and interim data directories. See get_state_input_paths for the
+        state specific inputs.
+    map_rrgrp_
+        xwalk b/w national rail link classifiers and rail groups.
+    cls1_carriers_by_st:
+        Class 1 carriers by state. Defaults to CLS1_CARRIERS_BY_ST. States
+        not in the dict use the class 1 carriers in their fuel usage file.
+    pre_2011_sulfur_ppm, post_2011_sulfur_ppm:
+        Fuel sulfur content used for the SO2 emission rates.
+    workers:
+        Number of worker processes. States are run one after the other in
+        this process when 1.
+    path_natrail_st_partition_dir_:
+        Directory for the per-state national rail partitions. Defaults to
+        path_interim_/natrail_by_state. The partitions are written before
+        the states are run if they are missing or out of date.
+
+    Returns
+    -------
+    dict
+        emis_quant_agg: national aggregate emission quantities.
+        metrics: per-state run time and throughput.
+    """
+    if cls1_carriers_by_st is None:
+        cls1_carriers_by_st = CLS1_CARRIERS_BY_ST
+    if path_natrail_st_partition_dir_ is None:
+        path_natrail_st_partition_dir_ = os.path.join(
+            path_interim_, "natrail_by_state"
+        )
+    path_natrail2020 = os.path.join(path_interim_, "North_American_Rail_Lines.csv")
+    if not natrail_st_partitions_are_current(
+        path_natrail2020, path_natrail_st_partition_dir_
+    ):
+        # Write the partitions once here so that the workers don't race to
+        # write them.
+        write_natrail_st_partitions(
+            path_natrail2020_=path_natrail2020,
+            path_st_partition_dir_=path_natrail_st_partition_dir_,
+        )
+    emis_rt = get_emis_rt(
+        path_exp_pol_list_=os.path.join(
+            path_interim_, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
+        ),
+        path_hap_speciation_=os.path.join(
+            path_interim_,
+            "epa_speciation_table",
+            "power_query",
+            "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+        ),
+        path_nox_pm10_hc_epa_em_fac_=os.path.join(
+            path_interim_,
+            "epa_emission_rates",
+            "epa_2009_emission_rates_nox_pm10_hc.xlsx",
+        ),
+        pre_2011_sulfur_ppm=pre_2011_sulfur_ppm,
+        post_2011_sulfur_ppm=post_2011_sulfur_ppm,
+    )
+    state_kwargs = [
+        dict(
+            st=st,
+            emis_rt_=emis_rt,
+            path_raw_=path_raw_,
+            path_interim_=path_interim_,
+            map_rrgrp_=map_rrgrp_,
+            cls1_carriers=cls1_carriers_by_st.get(st),
+            path_natrail_st_partition_dir_=path_natrail_st_partition_dir_,
+        )
+        for st in states
+    ]
+    if workers == 1:
+        state_res_list = [get_state_emis_quant(**kwargs) for kwargs in state_kwargs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(get_state_emis_quant, **kwargs)
+                for kwargs in state_kwargs
+            ]
+            state_res_list = [future.result() for future in futures]
+    emis_quant_agg = pd.concat(
+        [state_res["emis_quant_agg"] for state_res in state_res_list],
+        ignore_index=True,
+    )
+    metrics = pd.DataFrame([state_res["metrics"] for state_res in state_res_list])
+    return {"emis_quant_agg": emis_quant_agg, "metrics": metrics}
+
+
+if __name__ == "__main__":
+    multistate_res = run_multistate_inventory(states=("TX",), workers=os.cpu_count())
+    multistate_res["emis_quant_agg"].to_csv(
+        os.path.join(PATH_PROCESSED, "emis_quant_loco_agg_multistate.csv")
+    )
+    print(multistate_res["metrics"])
@@ -0,0 +1,501 @@
+"""
+Run the inventory stages as a dependency graph. A stage is skipped when the
+content hash of its input files and parameters matches the hash recorded the
+last time it ran, and all of its output files still exist.
+"""
+import hashlib
+import json
+from collections import namedtuple
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
+from locoei.utilis import (
+    PATH_RAW,
+    PATH_INTERIM,
+    PATH_PROCESSED,
+    write_artifact,
+    read_artifact,
+)
+from locoei.fuelcsmp import get_fuel_consmp_by_cnty_carrier
+from locoei.emisrt import get_emis_rt
+from locoei.emisquant import get_emis_quant
+from locoei.uncntr_cntr_emisquant import (
+    get_txled_factors,
+    get_deri_quantity_red,
+    get_uncntr_cntr_emis_quant,
+)
+from locoei.cersxml_templ import get_xml_templ
+from locoei.uncntr_cntr_cersxml import (
+    clean_up_uncntr_cntr_emisquant,
+    get_tx_counties_list,
+)
+from locoei.cersxml_writer import write_uncntr_cntr_xml_stream
+
+Stage = namedtuple("Stage", ["name", "func", "inputs", "params", "outputs"])
+Stage.__doc__ = """
+A single step of the inventory.
+
+name:
+    Unique stage name.
+func:
+    Function called as func(**inputs, **params, **outputs).
+inputs:
+    dict of keyword argument to input file path. A stage depends on the stage
+    that lists the same path in its outputs.
+params:
+    dict of keyword argument to JSON serializable parameter value.
+outputs:
+    dict of keyword argument to output file path.
+"""
+
+map_rrgrp = {
+    "M": "Freight",  # Main sub network
+    "I": "Freight",  # Major Industrial Lead
+    "S": "Freight",  # Passing sidings over 4000 feet long
+    "O": "Industrial",  # Other track (minor industrial leads)
+    "Y": "Yard",  # Yard Switching
+    "Z": "Transit",  # Transit-only rail line or museum/tourist operation
+    "R": "Other",  # Abandoned line that has been physically removed
+    "A": "Other",  # Abandoned rail line
+    "X": "Other",  # Out of service line
+    "F": "Other",  # Rail ferry connection
+    "T": "Other",  # Trail on former rail right-of-way
+}
+
+
+def hash_file(path_: str, chunk_size=2 ** 20) -> str:
+    """
+    Get the sha256 hash of the file content. For a directory (e.g. an
+    artifact written by utilis.write_artifact), hash the relative path and
+    content of every file in it.
+    """
+    file_hash = hashlib.sha256()
+    if os.path.isdir(path_):
+        for dir_path, dir_nms, file_nms in os.walk(path_):
+            dir_nms.sort()
+            for file_nm in sorted(file_nms):
+                path_file = os.path.join(dir_path, file_nm)
+                file_hash.update(os.path.relpath(path_file, path_).encode())
+                file_hash.update(hash_file(path_file, chunk_size).encode())
+        return file_hash.hexdigest()
+    with open(path_, "rb") as fi:
+        for chunk in iter(lambda: fi.read(chunk_size), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_stage_hash(stage: Stage) -> str:
+    """
+    Hash the stage name, function, input file contents and parameters.
+    Upstream changes are picked up through the content of the upstream output
+    files, so a re-run upstream stage that writes identical outputs does not
+    invalidate the downstream stages.
+    """
+    stage_hash = hashlib.sha256()
+    stage_hash.update(stage.name.encode())
+    stage_hash.update(f"{stage.func.__module__}.{stage.func.__qualname__}".encode())
+    for arg_nm in sorted(stage.inputs):
+        stage_hash.update(arg_nm.encode())
+        stage_hash.update(hash_file(stage.inputs[arg_nm]).encode())
+    stage_hash.update(json.dumps(stage.params, sort_keys=True, default=str).encode())
+    return stage_hash.hexdigest()
+
+
+def get_stage_order(stages: list) -> list:
+    """
+    Sort the stages such that every stage comes after the stages producing its
+    inputs.
+    """
+    producer = {}
+    for stage in stages:
+        for path_out in stage.outputs.values():
+            if path_out in producer:
+                raise ValueError(
+                    f"{path_out} is an output of both {producer[path_out]} and "
+                    f"{stage.name}."
+                )
+            producer[path_out] = stage.name
+    stage_deps = {
+        stage.name: {
+            producer[path_in]
+            for path_in in stage.inputs.values()
+            if path_in in producer
+        }
+        for stage in stages
+    }
+    stage_by_name = {stage.name: stage for stage in stages}
+    ordered_stages = []
+    done = set()
+    while len(done) < len(stages):
+        ready = [
+            stage
+            for stage in stages
+            if (stage.name not in done) and (stage_deps[stage.name] <= done)
+        ]
+        if not ready:
+            raise ValueError(
+                "Stages have a circular dependency: "
+                f"{sorted(set(stage_by_name) - done)}"
+            )
+        for stage in ready:
+            ordered_stages.append(stage)
+            done.add(stage.name)
+    return ordered_stages
+
+
+def run_pipeline(stages: list, path_manifest_: str, force=False) -> dict:
+    """
+    Run the stages in dependency order and skip the ones that are up to date.
+
+    stages:
+        List of Stage.
+    path_manifest_:
+        json file with the hash of each stage from its last successful run.
+    force:
+        Re-run all stages.
+    Returns
+    -------
+    dict
+        "ran" or "skipped" by stage name.
+    """
+    if os.path.exists(path_manifest_):
+        with open(path_manifest_) as fi:
+            manifest = json.load(fi)
+    else:
+        manifest = {}
+    status = {}
+    for stage in get_stage_order(stages):
+        stage_hash = get_stage_hash(stage)
+        is_up_to_date = (manifest.get(stage.name) == stage_hash) and all(
+            os.path.exists(path_out) for path_out in stage.outputs.values()
+        )
+        if is_up_to_date and not force:
+            print(f"Skipping stage: {stage.name}")
+            status[stage.name] = "skipped"
+            continue
+        print(f"Running stage: {stage.name}")
+        stage.func(**stage.inputs, **stage.params, **stage.outputs)
+        manifest[stage.name] = stage_hash
+        # Save after every stage so that a failure keeps the finished stages.
+        with open(path_manifest_, "w") as fo:
+            json.dump(manifest, fo, indent=2, sort_keys=True)
+        status[stage.name] = "ran"
+    return status
+
+
+def run_fuel_consump(
+    path_natrail2020_,
+    path_rail_carrier_grp_,
+    path_fill_missing_yardnames_,
+    path_fueluserail2019_,
+    path_cls1_cntpct_,
+    map_rrgrp_,
+    cls1_carriers_,
+    filter_st,
+    path_out_fuel_consump_,
+):
+    """Stage: fuel consumption by link, county, and carrier."""
+    fuel_consump = get_fuel_consmp_by_cnty_carrier(
+        path_natrail2020_=path_natrail2020_,
+        path_rail_carrier_grp_=path_rail_carrier_grp_,
+        path_fill_missing_yardnames_=path_fill_missing_yardnames_,
+        path_fueluserail2019_=path_fueluserail2019_,
+        path_cls1_cntpct_=path_cls1_cntpct_,
+        map_rrgrp_=map_rrgrp_,
+        cls1_carriers_=tuple(cls1_carriers_),
+        filter_st=tuple(filter_st),
+    )
+    fuel_consump["year"] = 2019
+    fuel_consump.to_csv(path_out_fuel_consump_)
+
+
+def run_emis_rt(
+    path_exp_pol_list_,
+    path_hap_speciation_,
+    path_nox_pm10_hc_epa_em_fac_,
+    pre_2011_sulfur_ppm,
+    post_2011_sulfur_ppm,
+    path_out_emis_rt_,
+):
+    """Stage: emission rates for 2011 to 2050."""
+    get_emis_rt(
+        path_exp_pol_list_=path_exp_pol_list_,
+        path_hap_speciation_=path_hap_speciation_,
+        path_nox_pm10_hc_epa_em_fac_=path_nox_pm10_hc_epa_em_fac_,
+        pre_2011_sulfur_ppm=pre_2011_sulfur_ppm,
+        post_2011_sulfur_ppm=post_2011_sulfur_ppm,
+    ).to_long().to_csv(path_out_emis_rt_)
+
+
+def run_emis_quant(
+    path_fuel_consump_,
+    path_emis_rt_,
+    path_proj_fac_,
+    path_county_,
+    path_ertac_2017_,
+    path_out_emisquant_,
+    path_out_emisquant_agg_,
+):
+    """Stage: emission quantities by county, SCC, and yard."""
+    emis_quant_res = get_emis_quant(
+        path_fuel_consump_=path_fuel_consump_,
+        path_emis_rt_=path_emis_rt_,
+        path_proj_fac_=path_proj_fac_,
+        path_county_=path_county_,
+        path_ertac_2017_=path_ertac_2017_,
+    )
+    write_artifact(emis_quant_res["emis_quant"], path_out_emisquant_)
+    write_artifact(emis_quant_res["emis_quant_agg"], path_out_emisquant_agg_)
+
+
+def run_uncntr_cntr_emis_quant(
+    path_emisquant_agg_,
+    path_txled_counties_,
+    path_deri_loco_regions_,
+    path_deri_loco_nox_red_yr_,
+    path_texas_counties_,
+    path_out_txled_fac_,
+    path_out_deri_,
+    path_out_uncntr_cntr_,
+):
+    """
+    Stage: uncontrolled and controlled emissions in one pass, with the TxLED
+    NOx factors and the DERI benefits.
+    """
+    emis_quant_agg = read_artifact(path_emisquant_agg_)
+    txled_fac = get_txled_factors(
+        path_txled_counties_=path_txled_counties_,
+        path_texas_counties_=path_texas_counties_,
+    )
+    txled_fac.to_csv(path_out_txled_fac_)
+    deri_loco_nox_red_yr_prcd_emis_quant_region = get_deri_quantity_red(
+        path_deri_loco_regions_=path_deri_loco_regions_,
+        path_deri_loco_nox_red_yr_=path_deri_loco_nox_red_yr_,
+        path_texas_counties_=path_texas_counties_,
+    )
+    uncntr_cntr_emis_quant_dict = get_uncntr_cntr_emis_quant(
+        emis_quant_agg_=emis_quant_agg,
+        txled_fac_=txled_fac,
+        deri_loco_nox_red_yr_prcd_emis_quant_region_=deri_loco_nox_red_yr_prcd_emis_quant_region,
+    )
+    uncntr_cntr_emis_quant_dict["deri_emis_red_by_yard_summary"].to_csv(path_out_deri_)
+    write_artifact(
+        uncntr_cntr_emis_quant_dict["uncntr_cntr_emis_quant"], path_out_uncntr_cntr_
+    )
+
+
+def run_xml_templ(path_templ_, path_emis_rt_, path_out_templ_):
+    """Stage: TTI xml template from ERG's template."""
+    get_xml_templ(
+        path_templ_=path_templ_,
+        path_emis_rate_=path_emis_rt_,
+        path_out_templ_=path_out_templ_,
+    )
+
+
+def run_cers_xml(
+    path_uncntr_cntr_emisquant_,
+    path_xml_templ_,
+    path_county_,
+    path_out_uncntr_xml_,
+    path_out_cntr_xml_,
+):
+    """
+    Stage: 2020 uncontrolled and controlled CERS xmls from one read of the
+    combined emission quantities.
+    """
+    non_point_scc_list = [
+        "2285002006",
+        "2285002007",
+        "2285002008",
+        "2285002009",
+        "2285002010",
+    ]
+    tx_counties_list = get_tx_counties_list(path_county_)
+    uncntr_cntr_emisquant_2020_fil_scc_dict = clean_up_uncntr_cntr_emisquant(
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant_
+    )
+    for variant, path_out_xml in [
+        ("uncntr", path_out_uncntr_xml_),
+        ("cntr", path_out_cntr_xml_),
+    ]:
+        write_uncntr_cntr_xml_stream(
+            path_xml_templ=path_xml_templ_,
+            emisquant_value_index=uncntr_cntr_emisquant_2020_fil_scc_dict[variant][
+                "value_index"
+            ],
+            tx_counties_list=tx_counties_list,
+            non_point_scc_list=non_point_scc_list,
+            doc_id=f"locomotives_{variant}_cers_aerr_2020_xml",
+            path_out_xml=path_out_xml,
+        )
+
+
+def get_texas_stages(
+    path_raw_=PATH_RAW,
+    path_interim_=PATH_INTERIM,
+    path_processed_=PATH_PROCESSED,
+    cls1_carriers=("BNSF", "KCS", "UP"),
+    filter_st=("TX",),
+    pre_2011_sulfur_ppm=500,
+    post_2011_sulfur_ppm=15,
+) -> list:
+    """
+    Get the stages that run_scripts_in_order.cmd runs, from the raw data to
+    the uncontrolled and controlled CERS xmls. The intermediate outputs are
+    written without date stamps to data/interim/pipeline so that the file
+    names are stable between runs. The emission quantities are artifact
+    directories (utilis.write_artifact) partitioned by year and pollutant.
+    """
+    path_pipeline = os.path.join(path_interim_, "pipeline")
+    path_fuel_consump = os.path.join(path_pipeline, "fuelconsump_2019_tx.csv")
+    path_emis_rt = os.path.join(path_pipeline, "emission_factor.csv")
+    path_emisquant = os.path.join(path_pipeline, "emis_quant_loco")
+    path_emisquant_agg = os.path.join(path_pipeline, "emis_quant_loco_agg")
+    path_uncntr_cntr = os.path.join(path_pipeline, "uncntr_cntr_emis_quant")
+    path_xml_templ = os.path.join(path_pipeline, "xml_rail_templ_tti.xml")
+    path_county = os.path.join(path_raw_, "Texas_County_Boundaries.csv")
+    stages = [
+        Stage(
+            name="fuel_consump",
+            func=run_fuel_consump,
+            inputs={
+                "path_natrail2020_": os.path.join(
+                    path_interim_, "North_American_Rail_Lines.csv"
+                ),
+                "path_rail_carrier_grp_": os.path.join(
+                    path_raw_, "rail_carrier_grp2020.csv"
+                ),
+                "path_fill_missing_yardnames_": os.path.join(
+                    path_interim_,
+                    "gis_debugging",
+                    "north_america_rail_2021",
+                    "filled_missing_yards.xlsx",
+                ),
+                "path_fueluserail2019_": os.path.join(
+                    path_raw_, "RR_2019FuelUsage.csv"
+                ),
+                "path_cls1_cntpct_": os.path.join(path_raw_, "2019CountyPct.csv"),
+            },
+            params={
+                "map_rrgrp_": map_rrgrp,
+                "cls1_carriers_": list(cls1_carriers),
+                "filter_st": list(filter_st),
+            },
+            outputs={"path_out_fuel_consump_": path_fuel_consump},
+        ),
+        Stage(
+            name="emis_rt",
+            func=run_emis_rt,
+            inputs={
+                "path_exp_pol_list_": os.path.join(
+                    path_interim_,
+                    "epa_pol_list",
+                    "np_expected_poll_list_complete_v1.xlsx",
+                ),
+                "path_hap_speciation_": os.path.join(
+                    path_interim_,
+                    "epa_speciation_table",
+                    "power_query",
+                    "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+                ),
+                "path_nox_pm10_hc_epa_em_fac_": os.path.join(
+                    path_interim_,
+                    "epa_emission_rates",
+                    "epa_2009_emission_rates_nox_pm10_hc.xlsx",
+                ),
+            },
+            params={
+                "pre_2011_sulfur_ppm": pre_2011_sulfur_ppm,
+                "post_2011_sulfur_ppm": post_2011_sulfur_ppm,
+            },
+            outputs={"path_out_emis_rt_": path_emis_rt},
+        ),
+        Stage(
+            name="emis_quant",
+            func=run_emis_quant,
+            inputs={
+                "path_fuel_consump_": path_fuel_consump,
+                "path_emis_rt_": path_emis_rt,
+                "path_proj_fac_": os.path.join(
+                    path_interim_, "Projection Factors 04132021.xlsx"
+                ),
+                "path_county_": path_county,
+                "path_ertac_2017_": os.path.join(
+                    path_interim_, "imputed_ertac_yard_2017.xlsx"
+                ),
+            },
+            params={},
+            outputs={
+                "path_out_emisquant_": path_emisquant,
+                "path_out_emisquant_agg_": path_emisquant_agg,
+            },
+        ),
+        Stage(
+            name="uncntr_cntr_emis_quant",
+            func=run_uncntr_cntr_emis_quant,
+            inputs={
+                "path_emisquant_agg_": path_emisquant_agg,
+                "path_txled_counties_": os.path.join(path_raw_, "txled_counties.csv"),
+                "path_deri_loco_regions_": os.path.join(
+                    path_raw_, "deri_loco_regions.json"
+                ),
+                "path_deri_loco_nox_red_yr_": os.path.join(
+                    path_raw_, "DERI_List_20190831_Loco_Area_Summary.xlsx"
+                ),
+                "path_texas_counties_": path_county,
+            },
+            params={},
+            outputs={
+                "path_out_txled_fac_": os.path.join(
+                    path_pipeline, "txled_factors_by_county_prc.csv"
+                ),
+                "path_out_deri_": os.path.join(
+                    path_pipeline, "deri_factors_by_county_prc.csv"
+                ),
+                "path_out_uncntr_cntr_": path_uncntr_cntr,
+            },
+        ),
+        Stage(
+            name="xml_templ",
+            func=run_xml_templ,
+            inputs={
+                "path_templ_": os.path.join(
+                    path_raw_, "ERG", "rail2020-Uncontrolled.xml"
+                ),
+                "path_emis_rt_": path_emis_rt,
+            },
+            params={},
+            outputs={"path_out_templ_": path_xml_templ},
+        ),
+        Stage(
+            name="cers_xml",
+            func=run_cers_xml,
+            inputs={
+                "path_uncntr_cntr_emisquant_": path_uncntr_cntr,
+                "path_xml_templ_": path_xml_templ,
+                "path_county_": path_county,
+            },
+            params={},
+            outputs={
+                "path_out_uncntr_xml_": os.path.join(
+                    path_processed_, "uncntr_cers_tx.xml"
+                ),
+                "path_out_cntr_xml_": os.path.join(path_processed_, "cntr_cers_tx.xml"),
+            },
+        ),
+    ]
+    return stages
+
+
+if __name__ == "__main__":
+    path_pipeline = os.path.join(PATH_INTERIM, "pipeline")
+    if not os.path.exists(path_pipeline):
+        os.mkdir(path_pipeline)
+    stage_status = run_pipeline(
+        stages=get_texas_stages(),
+        path_manifest_=os.path.join(path_pipeline, "pipeline_manifest.json"),
+        force="--force" in sys.argv,
+    )
+    print(stage_status)
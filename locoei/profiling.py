@@ -0,0 +1,184 @@
+"""
+Opt-in timing and memory instrumentation of the inventory stages. The public
+stage functions are wrapped with profile_stage; code blocks inside a stage
+can be wrapped with profile_block. Nothing is recorded unless the code runs
+inside profile_run, so the wrappers only cost a check of the active run
+otherwise.
+
+Each record has the stage name, nesting depth, wall time, CPU time, peak RSS
+delta, and the input and output row counts. The peak RSS delta is the growth
+of the process peak RSS during the stage, so it is 0 for stages that stay
+under an earlier peak. Records from worker processes are not collected.
+"""
+import json
+import time
+import functools
+from contextlib import contextmanager
+import pandas as pd
+import os
+import sys
+
+_PROFILE_RECORDS = None
+_PROFILE_DEPTH = 0
+PROFILE_REPORT_COLS = [
+    "stage",
+    "wall_sec",
+    "cpu_sec",
+    "peak_rss_delta_mb",
+    "in_rows",
+    "out_rows",
+]
+
+
+def get_peak_rss_mb():
+    """Peak RSS of the process in MB. None where the resource module is not
+    available (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1024 ** 2 if sys.platform == "darwin" else peak_rss / 1024
+
+
+def count_rows(obj_):
+    """
+    Number of rows in a dataframe or series, or the total rows of the
+    dataframes and series in a dict, list, or tuple. None when obj_ holds no
+    dataframes.
+    """
+    if isinstance(obj_, (pd.DataFrame, pd.Series)):
+        return len(obj_)
+    if isinstance(obj_, dict):
+        obj_ = list(obj_.values())
+    if isinstance(obj_, (list, tuple)):
+        rows = [
+            len(val) for val in obj_ if isinstance(val, (pd.DataFrame, pd.Series))
+        ]
+        return sum(rows) if rows else None
+    return None
+
+
+def is_profiling() -> bool:
+    """True inside profile_run."""
+    return _PROFILE_RECORDS is not None
+
+
+@contextmanager
+def profile_run():
+    """
+    Record the stages run inside the with block.
+
+    Yields
+    ------
+    list
+        Stage records, in the order the stages started. Nested stages follow
+        their parent stage with a larger depth.
+    """
+    global _PROFILE_RECORDS, _PROFILE_DEPTH
+    assert not is_profiling(), "profile_run can not be nested."
+    _PROFILE_RECORDS = []
+    _PROFILE_DEPTH = 0
+    try:
+        yield _PROFILE_RECORDS
+    finally:
+        _PROFILE_RECORDS = None
+
+
+@contextmanager
+def profile_block(stage_nm: str, in_rows=None):
+    """
+    Record the code in the with block as stage_nm when profiling. Yields the
+    record dict; set record["out_rows"] to record the output rows of the
+    block. The dict is not kept when not profiling.
+    """
+    global _PROFILE_DEPTH
+    if not is_profiling():
+        yield {}
+        return
+    record = {"stage": stage_nm, "depth": _PROFILE_DEPTH, "in_rows": in_rows}
+    _PROFILE_RECORDS.append(record)
+    _PROFILE_DEPTH += 1
+    start_peak_rss = get_peak_rss_mb()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall_sec"] = time.perf_counter() - start_wall
+        record["cpu_sec"] = time.process_time() - start_cpu
+        record["peak_rss_delta_mb"] = (
+            None if start_peak_rss is None else get_peak_rss_mb() - start_peak_rss
+        )
+        record.setdefault("out_rows", None)
+        _PROFILE_DEPTH -= 1
+
+
+def profile_stage(func):
+    """
+    Decorator that records each call of func as a stage when profiling. The
+    input rows are the rows of the dataframe arguments and the output rows are
+    the rows of the returned dataframe(s).
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not is_profiling():
+            return func(*args, **kwargs)
+        in_rows = count_rows(list(args) + list(kwargs.values()))
+        with profile_block(func.__name__, in_rows=in_rows) as record:
+            result = func(*args, **kwargs)
+            record["out_rows"] = count_rows(result)
+        return result
+
+    return wrapper
+
+
+def get_profile_report_table(profile_records_: list) -> str:
+    """Text table of the stage records, with the nested stages indented."""
+    profile_report = pd.DataFrame(profile_records_, columns=PROFILE_REPORT_COLS)
+    profile_report["stage"] = [
+        "  " * record["depth"] + record["stage"] for record in profile_records_
+    ]
+    for col in ["in_rows", "out_rows"]:
+        profile_report[col] = [
+            "" if pd.isna(val) else f"{int(val)}" for val in profile_report[col]
+        ]
+    stage_width = profile_report.stage.str.len().max()
+    return profile_report.to_string(
+        index=False,
+        na_rep="",
+        float_format="{:.3f}".format,
+        formatters={"stage": lambda val: f"{val:<{stage_width}}"},
+    )
+
+
+def write_profile_report(
+    profile_records_: list, path_out_dir_: str, report_nm="run_report"
+) -> dict:
+    """
+    Write the stage records to {report_nm}.json and a text table to
+    {report_nm}.txt in path_out_dir_.
+
+    Returns
+    -------
+    dict
+        Paths to the json and text reports.
+    """
+    if not os.path.exists(path_out_dir_):
+        os.makedirs(path_out_dir_)
+    path_report_json = os.path.join(path_out_dir_, f"{report_nm}.json")
+    path_report_txt = os.path.join(path_out_dir_, f"{report_nm}.txt")
+    with open(path_report_json, "w") as fo:
+        json.dump(
+            {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "stages": profile_records_,
+            },
+            fo,
+            indent=2,
+        )
+    with open(path_report_txt, "w") as fo:
+        fo.write(get_profile_report_table(profile_records_) + "\n")
+    return {"path_report_json": path_report_json, "path_report_txt": path_report_txt}
@@ -0,0 +1,82 @@
+"""
+Shared pandas dtypes for the low cardinality string columns of the fuel
+consumption, emission rate, and emission quantity dataframes. The columns are
+cast to categoricals when the inputs are loaded so that the repeated strings
+are stored once per category. Columns with a fixed set of values use the same
+categories in every dataframe, so they stay categorical through merges and
+concats. The categories are sorted, so sorts and groupbys order the rows the
+same way as the object columns.
+
+Groupbys on the categorical columns need observed=True; otherwise every
+combination of the categories is returned. Set USE_CATEGORICALS to False to
+keep the object columns, e.g. to benchmark the two.
+"""
+import pandas as pd
+
+USE_CATEGORICALS = True
+
+FIXED_CATEGORIES = {
+    "friylab": ["Fcat", "IYcat"],
+    "rr_netgrp": ["Freight", "Industrial", "Other", "Transit", "Yard"],
+    "rr_group": ["Class I", "Class III", "Commuter", "Passenger"],
+    "scc_description_level_4": [
+        "Line Haul Locomotives: Class I Operations",
+        "Line Haul Locomotives: Class II / III Operations",
+        "Line Haul Locomotives: Commuter Lines",
+        "Line Haul Locomotives: Passenger Trains (Amtrak)",
+        "Yard Locomotives",
+    ],
+    "pol_type": ["CAP", "GHG", "HAP"],
+}
+# Categories of these columns are the sorted values of the loaded data.
+DATA_CATEGORY_COLS = (
+    "carrier",
+    "county_name",
+    "dat_cat_code",
+    "sector_description",
+    "scc_description_level_1",
+    "scc_description_level_2",
+    "scc_description_level_3",
+    "pollutant",
+    "pol_desc",
+)
+CATEGORICAL_COLS = tuple(FIXED_CATEGORIES) + DATA_CATEGORY_COLS
+
+
+def get_categorical_dtype(col: str, values=None) -> pd.CategoricalDtype:
+    """
+    Get the categorical dtype of col. Columns in FIXED_CATEGORIES use the fixed
+    categories; other columns use the sorted unique non-null values.
+    """
+    if col in FIXED_CATEGORIES:
+        return pd.CategoricalDtype(FIXED_CATEGORIES[col])
+    return pd.CategoricalDtype(sorted(pd.unique(values[pd.notna(values)])))
+
+
+def cast_categoricals(df_: pd.DataFrame, cols=CATEGORICAL_COLS) -> pd.DataFrame:
+    """
+    Cast the cols in df_ to categoricals. Columns that are not in df_ or are
+    already categorical are left as is. df_ is returned as is when
+    USE_CATEGORICALS is False.
+    """
+    if not USE_CATEGORICALS:
+        return df_
+    cast_dtypes = {}
+    for col in cols:
+        if (col not in df_.columns) or isinstance(
+            df_[col].dtype, pd.CategoricalDtype
+        ):
+            continue
+        col_vals = df_[col].to_numpy()
+        cast_dtypes[col] = get_categorical_dtype(col, col_vals)
+        if col in FIXED_CATEGORIES:
+            unknown_vals = set(pd.unique(col_vals[pd.notna(col_vals)])) - set(
+                FIXED_CATEGORIES[col]
+            )
+            assert not unknown_vals, (
+                f"{col} has values {unknown_vals} that are not in "
+                f"FIXED_CATEGORIES. Add them to the schema."
+            )
+    if not cast_dtypes:
+        return df_
+    return df_.astype(cast_dtypes)
@@ -1,18 +1,63 @@
-import xml.etree.ElementTree as ET
-from lxml import etree as lxml_etree
 import glob
-import copy
 import pandas as pd
 import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
-from locoerlt.utilis import PATH_RAW, PATH_INTERIM, PATH_PROCESSED, get_snake_case_dict
-from locoerlt.cersxml_templ import (
-    set_creation_datetime,
-    set_document_id,
-    register_all_namespaces,
+from locoei.utilis import (
+    PATH_RAW,
+    PATH_INTERIM,
+    PATH_PROCESSED,
+    get_snake_case_dict,
+    read_artifact,
 )
+from locoei.cersxml_writer import (
+    get_emisquant_value_index,
+    write_uncntr_cntr_xml_stream,
+)
+from locoei.profiling import profile_stage
+
+# Columns of the emission quantities used to build the xmls.
+EMISQUANT_XML_COLS = [
+    "year",
+    "stcntyfips",
+    "county_name",
+    "dat_cat_code",
+    "sector_description",
+    "scc_description_level_1",
+    "scc_description_level_2",
+    "scc_description_level_3",
+    "scc",
+    "scc_description_level_4",
+    "pol_type",
+    "pollutant",
+    "pol_desc",
+    "em_fac",
+    "uncontrolled_em_quant_ton",
+    "controlled_em_quant_ton",
+]
+
+
+@profile_stage
+def read_uncntr_cntr_emisquant(path_uncntr_cntr_emisquant_, years=None):
+    """
+    Read the EMISQUANT_XML_COLS of the emission quantities for years (all
+    years when None). From an artifact directory (utilis.write_artifact), only
+    the year partitions and the columns needed are read. A csv is parsed for
+    the columns needed and filtered to years.
+    """
+    if os.path.isdir(path_uncntr_cntr_emisquant_):
+        return read_artifact(
+            path_uncntr_cntr_emisquant_,
+            columns=EMISQUANT_XML_COLS,
+            filters=None if years is None else {"year": list(years)},
+        )
+    emisquant = pd.read_csv(
+        path_uncntr_cntr_emisquant_, usecols=lambda col: col in EMISQUANT_XML_COLS
+    )
+    if years is not None:
+        emisquant = emisquant.loc[lambda df: df.year.isin(years)].reset_index(drop=True)
+    return emisquant
 
 
 def qc_clean_up_uncntr_emisquant(uncntr_emisquant, uncntr_emisquant_no_yardnm):
@@ -51,8 +96,12 @@ def qc_clean_up_uncntr_emisquant(uncntr_emisquant, uncntr_emisquant_no_yardnm):
     ), "Re-check groupby on the data. Aggregation is not correct."
 
 
-def clean_up_uncntr_emisquant(path_uncntr_emisquant_):
-    uncntr_emisquant = pd.read_csv(path_uncntr_emisquant_, index_col=0)
+@profile_stage
+def prc_uncntr_emisquant(uncntr_emisquant):
+    """
+    Aggregate the uncontrolled emissions over yards and add the string
+    columns used in the xml for all years.
+    """
     uncntr_emisquant_no_yardnm = (
         uncntr_emisquant.groupby(
             [
@@ -69,7 +118,8 @@ def clean_up_uncntr_emisquant(path_uncntr_emisquant_):
                 "pol_type",
                 "pollutant",
                 "pol_desc",
-            ]
+            ],
+            observed=True,
         )
         .agg(
             em_fac=("em_fac", "mean"),
@@ -78,39 +128,57 @@ def clean_up_uncntr_emisquant(path_uncntr_emisquant_):
         .reset_index()
     )
     qc_clean_up_uncntr_emisquant(uncntr_emisquant, uncntr_emisquant_no_yardnm)
-    uncntr_emisquant_2020_fil_scc = (
-        uncntr_emisquant_no_yardnm.loc[lambda df: df.year == 2020]
-        .assign(
-            stcntyfips_str=lambda df: df.stcntyfips.astype(int).astype(str),
-            ssc_str=lambda df: df.scc.astype(str).str.split(".", expand=True)[0],
-            pollutant_str=lambda df: df.pollutant.astype(str),
-            uncontrolled_em_quant_ton_str=lambda df: df.uncontrolled_em_quant_ton.astype(
-                str
-            ),
-            uncontrolled_em_quant_ton_daily_str=lambda df: (
-                df.uncontrolled_em_quant_ton / 365
-            ).astype(str),
-        )
-        .filter(
-            items=[
-                "stcntyfips_str",
-                "ssc_str",
-                "pollutant_str",
-                "uncontrolled_em_quant_ton_str",
-                "uncontrolled_em_quant_ton_daily_str",
-            ]
-        )
-        .reset_index(drop=True)
+    uncntr_emisquant_fil_scc = uncntr_emisquant_no_yardnm.assign(
+        stcntyfips_str=lambda df: df.stcntyfips.astype(int).astype(str),
+        ssc_str=lambda df: df.scc.astype(str).str.split(".", expand=True)[0],
+        pollutant_str=lambda df: df.pollutant.astype(str),
+        uncontrolled_em_quant_ton_str=lambda df: df.uncontrolled_em_quant_ton.astype(
+            str
+        ),
+        uncontrolled_em_quant_ton_daily_str=lambda df: (
+            df.uncontrolled_em_quant_ton / 365
+        ).astype(str),
+    ).filter(
+        items=[
+            "year",
+            "stcntyfips_str",
+            "ssc_str",
+            "pollutant_str",
+            "uncontrolled_em_quant_ton_str",
+            "uncontrolled_em_quant_ton_daily_str",
+        ]
     )
-    uncntr_emisquant_2020_fil_scc_grp = uncntr_emisquant_2020_fil_scc.groupby(
-        ["stcntyfips_str", "ssc_str"]
+    return uncntr_emisquant_fil_scc
+
+
+@profile_stage
+def get_uncntr_emisquant_yr_dict(uncntr_emisquant_yr_fil_scc):
+    uncntr_emisquant_yr_fil_scc = uncntr_emisquant_yr_fil_scc.drop(
+        columns="year"
+    ).reset_index(drop=True)
+    uncntr_emisquant_yr_value_index = get_emisquant_value_index(
+        emisquant_fil_scc_=uncntr_emisquant_yr_fil_scc,
+        pol_ton_col="uncontrolled_em_quant_ton_str",
+        pol_ton_daily_col="uncontrolled_em_quant_ton_daily_str",
     )
     return {
-        "raw_data": uncntr_emisquant_2020_fil_scc,
-        "grps": uncntr_emisquant_2020_fil_scc_grp,
+        "raw_data": uncntr_emisquant_yr_fil_scc,
+        "value_index": uncntr_emisquant_yr_value_index,
     }
 
 
+@profile_stage
+def prc_uncntr_emisquant_2020(uncntr_emisquant):
+    """
+    Aggregate the 2020 uncontrolled emissions over yards and get the xml
+    value index.
+    """
+    uncntr_emisquant_fil_scc = prc_uncntr_emisquant(uncntr_emisquant)
+    return get_uncntr_emisquant_yr_dict(
+        uncntr_emisquant_fil_scc.loc[lambda df: df.year == 2020]
+    )
+
+
 def qc_clean_uncntr_emisquant(cntr_emisquant, cntr_emisquant_no_yardnm):
     cntr_emisquant_no_yardnm_qc = pd.merge(
         cntr_emisquant.loc[
@@ -147,8 +215,12 @@ def qc_clean_uncntr_emisquant(cntr_emisquant, cntr_emisquant_no_yardnm):
     ), "Re-check groupby on the data. Aggregation is not correct."
 
 
-def clean_up_cntr_emisquant(path_cntr_emisquant_):
-    cntr_emisquant = pd.read_csv(path_cntr_emisquant_, index_col=0)
+@profile_stage
+def prc_cntr_emisquant(cntr_emisquant):
+    """
+    Aggregate the controlled emissions over yards and add the string columns
+    used in the xml for all years.
+    """
     cntr_emisquant_no_yardnm = (
         cntr_emisquant.groupby(
             [
@@ -165,7 +237,8 @@ def clean_up_cntr_emisquant(path_cntr_emisquant_):
                 "pol_type",
                 "pollutant",
                 "pol_desc",
-            ]
+            ],
+            observed=True,
         )
         .agg(
             em_fac=("em_fac", "mean"),
@@ -174,153 +247,78 @@ def clean_up_cntr_emisquant(path_cntr_emisquant_):
         .reset_index()
     )
     qc_clean_uncntr_emisquant(cntr_emisquant, cntr_emisquant_no_yardnm)
-    cntr_emisquant_2020_fil_scc = (
-        cntr_emisquant_no_yardnm.loc[lambda df: df.year == 2020]
-        .assign(
-            stcntyfips_str=lambda df: df.stcntyfips.astype(int).astype(str),
-            ssc_str=lambda df: df.scc.astype(str).str.split(".", expand=True)[0],
-            pollutant_str=lambda df: df.pollutant.astype(str),
-            controlled_em_quant_ton_str=lambda df: df.controlled_em_quant_ton.astype(
-                str
-            ),
-            controlled_em_quant_ton_daily_str=lambda df: (
-                df.controlled_em_quant_ton / 365
-            ).astype(str),
-        )
-        .filter(
-            items=[
-                "stcntyfips_str",
-                "ssc_str",
-                "pollutant_str",
-                "controlled_em_quant_ton_str",
-                "controlled_em_quant_ton_daily_str",
-            ]
-        )
+    cntr_emisquant_fil_scc = cntr_emisquant_no_yardnm.assign(
+        stcntyfips_str=lambda df: df.stcntyfips.astype(int).astype(str),
+        ssc_str=lambda df: df.scc.astype(str).str.split(".", expand=True)[0],
+        pollutant_str=lambda df: df.pollutant.astype(str),
+        controlled_em_quant_ton_str=lambda df: df.controlled_em_quant_ton.astype(str),
+        controlled_em_quant_ton_daily_str=lambda df: (
+            df.controlled_em_quant_ton / 365
+        ).astype(str),
+    ).filter(
+        items=[
+            "year",
+            "stcntyfips_str",
+            "ssc_str",
+            "pollutant_str",
+            "controlled_em_quant_ton_str",
+            "controlled_em_quant_ton_daily_str",
+        ]
     )
-    cntr_emisquant_2020_fil_scc_grp = cntr_emisquant_2020_fil_scc.groupby(
-        ["stcntyfips_str", "ssc_str"]
+    return cntr_emisquant_fil_scc
+
+
+@profile_stage
+def get_cntr_emisquant_yr_dict(cntr_emisquant_yr_fil_scc):
+    cntr_emisquant_yr_fil_scc = cntr_emisquant_yr_fil_scc.drop(
+        columns="year"
+    ).reset_index(drop=True)
+    cntr_emisquant_yr_value_index = get_emisquant_value_index(
+        emisquant_fil_scc_=cntr_emisquant_yr_fil_scc,
+        pol_ton_col="controlled_em_quant_ton_str",
+        pol_ton_daily_col="controlled_em_quant_ton_daily_str",
     )
     return {
-        "raw_data": cntr_emisquant_2020_fil_scc,
-        "grps": cntr_emisquant_2020_fil_scc_grp,
+        "raw_data": cntr_emisquant_yr_fil_scc,
+        "value_index": cntr_emisquant_yr_value_index,
     }
 
 
-def get_uncntr_cntr_xml(
-    path_xml_templ,
-    grp_uncntr_cntr,
-    pol_ton_col: str,
-    pol_ton_daily_col: str,
-    tx_counties_list,
-    non_point_scc_list,
-    doc_id,
-):
-    templ_tree = ET.parse(path_xml_templ)
-    ns = {
-        "header": "http://www.exchangenetwork.net/schema/header/2",
-        "payload": "http://www.exchangenetwork.net/schema/cer/1",
-    }
-    templ_root = templ_tree.getroot()
-    templ_root_header = templ_root.find("header:Header", ns)
-    set_document_id(templ_root, doc_id=doc_id)
-    set_creation_datetime(templ_root_header, ns=ns)
-    cers_template = templ_tree.find(".//payload:Location/...", ns)
-    location_template = templ_tree.find(".//payload:Location", ns)
-    location_template_cpy = copy.deepcopy(location_template)
-    cers_template.remove(location_template)
-    county = tx_counties_list[0]
-    scc = non_point_scc_list[0]
-    for county in tx_counties_list:
-        location_template_cpy_cpy = copy.deepcopy(location_template_cpy)
-        fips_elem = location_template_cpy_cpy.find("payload:StateAndCountyFIPSCode", ns)
-        fips_elem.text = f"{county}"
-        locationemissionsprocess_template = location_template_cpy_cpy.find(
-            "payload:LocationEmissionsProcess", ns
-        )
-        locationemissionsprocess_template_cpy = copy.deepcopy(
-            locationemissionsprocess_template
-        )
-        location_template_cpy_cpy.remove(locationemissionsprocess_template)
-        for scc in non_point_scc_list:
-            locationemissionsprocess_template_cpy_cpy = copy.deepcopy(
-                locationemissionsprocess_template_cpy
-            )
-            scc_elem = locationemissionsprocess_template_cpy_cpy.find(
-                "payload:SourceClassificationCode", ns
-            )
-            scc_elem.text = scc
-            try:
-                relevant_data = grp_uncntr_cntr.get_group((county, scc))
-                reportingperiod_annual_reportingperiodemissions = locationemissionsprocess_template_cpy_cpy.findall(
-                    "*/[payload:ReportingPeriodTypeCode='A']"
-                    "/payload:ReportingPeriodEmissions",
-                    ns,
-                )
-                for (
-                    reportingperiodemission
-                ) in reportingperiod_annual_reportingperiodemissions:
-                    cur_pollutant = reportingperiodemission.find(
-                        "payload:PollutantCode", ns
-                    ).text
-                    cur_pollutant_emission = reportingperiodemission.find(
-                        "payload:TotalEmissions", ns
-                    )
-                    replace_value = relevant_data.loc[
-                        lambda df: df.pollutant_str == cur_pollutant, pol_ton_col
-                    ].values[0]
-                    cur_pollutant_emission.text = replace_value
-                reportingperiod_daily_reportingperiodemissions = locationemissionsprocess_template_cpy_cpy.findall(
-                    "*/[payload:ReportingPeriodTypeCode='O3D']"
-                    "/payload:ReportingPeriodEmissions",
-                    ns,
-                )
-                for (
-                    reportingperiodemission
-                ) in reportingperiod_daily_reportingperiodemissions:
-                    cur_pollutant = reportingperiodemission.find(
-                        "payload:PollutantCode", ns
-                    ).text
-                    cur_pollutant_emission = reportingperiodemission.find(
-                        "payload:TotalEmissions", ns
-                    )
-                    replace_value = relevant_data.loc[
-                        lambda df: df.pollutant_str == cur_pollutant, pol_ton_daily_col
-                    ].values[0]
-                    cur_pollutant_emission.text = replace_value
-            except KeyError:
-                pass
-            location_template_cpy_cpy.append(locationemissionsprocess_template_cpy_cpy)
-        cers_template.append(location_template_cpy_cpy)
-    return templ_tree
+@profile_stage
+def prc_cntr_emisquant_2020(cntr_emisquant):
+    """
+    Aggregate the 2020 controlled emissions over yards and get the xml value
+    index.
+    """
+    cntr_emisquant_fil_scc = prc_cntr_emisquant(cntr_emisquant)
+    return get_cntr_emisquant_yr_dict(
+        cntr_emisquant_fil_scc.loc[lambda df: df.year == 2020]
+    )
 
 
-def write_xml(xml_tree, path_out_xml):
-    path_out_dirty_xml = path_out_xml.replace(".xml", "_unformatted.xml")
-    xml_tree.write(path_out_dirty_xml, encoding="utf-8", xml_declaration=True)
-    # https://stackoverflow.com/questions/5086922/python-pretty-xml-printer-with-lxml
-    # https://stackoverflow.com/questions/48788915/how-to-avoid-incorrect-indentation-in-generated-xml-file-when-inserting-elementt
-    lxml_etree_root = lxml_etree.parse(
-        path_out_dirty_xml,
-        parser=lxml_etree.XMLParser(remove_blank_text=True, remove_comments=True),
-    )
-    lxml_etree_root.write(
-        path_out_xml, pretty_print=True, encoding="utf-8", xml_declaration=True
+@profile_stage
+def clean_up_uncntr_cntr_emisquant(path_uncntr_cntr_emisquant_) -> dict:
+    """
+    Read the 2020 combined uncontrolled and controlled emission quantities
+    (csv or artifact directory) once and get the 2020 dicts of both variants.
+
+    Returns
+    -------
+    dict
+        "uncntr" and "cntr" dicts of "raw_data" and "value_index".
+    """
+    uncntr_cntr_emisquant = read_uncntr_cntr_emisquant(
+        path_uncntr_cntr_emisquant_, [2020]
     )
-    os.remove(path_out_dirty_xml)
+    return {
+        "uncntr": prc_uncntr_emisquant_2020(uncntr_cntr_emisquant),
+        "cntr": prc_cntr_emisquant_2020(uncntr_cntr_emisquant),
+    }
 
 
-if __name__ == "__main__":
-    path_uncntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-    )[0]
-    path_cntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
-    )[0]
-    path_xml_templ = os.path.join(PATH_INTERIM, "xml_rail_templ_tti.xml")
-    path_county = os.path.join(PATH_RAW, "Texas_County_Boundaries.csv")
-    path_out_cntr = os.path.join(PATH_PROCESSED, "cntr_cers_tx.xml")
-    path_out_uncntr = os.path.join(PATH_PROCESSED, "uncntr_cers_tx.xml")
-    tx_counties = pd.read_csv(path_county)
+def get_tx_counties_list(path_county_: str) -> list:
+    """Get the sorted list of five digit FIPS codes for the 254 Texas counties."""
+    tx_counties = pd.read_csv(path_county_)
     tx_counties_list = list(
         tx_counties.rename(columns=get_snake_case_dict(tx_counties.columns))
         .fips_st_cnty_cd.astype(str)
@@ -332,6 +330,18 @@ if __name__ == "__main__":
         "Check why you are getting more or "
         "less than 254."
     )
+    return tx_counties_list
+
+
+if __name__ == "__main__":
+    path_uncntr_cntr_emisquant = glob.glob(
+        os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
+    )[0]
+    path_xml_templ = os.path.join(PATH_INTERIM, "xml_rail_templ_tti.xml")
+    path_county = os.path.join(PATH_RAW, "Texas_County_Boundaries.csv")
+    path_out_cntr = os.path.join(PATH_PROCESSED, "cntr_cers_tx.xml")
+    path_out_uncntr = os.path.join(PATH_PROCESSED, "uncntr_cers_tx.xml")
+    tx_counties_list = get_tx_counties_list(path_county)
     non_point_scc_list = [
         "2285002006",
         "2285002007",
@@ -341,48 +351,23 @@ if __name__ == "__main__":
     ]
     non_point_scc_list.sort()
 
-    # uncntr_emisquant_2020_fil_scc_dict = clean_up_uncntr_emisquant(
-    #     path_uncntr_emisquant_=path_uncntr_emisquant
-    # )
-    cntr_emisquant_2020_fil_scc_dict = clean_up_cntr_emisquant(
-        path_cntr_emisquant_=path_cntr_emisquant
-    )
-    # uncntr_emisquant_2020_fil_scc = uncntr_emisquant_2020_fil_scc_dict["raw_data"]
-    cntr_emisquant_2020_fil_scc = cntr_emisquant_2020_fil_scc_dict["raw_data"]
-    # uncntr_emisquant_2020_fil_scc_grp = uncntr_emisquant_2020_fil_scc_dict["grps"]
-    cntr_emisquant_2020_fil_scc_grp = cntr_emisquant_2020_fil_scc_dict["grps"]
-    # assert (
-    #     set(uncntr_emisquant_2020_fil_scc.reset_index().stcntyfips_str)
-    #     - set(tx_counties_list)
-    # ) == set(), (
-    #     "uncntr_emisquant_2020_fil_scc counties should be a subset of all "
-    #     "Texas counties"
-    # )
-    assert (
-        set(cntr_emisquant_2020_fil_scc.stcntyfips_str) - set(tx_counties_list)
-    ) == set(), (
-        "cntr_emisquant_2020_fil_scc counties should be a subset of all "
-        "Texas counties"
-    )
-
-    register_all_namespaces(path_xml_templ)
-    # uncntr_xml_tree = get_uncntr_cntr_xml(
-    #     path_xml_templ=path_xml_templ,
-    #     grp_uncntr_cntr=uncntr_emisquant_2020_fil_scc_grp,
-    #     pol_ton_col="uncontrolled_em_quant_ton_str",
-    #     pol_ton_daily_col="uncontrolled_em_quant_ton_daily_str",
-    #     tx_counties_list=tx_counties_list,
-    #     non_point_scc_list=non_point_scc_list,
-    #     doc_id="locomotives_uncntr_cers_aerr_2020_xml",
-    # )
-    # write_xml(xml_tree=uncntr_xml_tree, path_out_xml=path_out_uncntr)
-    cntr_xml_tree = get_uncntr_cntr_xml(
-        path_xml_templ=path_xml_templ,
-        grp_uncntr_cntr=cntr_emisquant_2020_fil_scc_grp,
-        pol_ton_col="controlled_em_quant_ton_str",
-        pol_ton_daily_col="controlled_em_quant_ton_daily_str",
-        tx_counties_list=tx_counties_list,
-        non_point_scc_list=non_point_scc_list,
-        doc_id="locomotives_cntr_cers_aerr_2020_xml",
+    uncntr_cntr_emisquant_2020_fil_scc_dict = clean_up_uncntr_cntr_emisquant(
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant
     )
-    write_xml(xml_tree=cntr_xml_tree, path_out_xml=path_out_cntr)
+    for variant, path_out_xml in [("uncntr", path_out_uncntr), ("cntr", path_out_cntr)]:
+        emisquant_2020_fil_scc_dict = uncntr_cntr_emisquant_2020_fil_scc_dict[variant]
+        assert (
+            set(emisquant_2020_fil_scc_dict["raw_data"].stcntyfips_str)
+            - set(tx_counties_list)
+        ) == set(), (
+            f"{variant}_emisquant_2020_fil_scc counties should be a subset of all "
+            "Texas counties"
+        )
+        write_uncntr_cntr_xml_stream(
+            path_xml_templ=path_xml_templ,
+            emisquant_value_index=emisquant_2020_fil_scc_dict["value_index"],
+            tx_counties_list=tx_counties_list,
+            non_point_scc_list=non_point_scc_list,
+            doc_id=f"locomotives_{variant}_cers_aerr_2020_xml",
+            path_out_xml=path_out_xml,
+        )
@@ -1,338 +1,219 @@
-import xml.etree.ElementTree as ET
-from lxml import etree as lxml_etree
+from concurrent.futures import ProcessPoolExecutor
+import time
 import glob
-import copy
 import pandas as pd
 import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), "..")))
-from locoerlt.utilis import PATH_RAW, PATH_INTERIM, PATH_PROCESSED, get_snake_case_dict
-from locoerlt.cersxml_templ import (
-    set_creation_datetime,
-    set_document_id,
-    register_all_namespaces,
+from locoei.utilis import PATH_RAW, PATH_INTERIM, PATH_PROCESSED
+from locoei.cersxml_templ import get_creation_datetime
+from locoei.cersxml_writer import write_uncntr_cntr_xml_stream
+from locoei.uncntr_cntr_cersxml import (
+    read_uncntr_cntr_emisquant,
+    prc_uncntr_emisquant,
+    get_uncntr_emisquant_yr_dict,
+    prc_cntr_emisquant,
+    get_cntr_emisquant_yr_dict,
+    get_tx_counties_list,
 )
-
-
-def qc_clean_up_uncntr_emisquant(uncntr_emisquant, uncntr_emisquant_no_yardnm):
-    uncntr_emisquant_no_yardnm_qc = pd.merge(
-        uncntr_emisquant.loc[
-            lambda df: ~(df.scc_description_level_4 == "Yard " "Locomotives")
-        ],
-        uncntr_emisquant_no_yardnm,
-        on=[
-            "year",
-            "stcntyfips",
-            "county_name",
-            "dat_cat_code",
-            "sector_description",
-            "scc_description_level_1",
-            "scc_description_level_2",
-            "scc_description_level_3",
-            "scc",
-            "scc_description_level_4",
-            "pol_type",
-            "pollutant",
-            "pol_desc",
-        ],
-        suffixes=["_raw", "_grp"],
-        how="inner",
+from locoei.profiling import profile_stage
+
+
+texaer_variants = {
+    "uncntr": {
+        "prc": prc_uncntr_emisquant,
+        "yr_dict": get_uncntr_emisquant_yr_dict,
+    },
+    "cntr": {
+        "prc": prc_cntr_emisquant,
+        "yr_dict": get_cntr_emisquant_yr_dict,
+    },
+}
+
+
+@profile_stage
+def get_emisquant_yr_partitions(
+    path_uncntr_cntr_emisquant_, years, variants=("uncntr", "cntr")
+) -> dict:
+    """
+    Read the years of the combined uncontrolled and controlled emission
+    quantities (csv or artifact directory) once and split each variant by year
+    into a "raw_data" and "value_index" dict per year, like
+    clean_up_uncntr_cntr_emisquant does for 2020.
+
+    Returns
+    -------
+    dict
+        dict of "raw_data" and "value_index" by year, by variant.
+    """
+    uncntr_cntr_emisquant = read_uncntr_cntr_emisquant(
+        path_uncntr_cntr_emisquant_, years
     )
-    assert all(
-        (
-            uncntr_emisquant_no_yardnm_qc.em_fac_raw
-            == uncntr_emisquant_no_yardnm_qc.em_fac_grp
-        )
-        & (
-            uncntr_emisquant_no_yardnm_qc.uncontrolled_em_quant_ton_raw
-            == uncntr_emisquant_no_yardnm_qc.uncontrolled_em_quant_ton_grp
-        )
-    ), "Re-check groupby on the data. Aggregation is not correct."
-
-
-def clean_up_uncntr_emisquant(path_uncntr_emisquant_, year_):
-    uncntr_emisquant = pd.read_csv(path_uncntr_emisquant_, index_col=0)
-    uncntr_emisquant_no_yardnm = (
-        uncntr_emisquant.groupby(
-            [
-                "year",
-                "stcntyfips",
-                "county_name",
-                "dat_cat_code",
-                "sector_description",
-                "scc_description_level_1",
-                "scc_description_level_2",
-                "scc_description_level_3",
-                "scc",
-                "scc_description_level_4",
-                "pol_type",
-                "pollutant",
-                "pol_desc",
-            ]
-        )
-        .agg(
-            em_fac=("em_fac", "mean"),
-            uncontrolled_em_quant_ton=("uncontrolled_em_quant_ton", "sum"),
-        )
-        .reset_index()
-    )
-    qc_clean_up_uncntr_emisquant(uncntr_emisquant, uncntr_emisquant_no_yardnm)
-    uncntr_emisquant_yr_fil_scc = (
-        uncntr_emisquant_no_yardnm.loc[lambda df: df.year == year_]
-        .assign(
-            stcntyfips_str=lambda df: df.stcntyfips.astype(int).astype(str),
-            ssc_str=lambda df: df.scc.astype(str).str.split(".", expand=True)[0],
-            pollutant_str=lambda df: df.pollutant.astype(str),
-            uncontrolled_em_quant_ton_str=lambda df: df.uncontrolled_em_quant_ton.astype(
-                str
-            ),
-            uncontrolled_em_quant_ton_daily_str=lambda df: (
-                df.uncontrolled_em_quant_ton / 365
-            ).astype(str),
-        )
-        .filter(
-            items=[
-                "stcntyfips_str",
-                "ssc_str",
-                "pollutant_str",
-                "uncontrolled_em_quant_ton_str",
-                "uncontrolled_em_quant_ton_daily_str",
-            ]
-        )
-        .reset_index(drop=True)
-    )
-    uncntr_emisquant_yr_fil_scc_grp = uncntr_emisquant_yr_fil_scc.groupby(
-        ["stcntyfips_str", "ssc_str"]
-    )
-    return {
-        "raw_data": uncntr_emisquant_yr_fil_scc,
-        "grps": uncntr_emisquant_yr_fil_scc_grp,
-    }
-
-
-def qc_clean_uncntr_emisquant(cntr_emisquant, cntr_emisquant_no_yardnm):
-    cntr_emisquant_no_yardnm_qc = pd.merge(
-        cntr_emisquant.loc[
-            lambda df: ~(df.scc_description_level_4 == "Yard " "Locomotives")
-        ],
-        cntr_emisquant_no_yardnm,
-        on=[
-            "year",
-            "stcntyfips",
-            "county_name",
-            "dat_cat_code",
-            "sector_description",
-            "scc_description_level_1",
-            "scc_description_level_2",
-            "scc_description_level_3",
-            "scc",
-            "scc_description_level_4",
-            "pol_type",
-            "pollutant",
-            "pol_desc",
-        ],
-        suffixes=["_raw", "_grp"],
-        how="inner",
-    )
-    assert all(
-        (
-            cntr_emisquant_no_yardnm_qc.em_fac_raw
-            == cntr_emisquant_no_yardnm_qc.em_fac_grp
-        )
-        & (
-            cntr_emisquant_no_yardnm_qc.controlled_em_quant_ton_raw
-            == cntr_emisquant_no_yardnm_qc.controlled_em_quant_ton_grp
-        )
-    ), "Re-check groupby on the data. Aggregation is not correct."
+    emisquant_yr_partitions = {}
+    for variant in variants:
+        variant_info = texaer_variants[variant]
+        emisquant_fil_scc = variant_info["prc"](uncntr_cntr_emisquant)
+        emisquant_fil_scc_by_yr = dict(tuple(emisquant_fil_scc.groupby("year")))
+        emisquant_yr_partitions[variant] = {
+            year: variant_info["yr_dict"](
+                emisquant_fil_scc_by_yr.get(year, emisquant_fil_scc.iloc[0:0])
+            )
+            for year in years
+        }
+    return emisquant_yr_partitions
 
 
-def clean_up_cntr_emisquant(path_cntr_emisquant_, year_):
-    cntr_emisquant = pd.read_csv(path_cntr_emisquant_, index_col=0)
-    cntr_emisquant_no_yardnm = (
-        cntr_emisquant.groupby(
-            [
-                "year",
-                "stcntyfips",
-                "county_name",
-                "dat_cat_code",
-                "sector_description",
-                "scc_description_level_1",
-                "scc_description_level_2",
-                "scc_description_level_3",
-                "scc",
-                "scc_description_level_4",
-                "pol_type",
-                "pollutant",
-                "pol_desc",
-            ]
-        )
-        .agg(
-            em_fac=("em_fac", "mean"),
-            controlled_em_quant_ton=("controlled_em_quant_ton", "sum"),
-        )
-        .reset_index()
-    )
-    qc_clean_uncntr_emisquant(cntr_emisquant, cntr_emisquant_no_yardnm)
-    cntr_emisquant_yr_fil_scc = (
-        cntr_emisquant_no_yardnm.loc[lambda df: df.year == year_]
-        .assign(
-            stcntyfips_str=lambda df: df.stcntyfips.astype(int).astype(str),
-            ssc_str=lambda df: df.scc.astype(str).str.split(".", expand=True)[0],
-            pollutant_str=lambda df: df.pollutant.astype(str),
-            controlled_em_quant_ton_str=lambda df: df.controlled_em_quant_ton.astype(
-                str
-            ),
-            controlled_em_quant_ton_daily_str=lambda df: (
-                df.controlled_em_quant_ton / 365
-            ).astype(str),
-        )
-        .filter(
-            items=[
-                "stcntyfips_str",
-                "ssc_str",
-                "pollutant_str",
-                "controlled_em_quant_ton_str",
-                "controlled_em_quant_ton_daily_str",
-            ]
-        )
+@profile_stage
+def get_texaer_xml(
+    year_,
+    variant,
+    emisquant_yr_fil_scc_dict_,
+    path_xml_templ_,
+    tx_counties_list,
+    non_point_scc_list,
+    path_out_dir_,
+    creation_datetime_,
+) -> dict:
+    """
+    Write the uncontrolled or controlled TexAER xml for one year. Runs in a
+    worker process in generate_texaer_series, so it only takes picklable
+    arguments.
+
+    Returns
+    -------
+    dict
+        year, variant, output path, and run time in seconds.
+    """
+    start_time = time.perf_counter()
+    assert (
+        set(emisquant_yr_fil_scc_dict_["raw_data"].stcntyfips_str)
+        - set(tx_counties_list)
+    ) == set(), (
+        f"{variant}_emisquant_yr_fil_scc counties should be a subset of all "
+        "Texas counties"
     )
-    cntr_emisquant_yr_fil_scc_grp = cntr_emisquant_yr_fil_scc.groupby(
-        ["stcntyfips_str", "ssc_str"]
+    path_out_xml = os.path.join(path_out_dir_, f"{variant}_{year_}_TexAER.xml")
+    write_uncntr_cntr_xml_stream(
+        path_xml_templ=path_xml_templ_,
+        emisquant_value_index=emisquant_yr_fil_scc_dict_["value_index"],
+        tx_counties_list=tx_counties_list,
+        non_point_scc_list=non_point_scc_list,
+        doc_id=f"locomotives_{variant}_TexAER_{year_}_xml",
+        path_out_xml=path_out_xml,
+        year_=year_,
+        creation_datetime_=creation_datetime_,
     )
     return {
-        "raw_data": cntr_emisquant_yr_fil_scc,
-        "grps": cntr_emisquant_yr_fil_scc_grp,
+        "year": year_,
+        "variant": variant,
+        "path_out_xml": path_out_xml,
+        "run_time_sec": time.perf_counter() - start_time,
     }
 
 
-def get_uncntr_cntr_xml(
-    path_xml_templ,
-    grp_uncntr_cntr,
-    pol_ton_col: str,
-    pol_ton_daily_col: str,
+@profile_stage
+def generate_texaer_series(
+    years,
+    path_uncntr_cntr_emisquant_: str,
+    path_xml_templ_: str,
     tx_counties_list,
     non_point_scc_list,
-    year_,
-    doc_id,
-):
-    templ_tree = ET.parse(path_xml_templ)
-    ns = {
-        "header": "http://www.exchangenetwork.net/schema/header/2",
-        "payload": "http://www.exchangenetwork.net/schema/cer/1",
-    }
-    templ_root = templ_tree.getroot()
-    templ_root_header = templ_root.find("header:Header", ns)
-    set_document_id(templ_root, doc_id=doc_id)
-    set_creation_datetime(templ_root_header, ns=ns)
-    cers_template = templ_tree.find(".//payload:Location/...", ns)
-    location_template = templ_tree.find(".//payload:Location", ns)
-    location_template_cpy = copy.deepcopy(location_template)
-    cers_template.remove(location_template)
-    year_elem = cers_template.find("payload:EmissionsYear", ns)
-    year_elem.text = f"{year_}"
-    county = tx_counties_list[0]
-    scc = non_point_scc_list[0]
-    for county in tx_counties_list:
-        location_template_cpy_cpy = copy.deepcopy(location_template_cpy)
-        fips_elem = location_template_cpy_cpy.find("payload:StateAndCountyFIPSCode", ns)
-        fips_elem.text = f"{county}"
-        locationemissionsprocess_template = location_template_cpy_cpy.find(
-            "payload:LocationEmissionsProcess", ns
-        )
-        locationemissionsprocess_template_cpy = copy.deepcopy(
-            locationemissionsprocess_template
-        )
-        location_template_cpy_cpy.remove(locationemissionsprocess_template)
-        for scc in non_point_scc_list:
-            locationemissionsprocess_template_cpy_cpy = copy.deepcopy(
-                locationemissionsprocess_template_cpy
-            )
-            scc_elem = locationemissionsprocess_template_cpy_cpy.find(
-                "payload:SourceClassificationCode", ns
+    path_out_dir_: str,
+    variants=("uncntr", "cntr"),
+    workers=1,
+    creation_datetime_=None,
+) -> pd.DataFrame:
+    """
+    Write the TexAER xmls for all years and variants. The combined emission
+    quantities are read once and split by variant and year. Each year and variant is an
+    independent document, so with workers > 1 the documents are written in
+    parallel by a process pool.
+
+    Parameters
+    ----------
+    years:
+        Analysis years.
+    path_uncntr_cntr_emisquant_:
+        Path to the emission quantity csv or artifact directory with the
+        uncontrolled and controlled emission quantities as sibling columns.
+    path_xml_templ_:
+        Path to the TTI xml template.
+    tx_counties_list:
+        Sorted list of Texas county FIPS codes.
+    non_point_scc_list:
+        Sorted list of SCCs.
+    path_out_dir_:
+        Output directory.
+    variants:
+        Keys of texaer_variants: "uncntr" and/or "cntr".
+    workers:
+        Number of processes. Documents are written one after the other in the
+        current process when 1.
+    creation_datetime_:
+        Header CreationDateTime shared by all the documents. Set once at the
+        start of the series when None, so that the serial and parallel runs
+        write identical files for the same value.
+
+    Returns
+    -------
+    pd.DataFrame
+        Run time in seconds by document.
+    """
+    if creation_datetime_ is None:
+        creation_datetime_ = get_creation_datetime()
+    start_time = time.perf_counter()
+    emisquant_yr_partitions = get_emisquant_yr_partitions(
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant_,
+        years=years,
+        variants=variants,
+    )
+    print(f"Read the emission quantities in {time.perf_counter() - start_time:.1f} s")
+    doc_args_list = [
+        (
+            year,
+            variant,
+            emisquant_yr_partitions[variant][year],
+            path_xml_templ_,
+            list(tx_counties_list),
+            list(non_point_scc_list),
+            path_out_dir_,
+            creation_datetime_,
+        )
+        for year in years
+        for variant in variants
+    ]
+    doc_timing_list = []
+    if workers == 1:
+        for doc_args in doc_args_list:
+            doc_timing = get_texaer_xml(*doc_args)
+            print(
+                f"Wrote {doc_timing['path_out_xml']} in "
+                f"{doc_timing['run_time_sec']:.1f} s"
             )
-            scc_elem.text = scc
-            try:
-                relevant_data = grp_uncntr_cntr.get_group((county, scc))
-                reportingperiod_annual_reportingperiodemissions = locationemissionsprocess_template_cpy_cpy.findall(
-                    "*/[payload:ReportingPeriodTypeCode='A']"
-                    "/payload:ReportingPeriodEmissions",
-                    ns,
+            doc_timing_list.append(doc_timing)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for doc_timing in executor.map(get_texaer_xml, *zip(*doc_args_list)):
+                print(
+                    f"Wrote {doc_timing['path_out_xml']} in "
+                    f"{doc_timing['run_time_sec']:.1f} s"
                 )
-                for (
-                    reportingperiodemission
-                ) in reportingperiod_annual_reportingperiodemissions:
-                    cur_pollutant = reportingperiodemission.find(
-                        "payload:PollutantCode", ns
-                    ).text
-                    cur_pollutant_emission = reportingperiodemission.find(
-                        "payload:TotalEmissions", ns
-                    )
-                    replace_value = relevant_data.loc[
-                        lambda df: df.pollutant_str == cur_pollutant, pol_ton_col
-                    ].values[0]
-                    cur_pollutant_emission.text = replace_value
-                reportingperiod_daily_reportingperiodemissions = locationemissionsprocess_template_cpy_cpy.findall(
-                    "*/[payload:ReportingPeriodTypeCode='O3D']"
-                    "/payload:ReportingPeriodEmissions",
-                    ns,
-                )
-                for (
-                    reportingperiodemission
-                ) in reportingperiod_daily_reportingperiodemissions:
-                    cur_pollutant = reportingperiodemission.find(
-                        "payload:PollutantCode", ns
-                    ).text
-                    cur_pollutant_emission = reportingperiodemission.find(
-                        "payload:TotalEmissions", ns
-                    )
-                    replace_value = relevant_data.loc[
-                        lambda df: df.pollutant_str == cur_pollutant, pol_ton_daily_col
-                    ].values[0]
-                    cur_pollutant_emission.text = replace_value
-            except KeyError:
-                pass
-            location_template_cpy_cpy.append(locationemissionsprocess_template_cpy_cpy)
-        cers_template.append(location_template_cpy_cpy)
-    return templ_tree
-
-
-def write_xml(xml_tree, path_out_xml):
-    path_out_dirty_xml = path_out_xml.replace(".xml", "_unformatted.xml")
-    xml_tree.write(path_out_dirty_xml, encoding="utf-8", xml_declaration=True)
-    # https://stackoverflow.com/questions/5086922/python-pretty-xml-printer-with-lxml
-    # https://stackoverflow.com/questions/48788915/how-to-avoid-incorrect-indentation-in-generated-xml-file-when-inserting-elementt
-    lxml_etree_root = lxml_etree.parse(
-        path_out_dirty_xml,
-        parser=lxml_etree.XMLParser(remove_blank_text=True, remove_comments=True),
-    )
-    lxml_etree_root.write(
-        path_out_xml, pretty_print=True, encoding="utf-8", xml_declaration=True
+                doc_timing_list.append(doc_timing)
+    print(
+        f"Wrote {len(doc_timing_list)} TexAER xmls in "
+        f"{time.perf_counter() - start_time:.1f} s with {workers} worker(s)"
     )
-    os.remove(path_out_dirty_xml)
+    return pd.DataFrame(doc_timing_list)
 
 
 if __name__ == "__main__":
-    path_uncntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-    )[0]
-    path_cntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+    path_uncntr_cntr_emisquant = glob.glob(
+        os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
     )[0]
     path_xml_templ = os.path.join(PATH_INTERIM, "xml_rail_templ_tti.xml")
     path_county = os.path.join(PATH_RAW, "Texas_County_Boundaries.csv")
-    tx_counties = pd.read_csv(path_county)
-    tx_counties_list = list(
-        tx_counties.rename(columns=get_snake_case_dict(tx_counties.columns))
-        .fips_st_cnty_cd.astype(str)
-        .str.strip()
-    )
-    tx_counties_list.sort()
-    assert len(tx_counties_list) == 254, (
-        "There are 254 counties in Texas. "
-        "Check why you are getting more or "
-        "less than 254."
-    )
+    tx_counties_list = get_tx_counties_list(path_county)
     non_point_scc_list = [
         "2285002006",
         "2285002007",
@@ -343,59 +224,12 @@ if __name__ == "__main__":
     non_point_scc_list.sort()
 
     year_list = list(range(2011, 2051))  # add the list of years
-    for year in year_list:
-
-        path_out_cntr = os.path.join(
-            PATH_PROCESSED, "TexAER_XMLs", f"cntr_{year}_TexAER.xml"
-        )
-        path_out_uncntr = os.path.join(
-            PATH_PROCESSED, "TexAER_XMLs", f"uncntr_{year}_TexAER.xml"
-        )
-        uncntr_emisquant_yr_fil_scc_dict = clean_up_uncntr_emisquant(
-            path_uncntr_emisquant_=path_uncntr_emisquant, year_=year
-        )
-        cntr_emisquant_yr_fil_scc_dict = clean_up_cntr_emisquant(
-            path_cntr_emisquant_=path_cntr_emisquant, year_=year
-        )
-        uncntr_emisquant_yr_fil_scc = uncntr_emisquant_yr_fil_scc_dict["raw_data"]
-        cntr_emisquant_yr_fil_scc = cntr_emisquant_yr_fil_scc_dict["raw_data"]
-        uncntr_emisquant_yr_fil_scc_grp = uncntr_emisquant_yr_fil_scc_dict["grps"]
-        cntr_emisquant_yr_fil_scc_grp = cntr_emisquant_yr_fil_scc_dict["grps"]
-        assert (
-            set(uncntr_emisquant_yr_fil_scc.reset_index().stcntyfips_str)
-            - set(tx_counties_list)
-        ) == set(), (
-            "uncntr_emisquant_yr_fil_scc counties should be a subset of all "
-            "Texas counties"
-        )
-        assert (
-            set(cntr_emisquant_yr_fil_scc.stcntyfips_str) - set(tx_counties_list)
-        ) == set(), (
-            "cntr_emisquant_yr_fil_scc counties should be a subset of all "
-            "Texas counties"
-        )
-
-        register_all_namespaces(path_xml_templ)
-        uncntr_xml_tree = get_uncntr_cntr_xml(
-            path_xml_templ=path_xml_templ,
-            grp_uncntr_cntr=uncntr_emisquant_yr_fil_scc_grp,
-            pol_ton_col="uncontrolled_em_quant_ton_str",
-            pol_ton_daily_col="uncontrolled_em_quant_ton_daily_str",
-            tx_counties_list=tx_counties_list,
-            non_point_scc_list=non_point_scc_list,
-            year_=year,
-            doc_id=f"locomotives_uncntr_TexAER_{year}_xml",
-        )
-        write_xml(xml_tree=uncntr_xml_tree, path_out_xml=path_out_uncntr)
-
-        cntr_xml_tree = get_uncntr_cntr_xml(
-            path_xml_templ=path_xml_templ,
-            grp_uncntr_cntr=cntr_emisquant_yr_fil_scc_grp,
-            pol_ton_col="controlled_em_quant_ton_str",
-            pol_ton_daily_col="controlled_em_quant_ton_daily_str",
-            tx_counties_list=tx_counties_list,
-            non_point_scc_list=non_point_scc_list,
-            year_=year,
-            doc_id=f"locomotives_cntr_TexAER_{year}_xml",
-        )
-        write_xml(xml_tree=cntr_xml_tree, path_out_xml=path_out_cntr)
+    texaer_timing = generate_texaer_series(
+        years=year_list,
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant,
+        path_xml_templ_=path_xml_templ,
+        tx_counties_list=tx_counties_list,
+        non_point_scc_list=non_point_scc_list,
+        path_out_dir_=os.path.join(PATH_PROCESSED, "TexAER_XMLs"),
+        workers=os.cpu_count(),
+    )
@@ -14,14 +14,28 @@ from locoei.utilis import (
     get_snake_case_dict,
     get_out_file_tsmp,
     cleanup_prev_output,
+    read_excel_cached,
+    get_county_fips_index,
+    resolve_county_fips,
+    get_interval_year_values,
+)
+from locoei.profiling import profile_stage
+from locoei.controls import (
+    CONTROL_KEY_COLS,
+    ControlStrategy,
+    get_control_row_idx,
+    apply_controls,
+    get_control_variant,
 )
 
 
+@profile_stage
 def get_txled_factors(
     path_txled_counties_: str, path_texas_counties_: str
 ) -> pd.DataFrame:
     """Get a dataframe of txled factors by counties where txled program is
-    active."""
+    active. The txled county names are resolved to stcntyfips with the county
+    index of path_texas_counties_."""
     tx_counties = pd.read_csv(path_texas_counties_)
     txled_counties_rows = []
     with open(path_txled_counties_, newline="") as csvfile:
@@ -29,15 +43,23 @@ def get_txled_factors(
         for row in txled_counties_rd:
             txled_counties_rows.append(row)
     txled_counties = list(chain.from_iterable(txled_counties_rows))
-    txled_counties_prc = list(map(lambda item: item.strip().lower(), txled_counties))
 
-    assert len(txled_counties_prc) == 110, (
+    assert len(txled_counties) == 110, (
         "There should be 110 counties based on TCEQ website. Check why there "
         "are less or more counties."
     )
-    txled_counties_prc_df = tx_counties.assign(pollutant="NOX", txled_fac=1)
+    txled_fips_res = resolve_county_fips(
+        pd.Series(txled_counties), get_county_fips_index(path_texas_counties_)
+    )
+    assert not txled_fips_res["unresolved"], (
+        f"TxLED counties {txled_fips_res['unresolved']} are not in "
+        f"{path_texas_counties_}."
+    )
+    txled_counties_prc_df = tx_counties.assign(
+        stcntyfips=tx_counties.FIPS_ST_CNTY_CD, pollutant="NOX", txled_fac=1.0
+    )
     txled_counties_prc_df.loc[
-        lambda df: df["CNTY_NM"].str.lower().isin(txled_counties_prc), "txled_fac"
+        lambda df: df.stcntyfips.isin(txled_fips_res["stcntyfips"]), "txled_fac"
     ] = (1 - 6.2 / 100)
     assert len(txled_counties_prc_df.loc[lambda df: df.txled_fac != 1]) == 110, (
         "There should be 110 counties based on TCEQ website. Check why there "
@@ -46,6 +68,19 @@ def get_txled_factors(
     return txled_counties_prc_df
 
 
+def get_txled_control(txled_fac_: pd.DataFrame) -> ControlStrategy:
+    """TxLED NOx factors by county as a factor on the controlled emissions."""
+    return ControlStrategy(
+        name="txled",
+        kind="factor",
+        variant="cntr",
+        values=txled_fac_.filter(items=["stcntyfips", "pollutant", "txled_fac"]),
+        value_col="txled_fac",
+        attr_cols=(),
+    )
+
+
+@profile_stage
 def get_controlled_txled(
     emis_quant_agg_: pd.DataFrame, txled_fac_: pd.DataFrame, us_ton_to_grams=907185
 ) -> pd.DataFrame:
@@ -54,28 +89,12 @@ def get_controlled_txled(
     for the fuel reduction due to DERI. To get the final controlled emission
     we just factor in the TxLED NOx emission reduction.
     """
-    controlled_emis_quant = (
-        emis_quant_agg_.assign(
-            tp_county_nm=lambda df: df.county_name.str.lower().str.strip()
-        )
-        .merge(
-            (
-                txled_fac_.assign(
-                    tp_county_nm=lambda df: df.CNTY_NM.str.lower().str.strip()
-                ).filter(items=["tp_county_nm", "pollutant", "txled_fac"])
-            ),
-            on=["tp_county_nm", "pollutant"],
-            how="left",
-        )
-        .assign(
-            txled_fac=lambda df: df.txled_fac.fillna(1),
-            controlled_em_quant=lambda df: df.txled_fac * df.em_quant,
-            controlled_em_quant_ton=lambda df: (
-                df.controlled_em_quant / us_ton_to_grams
-            ),
-        )
+    control_strategies = [get_txled_control(txled_fac_)]
+    return get_control_variant(
+        apply_controls(emis_quant_agg_, control_strategies, us_ton_to_grams),
+        control_strategies,
+        "cntr",
     )
-    return controlled_emis_quant
 
 
 def assert_deri_tot(deri_df, column=""):
@@ -85,9 +104,11 @@ def assert_deri_tot(deri_df, column=""):
     )
 
 
+@profile_stage
 def get_deri_quantity_red(
     path_deri_loco_regions_: str,
     path_deri_loco_nox_red_yr_: str,
+    path_texas_counties_: str,
     map_deri_region_madhu_areas={
         "Austin": "Austin",
         "Beaumont/Port Arthur": "Beaumont",
@@ -99,33 +120,36 @@ def get_deri_quantity_red(
 ) -> dict:
     """
     Get the average extra emission per county per year if DERI was not
-    implemented.
+    implemented. The DERI region county names are resolved to stcntyfips with
+    the county index of path_texas_counties_.
     """
     deri_regions = (
         pd.read_json(path_deri_loco_regions_, orient="index")
         .assign(no_counties_reg=lambda df: df.counties.apply(lambda x: len(x)))
         .explode("counties")
-        .assign(tp_county_nm=lambda df: df.counties.str.lower().str.strip())
     )
-    deri_loco_nox_red_yr = pd.read_excel(path_deri_loco_nox_red_yr_, "Locomotive")
-    deri_loco_nox_red_yr_prcd = (
-        deri_loco_nox_red_yr.rename(columns=get_snake_case_dict(deri_loco_nox_red_yr))
-        .assign(
+    deri_fips_res = resolve_county_fips(
+        deri_regions.counties, get_county_fips_index(path_texas_counties_)
+    )
+    assert not deri_fips_res["unresolved"], (
+        f"DERI region counties {deri_fips_res['unresolved']} are not in "
+        f"{path_texas_counties_}."
+    )
+    deri_regions = deri_regions.assign(stcntyfips=deri_fips_res["stcntyfips"])
+    deri_loco_nox_red_yr = read_excel_cached(path_deri_loco_nox_red_yr_, "Locomotive")
+    deri_loco_nox_red_yr_prcd = get_interval_year_values(
+        deri_loco_nox_red_yr.rename(
+            columns=get_snake_case_dict(deri_loco_nox_red_yr)
+        ).assign(
             region=lambda df: df.area.map(map_deri_region_madhu_areas),
             nox_red_tons_per_yr=lambda df: (
                 df.total_nox_reduction_tons_ / df.activity_life
             ),
-            year=lambda df: (
-                df[["year", "bnefits_expiry_year"]].apply(
-                    lambda st_end: range(st_end[0], st_end[1]), axis=1
-                )
-            ),
-        )
-        .explode("year")
-        .filter(items=["region", "year", "nox_red_tons_per_yr"])
-        .groupby(["region", "year"])
-        .agg(nox_red_tons_per_yr=("nox_red_tons_per_yr", "sum"))
-        .reset_index()
+        ),
+        group_cols=["region"],
+        value_col="nox_red_tons_per_yr",
+        start_col="year",
+        end_col="bnefits_expiry_year",
     )
 
     deri_loco_nox_red_yr_prcd_analysis_yr = deri_loco_nox_red_yr_prcd.loc[
@@ -140,13 +164,13 @@ def get_deri_quantity_red(
         .assign(
             nox_red_tons_per_yr_per_region=lambda df: df.nox_red_tons_per_yr,
             pollutant="NOX",
-            tp_county_nm=lambda df: df.counties.str.lower().str.strip(),
+            stcntyfips=lambda df: df.stcntyfips.astype(int),
             scc_description_level_4="Yard Locomotives",
         )
         .filter(
             items=[
                 "region",
-                "tp_county_nm",
+                "stcntyfips",
                 "scc_description_level_4",
                 "year",
                 "nox_red_tons_per_yr_per_region",
@@ -157,63 +181,70 @@ def get_deri_quantity_red(
     return deri_loco_nox_red_yr_prcd_emis_quant_region
 
 
-def get_deri_uncontrolled_quant(
+def get_deri_control(
     emis_quant_agg_: pd.DataFrame,
     deri_loco_nox_red_yr_prcd_emis_quant_region_: pd.DataFrame,
-    us_ton_to_grams=907185,
-) -> dict:
-    """"""
-    uncontrolled_emis_quant_deri = emis_quant_agg_.assign(
-        tp_county_nm=lambda df: df.county_name.str.lower().str.strip()
-    ).merge(
-        (
-            deri_loco_nox_red_yr_prcd_emis_quant_region_.filter(
-                items=[
-                    "region",
-                    "tp_county_nm",
-                    "year",
-                    "scc_description_level_4",
-                    "pollutant",
-                    "nox_red_tons_per_yr_per_region",
-                ]
-            )
-        ),
-        on=["tp_county_nm", "year", "scc_description_level_4", "pollutant"],
-        how="left",
+) -> ControlStrategy:
+    """
+    DERI NOx benefits as an offset on the uncontrolled emissions. The yearly
+    benefit of a region is split equally among the county and yard
+    combinations of the region with yard NOx emissions in emis_quant_agg_.
+    """
+    deri_region = deri_loco_nox_red_yr_prcd_emis_quant_region_.filter(
+        items=[
+            "region",
+            "stcntyfips",
+            "year",
+            "scc_description_level_4",
+            "pollutant",
+            "nox_red_tons_per_yr_per_region",
+        ]
+    ).reset_index(drop=True)
+    deri_row_idx = get_control_row_idx(
+        emis_quant_agg_,
+        deri_region,
+        [col for col in CONTROL_KEY_COLS if col in deri_region.columns],
     )
+    is_deri_row = (deri_row_idx >= 0) & emis_quant_agg_.em_quant.notna().to_numpy()
     region_county_yard_count = (
-        uncontrolled_emis_quant_deri.dropna(subset=["em_quant"])
-        .filter(items=["region", "tp_county_nm", "yardname_v1"])
+        pd.DataFrame(
+            {
+                "region": deri_region.region.to_numpy()[deri_row_idx[is_deri_row]],
+                "stcntyfips": emis_quant_agg_.stcntyfips.to_numpy()[is_deri_row],
+                "yardname_v1": emis_quant_agg_.yardname_v1.to_numpy()[is_deri_row],
+            }
+        )
         .drop_duplicates()
         .dropna(subset=["region"])
         .groupby("region")
         .agg(no_counties_yards=("yardname_v1", "count"))
         .reset_index()
     )
-
-    uncontrolled_emis_quant_deri_1 = (
-        uncontrolled_emis_quant_deri.merge(
-            region_county_yard_count, on=["region"], how="left"
-        )
-        .assign(
-            nox_red_tons_per_yr_per_county_per_yard=lambda df: df.nox_red_tons_per_yr_per_region
-            / df.no_counties_yards
-        )
-        .assign(
-            nox_red_tons_per_yr_per_county_per_yard=lambda df: df.nox_red_tons_per_yr_per_county_per_yard.fillna(
-                0
-            ),
-            em_quant_ton=lambda df: df.em_quant / us_ton_to_grams,
-            uncontrolled_em_quant_ton=lambda df: (
-                df.em_quant_ton + df.nox_red_tons_per_yr_per_county_per_yard
-            ),
+    deri_values = deri_region.merge(
+        region_county_yard_count, on=["region"], how="left"
+    ).assign(
+        nox_red_tons_per_yr_per_county_per_yard=lambda df: (
+            df.nox_red_tons_per_yr_per_region / df.no_counties_yards
         )
     )
-    assert_deri_tot(
-        uncontrolled_emis_quant_deri_1, "nox_red_tons_per_yr_per_county_per_yard"
+    return ControlStrategy(
+        name="deri",
+        kind="offset",
+        variant="uncntr",
+        values=deri_values,
+        value_col="nox_red_tons_per_yr_per_county_per_yard",
+        attr_cols=("region", "nox_red_tons_per_yr_per_region", "no_counties_yards"),
     )
 
-    deri_emis_red_by_yard_summary = uncontrolled_emis_quant_deri_1.loc[
+
+def get_deri_emis_red_by_yard_summary(
+    uncontrolled_emis_quant_deri_: pd.DataFrame,
+) -> pd.DataFrame:
+    """Get the DERI NOx reduction by year, region, county, and yard."""
+    assert_deri_tot(
+        uncontrolled_emis_quant_deri_, "nox_red_tons_per_yr_per_county_per_yard"
+    )
+    return uncontrolled_emis_quant_deri_.loc[
         lambda df: (df.nox_red_tons_per_yr_per_county_per_yard != 0),
         [
             "year",
@@ -238,9 +269,68 @@ def get_deri_uncontrolled_quant(
             "nox_red_tons_per_yr_per_county_per_yard",
         ],
     ].sort_values(by=["year", "region", "stcntyfips", "yardname_v1"])
+
+
+@profile_stage
+def get_deri_uncontrolled_quant(
+    emis_quant_agg_: pd.DataFrame,
+    deri_loco_nox_red_yr_prcd_emis_quant_region_: pd.DataFrame,
+    us_ton_to_grams=907185,
+) -> dict:
+    """
+    Get the uncontrolled emissions, i.e., the emissions with the DERI NOx
+    benefits added back, and the DERI NOx reduction by yard.
+    """
+    control_strategies = [
+        get_deri_control(emis_quant_agg_, deri_loco_nox_red_yr_prcd_emis_quant_region_)
+    ]
+    uncontrolled_emis_quant_deri_1 = get_control_variant(
+        apply_controls(emis_quant_agg_, control_strategies, us_ton_to_grams),
+        control_strategies,
+        "uncntr",
+    )
     return {
         "uncontrolled_emis_quant_deri_1": uncontrolled_emis_quant_deri_1,
-        "deri_emis_red_by_yard_summary": deri_emis_red_by_yard_summary,
+        "deri_emis_red_by_yard_summary": get_deri_emis_red_by_yard_summary(
+            uncontrolled_emis_quant_deri_1
+        ),
+    }
+
+
+@profile_stage
+def get_uncntr_cntr_emis_quant(
+    emis_quant_agg_: pd.DataFrame,
+    txled_fac_: pd.DataFrame,
+    deri_loco_nox_red_yr_prcd_emis_quant_region_: pd.DataFrame,
+    us_ton_to_grams=907185,
+) -> dict:
+    """
+    Get the uncontrolled and controlled emissions in one pass, with the TxLED
+    factors and the DERI NOx benefits applied to the same table.
+
+    Returns
+    -------
+    dict
+        uncntr_cntr_emis_quant: emis_quant_agg_ columns, the TxLED and DERI
+        columns, em_quant_ton, and the controlled and uncontrolled emission
+        quantities in grams and tons as sibling columns.
+        deri_emis_red_by_yard_summary: DERI NOx reduction by yard.
+        control_strategies: TxLED and DERI ControlStrategy, to select the
+        controlled or uncontrolled columns with get_control_variant.
+    """
+    control_strategies = [
+        get_txled_control(txled_fac_),
+        get_deri_control(emis_quant_agg_, deri_loco_nox_red_yr_prcd_emis_quant_region_),
+    ]
+    uncntr_cntr_emis_quant = apply_controls(
+        emis_quant_agg_, control_strategies, us_ton_to_grams
+    )
+    return {
+        "uncntr_cntr_emis_quant": uncntr_cntr_emis_quant,
+        "deri_emis_red_by_yard_summary": get_deri_emis_red_by_yard_summary(
+            uncntr_cntr_emis_quant
+        ),
+        "control_strategies": control_strategies,
     }
 
 
@@ -255,16 +345,15 @@ if __name__ == "__main__":
     path_emisquant_agg = glob.glob(
         os.path.join(PATH_PROCESSED, "emis_quant_loco_agg_[0-9]*-*-*.csv")
     )[0]
-    path_out_uncntr_pat = os.path.join(
-        PATH_PROCESSED, f"uncntr_emis_quant_[0-9]*-*-*.csv"
-    )
     path_txled_prc_out = os.path.join(PATH_PROCESSED, "txled_factors_by_county_prc.csv")
     path_deri_prc_out = os.path.join(PATH_PROCESSED, "deri_factors_by_county_prc.csv")
-    cleanup_prev_output(path_out_uncntr_pat)
-    path_out_uncntr = os.path.join(PATH_PROCESSED, f"uncntr_emis_quant_{st}.csv")
-    path_out_cntr_pat = os.path.join(PATH_PROCESSED, f"cntr_emis_quant_[0-9]*-*-*.csv")
-    cleanup_prev_output(path_out_cntr_pat)
-    path_out_cntr = os.path.join(PATH_PROCESSED, f"cntr_emis_quant_{st}.csv")
+    path_out_uncntr_cntr_pat = os.path.join(
+        PATH_PROCESSED, f"uncntr_cntr_emis_quant_[0-9]*-*-*.csv"
+    )
+    cleanup_prev_output(path_out_uncntr_cntr_pat)
+    path_out_uncntr_cntr = os.path.join(
+        PATH_PROCESSED, f"uncntr_cntr_emis_quant_{st}.csv"
+    )
     emis_quant_agg = pd.read_csv(path_emisquant_agg, index_col=0)
 
     txled_fac = get_txled_factors(
@@ -272,23 +361,17 @@ if __name__ == "__main__":
         path_texas_counties_=path_texas_counties,
     )
     txled_fac.to_csv(path_txled_prc_out)
-    controlled_emis_quant = get_controlled_txled(
-        emis_quant_agg_=emis_quant_agg, txled_fac_=txled_fac
-    )
-
     deri_loco_nox_red_yr_prcd_emis_quant_region = get_deri_quantity_red(
         path_deri_loco_regions_=path_deri_loco_regions,
         path_deri_loco_nox_red_yr_=path_deri_loco_nox_red_yr,
+        path_texas_counties_=path_texas_counties,
     )
-    uncontrolled_emis_quant_deri_dict = get_deri_uncontrolled_quant(
+    uncntr_cntr_emis_quant_dict = get_uncntr_cntr_emis_quant(
         emis_quant_agg_=emis_quant_agg,
+        txled_fac_=txled_fac,
         deri_loco_nox_red_yr_prcd_emis_quant_region_=deri_loco_nox_red_yr_prcd_emis_quant_region,
     )
-    uncontrolled_emis_quant_deri = uncontrolled_emis_quant_deri_dict[
-        "uncontrolled_emis_quant_deri_1"
-    ]
-
-    deri_emis_red_by_yard_summary = uncontrolled_emis_quant_deri_dict[
+    deri_emis_red_by_yard_summary = uncntr_cntr_emis_quant_dict[
         "deri_emis_red_by_yard_summary"
     ]
 
@@ -318,5 +401,4 @@ if __name__ == "__main__":
     ).filter(items=deri_rename_cols.values())
     deri_emis_red_by_yard_summary_1.to_csv(path_deri_prc_out)
 
-    uncontrolled_emis_quant_deri.to_csv(path_out_uncntr)
-    controlled_emis_quant.to_csv(path_out_cntr)
+    uncntr_cntr_emis_quant_dict["uncntr_cntr_emis_quant"].to_csv(path_out_uncntr_cntr)
@@ -10,18 +10,22 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), ".."))
 
 def set_yard_uncntr_cntr_xml(
     path_nonpoint_brgtool_,
-    path_uncntr_cntr_emisquant_,
+    uncntr_cntr_emisquant_: pd.DataFrame,
     emis_quant_ton_col="uncontrolled_em_quant_ton",
 ):
+    """
+    Set the 2020 nonpoint emissions in the bridge tool database from the
+    emission quantities with the uncontrolled and controlled quantities as
+    sibling columns. emis_quant_ton_col picks the variant.
+    """
     conn = pyodbc.connect(
         r"""Driver={0};DBQ={1}""".format(
             "{Microsoft Access Driver (*.mdb, *.accdb)}", path_nonpoint_brgtool_
         )
     )
     cursor = conn.cursor()
-    uncntr_or_cntr_emisquant = pd.read_csv(path_uncntr_cntr_emisquant_)
     uncntr_or_cntr_emisquant_nonpoint_2020 = (
-        uncntr_or_cntr_emisquant.loc[
+        uncntr_cntr_emisquant_.loc[
             lambda df: (df.scc_description_level_4 != "Yard Locomotives")
             & (df.year == 2020)
         ]
@@ -98,11 +102,8 @@ def set_emissiosn_yard_xml(uncntr_or_cntr_emisquant_nonpoint_2020_, conn_, curso
 
 
 if __name__ == "__main__":
-    path_uncntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-    )[0]
-    path_cntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+    path_uncntr_cntr_emisquant = glob.glob(
+        os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
     )[0]
     path_uncntr_nonpoint_brgtool = os.path.join(
         PATH_PROCESSED, "eis_stagging_tables", "nonpoint_bridgetool_uncntr.accdb"
@@ -110,14 +111,15 @@ if __name__ == "__main__":
     path_cntr_nonpoint_brgtool = os.path.join(
         PATH_PROCESSED, "eis_stagging_tables", "nonpoint_bridgetool_cntr.accdb"
     )
+    uncntr_cntr_emisquant = pd.read_csv(path_uncntr_cntr_emisquant)
 
     set_yard_uncntr_cntr_xml(
         path_nonpoint_brgtool_=path_uncntr_nonpoint_brgtool,
-        path_uncntr_cntr_emisquant_=path_uncntr_emisquant,
+        uncntr_cntr_emisquant_=uncntr_cntr_emisquant,
         emis_quant_ton_col="uncontrolled_em_quant_ton",
     )
     set_yard_uncntr_cntr_xml(
         path_nonpoint_brgtool_=path_cntr_nonpoint_brgtool,
-        path_uncntr_cntr_emisquant_=path_cntr_emisquant,
+        uncntr_cntr_emisquant_=uncntr_cntr_emisquant,
         emis_quant_ton_col="controlled_em_quant_ton",
     )
@@ -9,16 +9,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname("__file__"), ".."))
 
 
 def get_epa_eis_facility_unit_prc_identifiers(
-    path_epa_eis_info_: str, path_cntr_emisquant_: str
+    path_epa_eis_info_: str, uncntr_cntr_emisquant_: pd.DataFrame
 ):
     """
     Use the data provided by EPA's Janice to find the EIS unit and process
     identifiers.
     """
     epa_yard_info = pd.read_csv(path_epa_eis_info_)
-    cntr_emisquant = pd.read_csv(path_cntr_emisquant_)
     unique_yards_ertac_2017 = (
-        cntr_emisquant.loc[
+        uncntr_cntr_emisquant_.loc[
             lambda df: (df.scc_description_level_4 == "Yard Locomotives")
             & (df.year == 2020)
             & (df.pollutant == "CO")
@@ -50,20 +49,24 @@ def get_epa_eis_facility_unit_prc_identifiers(
 
 def set_yard_uncntr_cntr_xml(
     path_yard_brgtool_,
-    path_uncntr_cntr_emisquant_,
+    uncntr_cntr_emisquant_: pd.DataFrame,
     path_yard_prcs_,
     emis_quant_ton_col="uncontrolled_em_quant_ton",
 ):
+    """
+    Set the 2020 yard facilities and emissions in the bridge tool database
+    from the emission quantities with the uncontrolled and controlled
+    quantities as sibling columns. emis_quant_ton_col picks the variant.
+    """
     conn = pyodbc.connect(
         r"""Driver={0};DBQ={1}""".format(
             "{Microsoft Access Driver (*.mdb, *.accdb)}", path_yard_brgtool_
         )
     )
     cursor = conn.cursor()
-    uncntr_or_cntr_emisquant = pd.read_csv(path_uncntr_cntr_emisquant_)
     yard_prcs = pd.read_excel(path_yard_prcs_)
     uncntr_cntr_emisquant_yards_2020 = (
-        uncntr_or_cntr_emisquant.loc[
+        uncntr_cntr_emisquant_.loc[
             lambda df: (df.scc_description_level_4 == "Yard Locomotives")
             & (df.year == 2020)
         ]
@@ -200,11 +203,8 @@ if __name__ == "__main__":
     path_epa_eis_info = os.path.join(
         PATH_RAW, "eis_report_16580", "fac_conf_proc_unit_16580.csv"
     )
-    path_uncntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-    )[0]
-    path_cntr_emisquant = glob.glob(
-        os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+    path_uncntr_cntr_emisquant = glob.glob(
+        os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
     )[0]
     path_yard_prcs = os.path.join(
         PATH_PROCESSED, "imputed_ertac_yard_2017_with_eis_unit_prc.xlsx"
@@ -215,19 +215,21 @@ if __name__ == "__main__":
     path_cntr_yard_brgtool = os.path.join(
         PATH_PROCESSED, "eis_stagging_tables", "yard_bridgetool_cntr_v2.accdb"
     )
+    uncntr_cntr_emisquant = pd.read_csv(path_uncntr_cntr_emisquant)
     epa_eis_facility_unit_prc_identifiers = get_epa_eis_facility_unit_prc_identifiers(
-        path_epa_eis_info_=path_epa_eis_info, path_cntr_emisquant_=path_cntr_emisquant
+        path_epa_eis_info_=path_epa_eis_info,
+        uncntr_cntr_emisquant_=uncntr_cntr_emisquant,
     )
     epa_eis_facility_unit_prc_identifiers.to_excel(path_yard_prcs, index=False)
     # set_yard_uncntr_cntr_xml(
     #     path_yard_brgtool_=path_uncntr_yard_brgtool,
-    #     path_uncntr_cntr_emisquant_=path_uncntr_emisquant,
+    #     uncntr_cntr_emisquant_=uncntr_cntr_emisquant,
     #     path_yard_prcs_=path_yard_prcs,
     #     emis_quant_ton_col="uncontrolled_em_quant_ton",
     # )
     set_yard_uncntr_cntr_xml(
         path_yard_brgtool_=path_cntr_yard_brgtool,
-        path_uncntr_cntr_emisquant_=path_cntr_emisquant,
+        uncntr_cntr_emisquant_=uncntr_cntr_emisquant,
         path_yard_prcs_=path_yard_prcs,
         emis_quant_ton_col="controlled_em_quant_ton",
     )
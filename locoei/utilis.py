@@ -7,7 +7,15 @@ import glob
 import mysql.connector as mariadb
 import time
 import datetime
+import hashlib
+import pickle
+import json
+import shutil
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import shapefile
 from dotenv import find_dotenv, load_dotenv
 from io import StringIO
@@ -22,6 +30,11 @@ PATH_INTERIM = os.path.join(PATH_TO_PROJECT_ROOT, "data", "interim")
 PATH_PROCESSED = os.path.join(PATH_TO_PROJECT_ROOT, "data", "processed")
 PATH_RAW = os.path.join(PATH_TO_PROJECT_ROOT, "data", "raw")
 PATH_INTERIM_RUNNING = os.path.join(PATH_INTERIM, "running")
+PATH_EXCEL_CACHE = os.path.join(PATH_INTERIM, "excel_cache")
+EXCEL_CACHE_DIR_ENV = "LOCOEI_EXCEL_CACHE_DIR"
+EXCEL_CACHE_STATS = {"hits": 0, "misses": 0}
+ARTIFACT_PARTITION_COLS = ("year", "pollutant")
+ARTIFACT_SCHEMA_FILE = "_common_metadata"
 xwalk_ssc_desc_4_rr_grp_netgrp = StringIO(
     """scc_description_level_4,rr_group,rr_netgrp
     Line Haul Locomotives: Class I Operations,Class I,Freight
@@ -96,11 +109,428 @@ def read_shapefile(path_shp_file):
     return df
 
 
+def get_excel_cache_key(path_excel_, sheet_name, read_kwargs: dict) -> str:
+    """Hash the excel path, modification time, size, sheet, and read options."""
+    excel_stat = os.stat(path_excel_)
+    key = repr(
+        (
+            os.path.abspath(path_excel_),
+            excel_stat.st_mtime_ns,
+            excel_stat.st_size,
+            sheet_name,
+            sorted(read_kwargs.items()),
+        )
+    )
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def get_excel_cache_dir():
+    """
+    Get the excel cache directory: the LOCOEI_EXCEL_CACHE_DIR environment
+    variable when it is set, PATH_EXCEL_CACHE otherwise. An empty
+    LOCOEI_EXCEL_CACHE_DIR turns the cache off (None).
+    """
+    return os.environ.get(EXCEL_CACHE_DIR_ENV, PATH_EXCEL_CACHE) or None
+
+
+def read_excel_cached(
+    path_excel_, sheet_name=0, path_cache_dir_=None, **read_kwargs
+) -> pd.DataFrame:
+    """
+    Read an excel sheet with pd.read_excel and cache the parsed sheet as a
+    parquet file in path_cache_dir_. Later reads of the same path, sheet, and
+    read options are served from the parquet file until the excel file
+    changes (modification time or size). Sheets that parquet cannot store
+    (e.g. non-string column names or mixed type columns) are cached as
+    pickle files. Cache hits and misses are counted in EXCEL_CACHE_STATS.
+
+    path_cache_dir_:
+        Cache directory. get_excel_cache_dir is used when None, and the sheet
+        is read without a cache when that is None too.
+    read_kwargs:
+        Other pd.read_excel arguments.
+    """
+    if path_cache_dir_ is None:
+        path_cache_dir_ = get_excel_cache_dir()
+    if path_cache_dir_ is None:
+        return pd.read_excel(path_excel_, sheet_name=sheet_name, **read_kwargs)
+    cache_key = get_excel_cache_key(path_excel_, sheet_name, read_kwargs)
+    path_cache_stem = os.path.join(
+        path_cache_dir_,
+        f"{Path(path_excel_).stem}_{cache_key}",
+    )
+    if os.path.exists(f"{path_cache_stem}.parquet"):
+        EXCEL_CACHE_STATS["hits"] += 1
+        return pd.read_parquet(f"{path_cache_stem}.parquet")
+    if os.path.exists(f"{path_cache_stem}.pkl"):
+        EXCEL_CACHE_STATS["hits"] += 1
+        return pd.read_pickle(f"{path_cache_stem}.pkl")
+    EXCEL_CACHE_STATS["misses"] += 1
+    excel_df = pd.read_excel(path_excel_, sheet_name=sheet_name, **read_kwargs)
+    if not os.path.exists(path_cache_dir_):
+        os.makedirs(path_cache_dir_, exist_ok=True)
+    # Write to a temporary file first so that parallel readers never see a
+    # partial cache file.
+    path_cache_tmp = f"{path_cache_stem}.{os.getpid()}.tmp"
+    try:
+        excel_df.to_parquet(path_cache_tmp)
+        os.replace(path_cache_tmp, f"{path_cache_stem}.parquet")
+    except (ValueError, TypeError, ImportError):
+        if os.path.exists(path_cache_tmp):
+            os.remove(path_cache_tmp)
+        with open(path_cache_tmp, "wb") as fi:
+            pickle.dump(excel_df, fi)
+        os.replace(path_cache_tmp, f"{path_cache_stem}.pkl")
+    return excel_df
+
+
+def get_excel_cache_stats() -> dict:
+    """Get the excel cache hits and misses since the last reset."""
+    return dict(EXCEL_CACHE_STATS)
+
+
+def reset_excel_cache_stats() -> None:
+    """Reset the excel cache hit and miss counts."""
+    EXCEL_CACHE_STATS["hits"] = 0
+    EXCEL_CACHE_STATS["misses"] = 0
+
+
 def get_snake_case_dict(columns):
     """ Get columns in snake_case."""
     return {col: re.sub(r"\W+", "_", inflection.underscore(col)) for col in columns}
 
 
+def normalize_county_nm(county_nm_: pd.Series) -> pd.Series:
+    """Lower case and strip the county names for matching."""
+    return county_nm_.str.lower().str.strip()
+
+
+def get_county_fips_index(path_county_: str) -> pd.Series:
+    """
+    Get the county resolution index: the five digit county FIPS code
+    (stcntyfips) by normalized county name, from a county boundary file with
+    the CNTY_NM and FIPS_ST_CNTY_CD columns (Texas_County_Boundaries.csv).
+    """
+    county = pd.read_csv(path_county_, usecols=["CNTY_NM", "FIPS_ST_CNTY_CD"])
+    county_fips_index = pd.Series(
+        county.FIPS_ST_CNTY_CD.to_numpy(),
+        index=normalize_county_nm(county.CNTY_NM).to_numpy(),
+        name="stcntyfips",
+    )
+    assert county_fips_index.index.is_unique, (
+        f"{path_county_} has duplicate county names after normalization."
+    )
+    return county_fips_index
+
+
+def resolve_county_fips(county_nm_: pd.Series, county_fips_index_: pd.Series):
+    """
+    Get the stcntyfips of the county names from get_county_fips_index.
+
+    Returns
+    -------
+    dict
+        stcntyfips: pd.Series of FIPS codes aligned with county_nm_; NaN for
+        the names that are not in the index.
+        unresolved: sorted list of the county names not in the index.
+    """
+    county_nm_norm = normalize_county_nm(county_nm_)
+    stcntyfips = pd.Series(
+        county_fips_index_.reindex(county_nm_norm.to_numpy()).to_numpy(),
+        index=county_nm_.index,
+        name="stcntyfips",
+    )
+    return {
+        "stcntyfips": stcntyfips,
+        "unresolved": sorted(county_nm_.loc[stcntyfips.isna()].unique()),
+    }
+
+
+def expand_intervals(start_, end_) -> dict:
+    """
+    Expand the integer intervals [start_, end_) into one row per integer, in
+    the same order as range(start, end) per row followed by explode. Rows
+    with end <= start have no integers and are dropped.
+
+    Returns
+    -------
+    dict
+        row_idx: position of the interval row of each expanded row.
+        value: integer of each expanded row.
+    """
+    start = np.asarray(start_, dtype=np.int64)
+    lengths = np.clip(np.asarray(end_, dtype=np.int64) - start, 0, None)
+    row_idx = np.repeat(np.arange(len(start)), lengths)
+    # Offset of each expanded row within its interval: its position minus the
+    # position of the first row of the interval.
+    interval_first_pos = np.cumsum(lengths) - lengths
+    offsets = np.arange(lengths.sum()) - np.repeat(interval_first_pos, lengths)
+    return {"row_idx": row_idx, "value": start[row_idx] + offsets}
+
+
+def get_interval_year_values(
+    interval_df_: pd.DataFrame,
+    group_cols,
+    value_col: str,
+    start_col="year",
+    end_col="end_year",
+    years=None,
+) -> pd.DataFrame:
+    """
+    Spread value_col of each [start_col, end_col) year interval, e.g. the
+    yearly benefit of a grant from its start to its expiry year, to every year
+    of the interval and sum it by group_cols and year.
+
+    Returns
+    -------
+    pd.DataFrame
+        group_cols, year, and value_col for the group and year combinations
+        covered by at least one interval, limited to years when given.
+    """
+    interval_rows = expand_intervals(
+        interval_df_[start_col].to_numpy(), interval_df_[end_col].to_numpy()
+    )
+    interval_year_df = (
+        interval_df_.filter(items=list(group_cols) + [value_col])
+        .iloc[interval_rows["row_idx"]]
+        .assign(year=interval_rows["value"])
+    )
+    if years is not None:
+        interval_year_df = interval_year_df.loc[lambda df: df.year.isin(years)]
+    return (
+        interval_year_df.groupby(list(group_cols) + ["year"])
+        .agg(**{value_col: (value_col, "sum")})
+        .reset_index()
+    )
+
+
+def get_interval_year_matrix(
+    interval_df_: pd.DataFrame,
+    group_col: str,
+    value_col: str,
+    start_col="year",
+    end_col="end_year",
+    years=None,
+) -> pd.DataFrame:
+    """
+    Get the group_col x year matrix of value_col summed over the year
+    intervals (see get_interval_year_values). Years that no interval of a
+    group covers are 0.
+    """
+    interval_year_values = get_interval_year_values(
+        interval_df_,
+        group_cols=[group_col],
+        value_col=value_col,
+        start_col=start_col,
+        end_col=end_col,
+        years=years,
+    )
+    interval_year_matrix = interval_year_values.pivot(
+        index=group_col, columns="year", values=value_col
+    )
+    if years is not None:
+        interval_year_matrix = interval_year_matrix.reindex(columns=years)
+    return interval_year_matrix.fillna(0)
+
+
+def get_artifact_df(df_: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the object columns of mixed types (e.g. yardname_v1, with the -99
+    placeholder of the non-yard rows) to strings; nulls are kept. Arrow
+    columns have a single type.
+    """
+    mixed_cols = [
+        col
+        for col in df_.columns
+        if (df_[col].dtype == object)
+        and pd.api.types.infer_dtype(df_[col], skipna=True).startswith("mixed")
+    ]
+    if not mixed_cols:
+        return df_
+    return df_.assign(
+        **{
+            col: df_[col].where(df_[col].isna(), df_[col].astype(str))
+            for col in mixed_cols
+        }
+    )
+
+
+def get_artifact_schema(df_: pd.DataFrame) -> pa.Schema:
+    """Get the arrow schema of df_ without the index, with the pandas metadata
+    to restore the dtypes (e.g. categoricals) on read. Mixed type object
+    columns are strings (see get_artifact_df)."""
+    return pa.Schema.from_pandas(get_artifact_df(df_), preserve_index=False)
+
+
+def get_artifact_categories(df_: pd.DataFrame) -> dict:
+    """Get the categories and ordered flag of the categorical columns of df_,
+    so that read_artifact restores the unused categories and their order."""
+    return {
+        col: {
+            "categories": df_[col].cat.categories.tolist(),
+            "ordered": bool(df_[col].cat.ordered),
+        }
+        for col in df_.columns
+        if isinstance(df_[col].dtype, pd.CategoricalDtype)
+    }
+
+
+def write_artifact(
+    df_: pd.DataFrame,
+    path_artifact_: str,
+    partition_cols=ARTIFACT_PARTITION_COLS,
+    schema=None,
+) -> str:
+    """
+    Write df_ as a parquet dataset directory partitioned (hive style, e.g.
+    year=2020/pollutant=NOX/) by the partition_cols in df_. The schema is
+    written to ARTIFACT_SCHEMA_FILE in the directory so that the readers get
+    the same column types for every partition. Mixed type object columns are
+    written as strings (see get_artifact_df). A previous artifact at
+    path_artifact_ is replaced. The index is not written. The categories of
+    the categorical columns are saved in the schema metadata (see
+    get_artifact_categories).
+
+    schema:
+        Arrow schema of the artifact. From get_artifact_schema when None.
+
+    Returns
+    -------
+    str
+        path_artifact_
+    """
+    df_ = get_artifact_df(df_)
+    if schema is None:
+        schema = get_artifact_schema(df_)
+    table = pa.Table.from_pandas(df_, schema=schema, preserve_index=False)
+    partition_fields = [
+        schema.field(col) for col in partition_cols if col in schema.names
+    ]
+    if os.path.exists(path_artifact_):
+        shutil.rmtree(path_artifact_)
+    ds.write_dataset(
+        table,
+        path_artifact_,
+        format="parquet",
+        partitioning=(
+            ds.partitioning(pa.schema(partition_fields), flavor="hive")
+            if partition_fields
+            else None
+        ),
+        basename_template="part-{i}.parquet",
+    )
+    pq.write_metadata(
+        schema.with_metadata(
+            {
+                **(schema.metadata or {}),
+                b"partition_cols": ",".join(
+                    field.name for field in partition_fields
+                ).encode(),
+                b"categories": json.dumps(get_artifact_categories(df_)).encode(),
+            }
+        ),
+        os.path.join(path_artifact_, ARTIFACT_SCHEMA_FILE),
+    )
+    return path_artifact_
+
+
+def read_artifact_schema(path_artifact_: str) -> pa.Schema:
+    """Read the schema written by write_artifact."""
+    return pq.read_schema(os.path.join(path_artifact_, ARTIFACT_SCHEMA_FILE))
+
+
+def get_artifact_partition_cols(schema: pa.Schema) -> list:
+    """Get the partition columns of an artifact from its schema metadata."""
+    partition_cols = (schema.metadata or {}).get(b"partition_cols", b"").decode()
+    return partition_cols.split(",") if partition_cols else []
+
+
+def read_artifact_categories(schema: pa.Schema) -> dict:
+    """Get the categories saved by write_artifact from the schema metadata."""
+    return json.loads((schema.metadata or {}).get(b"categories", b"{}"))
+
+
+def get_artifact_filter(filters: dict):
+    """
+    Get the arrow filter expression for filters: column to a value or a
+    list of values. None when filters is empty.
+    """
+    filter_expr = None
+    for col, val in filters.items():
+        if isinstance(val, (list, tuple, set, np.ndarray, pd.Index)):
+            col_expr = ds.field(col).isin(list(val))
+        else:
+            col_expr = ds.field(col) == val
+        filter_expr = col_expr if filter_expr is None else filter_expr & col_expr
+    return filter_expr
+
+
+def read_artifact(path_artifact_: str, columns=None, filters=None) -> pd.DataFrame:
+    """
+    Read an artifact written by write_artifact.
+
+    columns:
+        Columns to read. All columns when None. Only the parquet column chunks
+        of these columns are read.
+    filters:
+        dict of column to a value or a list of values to keep. Partitions that
+        do not match the filters on the partition columns are not read; the
+        filters on the other columns are applied while reading.
+
+    Returns
+    -------
+    pd.DataFrame
+        Rows in partition order, with a new RangeIndex.
+    """
+    schema = read_artifact_schema(path_artifact_)
+    partition_cols = get_artifact_partition_cols(schema)
+    artifact_categories = read_artifact_categories(schema)
+    # The partition values are parsed from the directory names as the value
+    # type of the categorical partition columns and dictionary encoded after
+    # the read.
+    dict_partition_cols = []
+    for col in partition_cols:
+        field = schema.field(col)
+        if pa.types.is_dictionary(field.type):
+            dict_partition_cols.append(col)
+            schema = schema.set(
+                schema.get_field_index(col), field.with_type(field.type.value_type)
+            )
+    partition_fields = [schema.field(col) for col in partition_cols]
+    artifact_ds = ds.dataset(
+        path_artifact_,
+        schema=schema,
+        format="parquet",
+        partitioning=(
+            ds.partitioning(pa.schema(partition_fields), flavor="hive")
+            if partition_fields
+            else None
+        ),
+    )
+    artifact_table = artifact_ds.to_table(
+        columns=columns,
+        filter=get_artifact_filter(filters) if filters else None,
+    )
+    for col in dict_partition_cols:
+        if col in artifact_table.column_names:
+            artifact_table = artifact_table.set_column(
+                artifact_table.column_names.index(col),
+                col,
+                artifact_table[col].dictionary_encode(),
+            )
+    artifact_df = artifact_table.to_pandas().reset_index(drop=True)
+    # The categories of the read columns are the values present in the read
+    # partitions; restore all the categories in their order.
+    for col, col_categories in artifact_categories.items():
+        if col in artifact_df.columns:
+            artifact_df[col] = artifact_df[col].astype(
+                pd.CategoricalDtype(
+                    col_categories["categories"], ordered=col_categories["ordered"]
+                )
+            )
+    return artifact_df
+
+
 if __name__ == "__main__":
     path_natrail2020 = os.path.join(
         PATH_RAW, "North_American_Rail_Lines", "North_American_Rail_Lines.shp"
@@ -0,0 +1,16 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+from locoei.utilis import EXCEL_CACHE_DIR_ENV
+
+
+@pytest.fixture(scope="session", autouse=True)
+def set_excel_cache_dir(tmp_path_factory):
+    # Keep the excel cache of the test inputs out of data/interim. Set for the
+    # whole session so that module fixtures and worker processes use it too.
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv(
+            EXCEL_CACHE_DIR_ENV, str(tmp_path_factory.mktemp("excel_cache"))
+        )
+        yield
@@ -0,0 +1,34 @@
+"""
+Tests the synthetic input generator and the benchmark baseline comparison.
+"""
+import pandas as pd
+from benchmarks.synthetic import make_synthetic_inputs
+from benchmarks.run_benchmarks import compare_to_baseline
+
+
+def test_make_synthetic_inputs(tmp_path):
+    synth_inputs = make_synthetic_inputs(tmp_path, states=("TX",), links_per_county=2)
+    natrail = pd.read_csv(
+        tmp_path / "interim" / "North_American_Rail_Lines.csv", low_memory=False
+    )
+    assert len(natrail) == synth_inputs["n_links"]
+    assert set(natrail.STATEAB) == {"TX"}
+    assert synth_inputs["n_counties"] == 254
+
+
+def test_compare_to_baseline():
+    baseline = {
+        "scales": {
+            "tx": {"stages": {"preprc_link": {"wall_sec": 1.0, "peak_mem_mb": 10}}}
+        }
+    }
+    bench_res = {
+        "scales": {
+            "tx": {"stages": {"preprc_link": {"wall_sec": 1.5, "peak_mem_mb": 11}}}
+        }
+    }
+    bench_comparison = compare_to_baseline(bench_res, baseline, tolerance=0.25)
+    assert bench_comparison.set_index("metric").regressed.to_dict() == {
+        "wall_sec": True,
+        "peak_mem_mb": False,
+    }
@@ -0,0 +1,318 @@
+"""
+Tests cersxml_writer module.
+"""
+import xml.etree.ElementTree as ET
+from lxml import etree as lxml_etree
+import copy
+import filecmp
+import os
+import pandas as pd
+import pytest
+from locoei.cersxml_templ import (
+    set_creation_datetime,
+    set_document_id,
+    register_all_namespaces,
+)
+from locoei.cersxml_writer import (
+    ns,
+    get_emisquant_value_index,
+    write_uncntr_cntr_xml_stream,
+)
+from locoei.uncntr_cntr_cersxml import (
+    read_uncntr_cntr_emisquant,
+    prc_uncntr_emisquant,
+    get_uncntr_emisquant_yr_dict,
+    prc_cntr_emisquant,
+    get_cntr_emisquant_yr_dict,
+    clean_up_uncntr_cntr_emisquant,
+)
+from locoei.uncntr_cntr_cersxml_2011_2050 import (
+    get_emisquant_yr_partitions,
+    generate_texaer_series,
+)
+
+
+# Reference writer: builds the whole tree with one deep-copied Location per
+# county, writes it, and re-parses it with lxml to pretty print it.
+def get_location_elem(
+    location_templ, county, emisquant_value_index, non_point_scc_list
+) -> ET.Element:
+    location_template_cpy_cpy = copy.deepcopy(location_templ)
+    fips_elem = location_template_cpy_cpy.find("payload:StateAndCountyFIPSCode", ns)
+    fips_elem.text = f"{county}"
+    locationemissionsprocess_template = location_template_cpy_cpy.find(
+        "payload:LocationEmissionsProcess", ns
+    )
+    locationemissionsprocess_template_cpy = copy.deepcopy(
+        locationemissionsprocess_template
+    )
+    location_template_cpy_cpy.remove(locationemissionsprocess_template)
+    for scc in non_point_scc_list:
+        locationemissionsprocess_template_cpy_cpy = copy.deepcopy(
+            locationemissionsprocess_template_cpy
+        )
+        scc_elem = locationemissionsprocess_template_cpy_cpy.find(
+            "payload:SourceClassificationCode", ns
+        )
+        scc_elem.text = scc
+        if (county, scc) in emisquant_value_index["county_scc"]:
+            for reporting_period_type in ("A", "O3D"):
+                reportingperiodemissions = locationemissionsprocess_template_cpy_cpy.findall(
+                    f"*/[payload:ReportingPeriodTypeCode='{reporting_period_type}']"
+                    "/payload:ReportingPeriodEmissions",
+                    ns,
+                )
+                for reportingperiodemission in reportingperiodemissions:
+                    cur_pollutant = reportingperiodemission.find(
+                        "payload:PollutantCode", ns
+                    ).text
+                    cur_pollutant_emission = reportingperiodemission.find(
+                        "payload:TotalEmissions", ns
+                    )
+                    cur_pollutant_emission.text = emisquant_value_index["values"][
+                        (county, scc, cur_pollutant, reporting_period_type)
+                    ]
+        location_template_cpy_cpy.append(locationemissionsprocess_template_cpy_cpy)
+    return location_template_cpy_cpy
+
+
+def get_uncntr_cntr_xml(
+    path_xml_templ,
+    emisquant_value_index,
+    tx_counties_list,
+    non_point_scc_list,
+    doc_id,
+    creation_datetime_=None,
+):
+    templ_tree = ET.parse(path_xml_templ)
+    templ_root = templ_tree.getroot()
+    templ_root_header = templ_root.find("header:Header", ns)
+    set_document_id(templ_root, doc_id=doc_id)
+    set_creation_datetime(
+        templ_root_header, ns=ns, creation_datetime_=creation_datetime_
+    )
+    cers_template = templ_tree.find(".//payload:Location/...", ns)
+    location_template = templ_tree.find(".//payload:Location", ns)
+    location_template_cpy = copy.deepcopy(location_template)
+    cers_template.remove(location_template)
+    for county in tx_counties_list:
+        cers_template.append(
+            get_location_elem(
+                location_templ=location_template_cpy,
+                county=county,
+                emisquant_value_index=emisquant_value_index,
+                non_point_scc_list=non_point_scc_list,
+            )
+        )
+    return templ_tree
+
+
+def write_xml(xml_tree, path_out_xml):
+    path_out_dirty_xml = path_out_xml.replace(".xml", "_unformatted.xml")
+    xml_tree.write(path_out_dirty_xml, encoding="utf-8", xml_declaration=True)
+    lxml_etree_root = lxml_etree.parse(
+        path_out_dirty_xml,
+        parser=lxml_etree.XMLParser(remove_blank_text=True, remove_comments=True),
+    )
+    lxml_etree_root.write(
+        path_out_xml, pretty_print=True, encoding="utf-8", xml_declaration=True
+    )
+    os.remove(path_out_dirty_xml)
+
+
+def get_rp_emissions(pollutant):
+    return (
+        "<cer:ReportingPeriodEmissions>"
+        f"<cer:PollutantCode>{pollutant}</cer:PollutantCode>"
+        "<cer:TotalEmissions>0</cer:TotalEmissions>"
+        "<cer:EmissionsComment>a &amp; b</cer:EmissionsComment>"
+        "</cer:ReportingPeriodEmissions>"
+    )
+
+
+@pytest.fixture()
+def get_xml_inputs(tmp_path):
+    path_xml_templ = tmp_path / "xml_rail_templ_tti.xml"
+    path_xml_templ.write_text(
+        "<?xml version='1.0' encoding='utf-8'?>\n"
+        '<hdr:Document xmlns:hdr="http://www.exchangenetwork.net/schema/header/2" '
+        'xmlns:cer="http://www.exchangenetwork.net/schema/cer/1" id="x">'
+        "<hdr:Header><hdr:CreationDateTime>2021</hdr:CreationDateTime></hdr:Header>"
+        '<hdr:Payload Operation="refresh"><cer:CERS>'
+        "<cer:EmissionsYear>2020</cer:EmissionsYear><cer:Location>"
+        "<cer:StateAndCountyFIPSCode>fips</cer:StateAndCountyFIPSCode>"
+        "<cer:TribalCode/><cer:LocationEmissionsProcess>"
+        "<cer:SourceClassificationCode>scc</cer:SourceClassificationCode>"
+        "<cer:ReportingPeriod><cer:ReportingPeriodTypeCode>A"
+        "</cer:ReportingPeriodTypeCode>"
+        f"{get_rp_emissions('CO')}{get_rp_emissions('7439921')}"
+        "</cer:ReportingPeriod>"
+        "<cer:ReportingPeriod><cer:ReportingPeriodTypeCode>O3D"
+        "</cer:ReportingPeriodTypeCode>"
+        f"{get_rp_emissions('CO')}</cer:ReportingPeriod>"
+        "</cer:LocationEmissionsProcess></cer:Location></cer:CERS></hdr:Payload>"
+        "</hdr:Document>\n"
+    )
+    emisquant = pd.DataFrame(
+        {
+            "stcntyfips_str": ["48001", "48001", "48005", "48005"],
+            "ssc_str": ["2285002006", "2285002006", "2285002007", "2285002007"],
+            "pollutant_str": ["CO", "7439921", "CO", "7439921"],
+            "em_quant_ton_str": ["1.5", "2e-05", "3.25", "0.0"],
+            "em_quant_ton_daily_str": ["0.1", "0.2", "0.3", "0.0"],
+        }
+    )
+    return {
+        "path_xml_templ": str(path_xml_templ),
+        "emisquant_value_index": get_emisquant_value_index(
+            emisquant_fil_scc_=emisquant,
+            pol_ton_col="em_quant_ton_str",
+            pol_ton_daily_col="em_quant_ton_daily_str",
+        ),
+        "tx_counties_list": ["48001", "48003", "48005"],
+        "non_point_scc_list": ["2285002006", "2285002007"],
+        "doc_id": "locomotives_cntr_cers_aerr_2020_xml",
+        "creation_datetime_": "2021-06-01T10:00:00",
+    }
+
+
+def test_stream_matches_tree_writer(get_xml_inputs, tmp_path):
+    path_out_tree = str(tmp_path / "tree.xml")
+    path_out_stream = str(tmp_path / "stream.xml")
+    register_all_namespaces(get_xml_inputs["path_xml_templ"])
+    write_xml(
+        xml_tree=get_uncntr_cntr_xml(**get_xml_inputs), path_out_xml=path_out_tree
+    )
+    write_uncntr_cntr_xml_stream(path_out_xml=path_out_stream, **get_xml_inputs)
+    with open(path_out_tree, "rb") as fi_tree, open(path_out_stream, "rb") as fi_str:
+        xml_tree_bytes = fi_tree.read()
+        assert xml_tree_bytes == fi_str.read()
+    assert xml_tree_bytes.count(b"<cer:Location>") == 3
+    assert b"<cer:TotalEmissions>3.25</cer:TotalEmissions>" in xml_tree_bytes
+
+
+# Reference year partitions: each variant is read and processed on its own for
+# one year.
+def clean_up_uncntr_emisquant(path_uncntr_emisquant_, year_):
+    uncntr_emisquant = read_uncntr_cntr_emisquant(path_uncntr_emisquant_, [year_])
+    uncntr_emisquant_fil_scc = prc_uncntr_emisquant(uncntr_emisquant)
+    return get_uncntr_emisquant_yr_dict(
+        uncntr_emisquant_fil_scc.loc[lambda df: df.year == year_]
+    )
+
+
+def clean_up_cntr_emisquant(path_cntr_emisquant_, year_):
+    cntr_emisquant = read_uncntr_cntr_emisquant(path_cntr_emisquant_, [year_])
+    cntr_emisquant_fil_scc = prc_cntr_emisquant(cntr_emisquant)
+    return get_cntr_emisquant_yr_dict(
+        cntr_emisquant_fil_scc.loc[lambda df: df.year == year_]
+    )
+
+
+def test_uncntr_cntr_partitions_from_one_csv(tmp_path):
+    path_uncntr_cntr_emisquant = str(tmp_path / "uncntr_cntr_emis_quant.csv")
+    pd.DataFrame(
+        {
+            "year": [2020, 2020, 2020, 2021],
+            "stcntyfips": [48001, 48001, 48005, 48001],
+            "county_name": ["Anderson", "Anderson", "Angelina", "Anderson"],
+            "dat_cat_code": ["NONPOINT"] * 4,
+            "sector_description": ["Mobile - Locomotives"] * 4,
+            "scc_description_level_1": ["Mobile Sources"] * 4,
+            "scc_description_level_2": ["Railroad Equipment"] * 4,
+            "scc_description_level_3": ["Diesel"] * 4,
+            "scc": [2285002010, 2285002010, 2285002006, 2285002010],
+            "scc_description_level_4": [
+                "Yard Locomotives",
+                "Yard Locomotives",
+                "Line Haul Locomotives: Class I Operations",
+                "Yard Locomotives",
+            ],
+            "yardname_v1": ["a", "b", None, "a"],
+            "pol_type": ["CAP"] * 4,
+            "pollutant": ["NOX"] * 4,
+            "pol_desc": ["Nitrogen Oxides"] * 4,
+            "em_fac": [1.0] * 4,
+            "uncontrolled_em_quant_ton": [2.0, 3.0, 4.0, 5.0],
+            "controlled_em_quant_ton": [1.0, 1.5, 4.0, 2.5],
+        }
+    ).to_csv(path_uncntr_cntr_emisquant)
+    emisquant_yr_partitions = get_emisquant_yr_partitions(
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant, years=[2020, 2021]
+    )
+    for variant, clean_up_emisquant in [
+        ("uncntr", clean_up_uncntr_emisquant),
+        ("cntr", clean_up_cntr_emisquant),
+    ]:
+        for year in [2020, 2021]:
+            pd.testing.assert_frame_equal(
+                emisquant_yr_partitions[variant][year]["raw_data"],
+                clean_up_emisquant(path_uncntr_cntr_emisquant, year)["raw_data"],
+            )
+    cntr_2020_values = emisquant_yr_partitions["cntr"][2020]["value_index"]["values"]
+    assert cntr_2020_values[("48001", "2285002010", "NOX", "A")] == "2.5"
+    uncntr_cntr_emisquant_2020_dict = clean_up_uncntr_cntr_emisquant(
+        path_uncntr_cntr_emisquant
+    )
+    for variant in ["uncntr", "cntr"]:
+        assert (
+            uncntr_cntr_emisquant_2020_dict[variant]["value_index"]
+            == emisquant_yr_partitions[variant][2020]["value_index"]
+        )
+
+
+def test_texaer_series_parallel_eq_serial(get_xml_inputs, tmp_path):
+    path_uncntr_cntr_emisquant = str(tmp_path / "uncntr_cntr_emis_quant.csv")
+    pd.DataFrame(
+        {
+            "year": [2020] * 4,
+            "stcntyfips": [48001, 48001, 48005, 48005],
+            "county_name": ["Anderson", "Anderson", "Angelina", "Angelina"],
+            "dat_cat_code": ["NONPOINT"] * 4,
+            "sector_description": ["Mobile - Locomotives"] * 4,
+            "scc_description_level_1": ["Mobile Sources"] * 4,
+            "scc_description_level_2": ["Railroad Equipment"] * 4,
+            "scc_description_level_3": ["Diesel"] * 4,
+            "scc": [2285002006, 2285002006, 2285002007, 2285002007],
+            "scc_description_level_4": [
+                "Line Haul Locomotives: Class I Operations",
+                "Line Haul Locomotives: Class I Operations",
+                "Line Haul Locomotives: Class II / III Operations",
+                "Line Haul Locomotives: Class II / III Operations",
+            ],
+            "yardname_v1": [None] * 4,
+            "pol_type": ["CAP", "HAP", "CAP", "HAP"],
+            "pollutant": ["CO", "7439921", "CO", "7439921"],
+            "pol_desc": ["Carbon Monoxide", "Lead", "Carbon Monoxide", "Lead"],
+            "em_fac": [1.0] * 4,
+            "uncontrolled_em_quant_ton": [1.5, 2e-05, 3.25, 0.0],
+            "controlled_em_quant_ton": [1.0, 1e-05, 2.5, 0.0],
+        }
+    ).to_csv(path_uncntr_cntr_emisquant)
+    texaer_timing_dict = {}
+    for workers in [1, 2]:
+        path_out_dir = tmp_path / f"workers_{workers}"
+        path_out_dir.mkdir()
+        texaer_timing_dict[workers] = generate_texaer_series(
+            years=[2020],
+            path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant,
+            path_xml_templ_=get_xml_inputs["path_xml_templ"],
+            tx_counties_list=get_xml_inputs["tx_counties_list"],
+            non_point_scc_list=get_xml_inputs["non_point_scc_list"],
+            path_out_dir_=str(path_out_dir),
+            workers=workers,
+            creation_datetime_=get_xml_inputs["creation_datetime_"],
+        )
+    assert sorted(os.listdir(tmp_path / "workers_1")) == [
+        "cntr_2020_TexAER.xml",
+        "uncntr_2020_TexAER.xml",
+    ]
+    assert sorted(os.listdir(tmp_path / "workers_1")) == sorted(
+        os.listdir(tmp_path / "workers_2")
+    )
+    for path_out_xml_serial, path_out_xml_parallel in zip(
+        texaer_timing_dict[1].path_out_xml, texaer_timing_dict[2].path_out_xml
+    ):
+        assert filecmp.cmp(path_out_xml_serial, path_out_xml_parallel, shallow=False)
+    with open(tmp_path / "workers_1" / "cntr_2020_TexAER.xml", "rb") as fi:
+        assert b"<cer:TotalEmissions>2.5</cer:TotalEmissions>" in fi.read()
@@ -0,0 +1,107 @@
+"""
+Tests controls module.
+"""
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from locoei.controls import ControlStrategy, apply_controls, get_control_variant
+from locoei.uncntr_cntr_emisquant import get_deri_quantity_red
+from benchmarks.synthetic import make_synthetic_inputs
+
+
+@pytest.fixture()
+def emis_quant_agg():
+    return pd.DataFrame(
+        {
+            "stcntyfips": [48201, 48201, 48113, 48113],
+            "scc_description_level_4": ["Yard Locomotives"] * 4,
+            "pollutant": pd.Categorical(["NOX", "CO", "NOX", "NOX"]),
+            "year": [2020, 2020, 2020, 2021],
+            "em_quant": [907185.0, 907185.0, 2 * 907185.0, 907185.0],
+        }
+    )
+
+
+@pytest.fixture()
+def control_strategies():
+    return [
+        ControlStrategy(
+            name="txled",
+            kind="factor",
+            variant="cntr",
+            values=pd.DataFrame(
+                {"stcntyfips": [48201], "pollutant": ["NOX"], "txled_fac": [0.5]}
+            ),
+            value_col="txled_fac",
+            attr_cols=(),
+        ),
+        ControlStrategy(
+            name="deri",
+            kind="offset",
+            variant="uncntr",
+            values=pd.DataFrame(
+                {
+                    "stcntyfips": [48113],
+                    "year": [2020],
+                    "pollutant": ["NOX"],
+                    "region": ["Dallas/Fort Worth"],
+                    "nox_red": [3.0],
+                }
+            ),
+            value_col="nox_red",
+            attr_cols=("region",),
+        ),
+    ]
+
+
+def test_apply_controls(emis_quant_agg, control_strategies):
+    emis_quant_ctrl = apply_controls(emis_quant_agg, control_strategies)
+    assert np.allclose(emis_quant_ctrl.controlled_em_quant_ton, [0.5, 1, 2, 1])
+    assert np.allclose(emis_quant_ctrl.uncontrolled_em_quant_ton, [1, 1, 5, 1])
+    assert emis_quant_ctrl.region.isna().tolist() == [True, True, False, True]
+    cntr_emis_quant = get_control_variant(emis_quant_ctrl, control_strategies, "cntr")
+    assert list(cntr_emis_quant.columns) == list(emis_quant_agg.columns) + [
+        "txled_fac",
+        "controlled_em_quant",
+        "controlled_em_quant_ton",
+    ]
+    uncntr_emis_quant = get_control_variant(
+        emis_quant_ctrl, control_strategies, "uncntr"
+    )
+    assert list(uncntr_emis_quant.columns) == list(emis_quant_agg.columns) + [
+        "region",
+        "nox_red",
+        "em_quant_ton",
+        "uncontrolled_em_quant_ton",
+    ]
+
+
+def test_apply_controls_duplicate_keys(emis_quant_agg, control_strategies):
+    txled_control = control_strategies[0]
+    txled_control_dup = txled_control._replace(
+        values=pd.concat([txled_control.values, txled_control.values])
+    )
+    with pytest.raises(AssertionError):
+        apply_controls(emis_quant_agg, [txled_control_dup])
+
+
+def test_deri_unresolved_county_raises(tmp_path):
+    path_raw = make_synthetic_inputs(str(tmp_path), links_per_county=1)["path_raw"]
+    deri_kwargs = dict(
+        path_deri_loco_regions_=os.path.join(path_raw, "deri_loco_regions.json"),
+        path_deri_loco_nox_red_yr_=os.path.join(
+            path_raw, "DERI_List_20190831_Loco_Area_Summary.xlsx"
+        ),
+        path_texas_counties_=os.path.join(path_raw, "Texas_County_Boundaries.csv"),
+    )
+    deri_region = get_deri_quantity_red(**deri_kwargs)
+    assert deri_region.stcntyfips.notna().all()
+    with open(deri_kwargs["path_deri_loco_regions_"]) as fi:
+        deri_regions = json.load(fi)
+    deri_regions["0"]["counties"].append("Not A County")
+    with open(deri_kwargs["path_deri_loco_regions_"], "w") as fo:
+        json.dump(deri_regions, fo)
+    with pytest.raises(AssertionError, match="Not A County"):
+        get_deri_quantity_red(**deri_kwargs)
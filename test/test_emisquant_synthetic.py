@@ -0,0 +1,278 @@
+"""
+Tests emisquant module on the synthetic inputs from benchmarks.synthetic.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from locoei.schema import cast_categoricals
+from locoei.fuelcsmp import get_fuel_consmp_by_cnty_carrier
+from locoei.emisrt import get_emis_rt
+from locoei import emisquant
+from locoei.pipeline import map_rrgrp
+from benchmarks.synthetic import make_synthetic_inputs
+
+
+@pytest.fixture(scope="module")
+def get_synthetic_emis_quant_paths(tmp_path_factory):
+    path_out_dir = tmp_path_factory.mktemp("synthetic")
+    synth_inputs = make_synthetic_inputs(
+        str(path_out_dir), states=("TX",), links_per_county=2
+    )
+    path_raw = synth_inputs["path_raw"]
+    path_interim = synth_inputs["path_interim"]
+    fuel_consump = get_fuel_consmp_by_cnty_carrier(
+        path_natrail2020_=os.path.join(path_interim, "North_American_Rail_Lines.csv"),
+        path_rail_carrier_grp_=os.path.join(path_raw, "rail_carrier_grp2020.csv"),
+        path_fill_missing_yardnames_=os.path.join(
+            path_interim,
+            "gis_debugging",
+            "north_america_rail_2021",
+            "filled_missing_yards.xlsx",
+        ),
+        map_rrgrp_=map_rrgrp,
+        filter_st=("TX",),
+        path_fueluserail2019_=os.path.join(path_raw, "RR_2019FuelUsage.csv"),
+        path_cls1_cntpct_=os.path.join(path_raw, "2019CountyPct.csv"),
+    )
+    fuel_consump["year"] = 2019
+    emis_rt = get_emis_rt(
+        path_exp_pol_list_=os.path.join(
+            path_interim, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
+        ),
+        path_hap_speciation_=os.path.join(
+            path_interim,
+            "epa_speciation_table",
+            "power_query",
+            "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+        ),
+        path_nox_pm10_hc_epa_em_fac_=os.path.join(
+            path_interim,
+            "epa_emission_rates",
+            "epa_2009_emission_rates_nox_pm10_hc.xlsx",
+        ),
+    )
+    path_fuel_consump = os.path.join(path_interim, "fuelconsump_2019_tx.csv")
+    path_emis_rt = os.path.join(path_interim, "emission_factor.csv")
+    fuel_consump.to_csv(path_fuel_consump)
+    emis_rt.to_long().to_csv(path_emis_rt)
+    return dict(
+        path_fuel_consump_=path_fuel_consump,
+        path_emis_rt_=path_emis_rt,
+        path_proj_fac_=os.path.join(path_interim, "Projection Factors 04132021.xlsx"),
+        path_county_=os.path.join(path_raw, "Texas_County_Boundaries.csv"),
+        path_ertac_2017_=os.path.join(path_interim, "imputed_ertac_yard_2017.xlsx"),
+    )
+
+
+def test_merge_cnty_nm_to_fuel_proj_observed_groups():
+    fuel_consump_prj = cast_categoricals(
+        pd.DataFrame(
+            {
+                "year": [2020, 2020, 2021],
+                "stcntyfips": [48001, 48003, 48001],
+                "carrier": ["BNSF", "AMTK", "BNSF"],
+                "friylab": ["Fcat", "Fcat", "IYcat"],
+                "rr_netgrp": ["Freight", "Freight", "Yard"],
+                "rr_group": ["Class I", "Passenger", "Class I"],
+                "link_fuel_consmp_by_yr": [1.0, 2.0, 3.0],
+                "miles": [1.0, 1.0, 1.0],
+            }
+        )
+    )
+    county_df_fil = pd.DataFrame(
+        {"stcntyfips": [48001, 48003], "county_name": ["Anderson", "Andrews"]}
+    )
+    fuel_consump_prj_by_cnty = emisquant.merge_cnty_nm_to_fuel_proj(
+        fuel_consump_prj, county_df_fil
+    )
+    # Unobserved category combinations, such as Amtrak on yards, are not
+    # added as empty groups.
+    assert len(fuel_consump_prj_by_cnty) == 3
+    assert set(
+        fuel_consump_prj_by_cnty.loc[
+            lambda df: df.rr_group == "Passenger", "rr_netgrp"
+        ].unique()
+    ) == {"Freight"}
+
+
+def test_link_resolution_runs(get_synthetic_emis_quant_paths):
+    emis_quant_res = emisquant.get_emis_quant(
+        **get_synthetic_emis_quant_paths, link_resolution=True
+    )
+    assert len(emis_quant_res["emis_quant_agg"]) > 0
+    assert emis_quant_res["emis_quant_agg"].em_quant.notna().all()
+
+
+def test_aggregate_first_county_tots_eq_link_resolution(
+    get_synthetic_emis_quant_paths,
+):
+    county_tots_list = []
+    for link_resolution in (False, True):
+        emis_quant_agg = emisquant.get_emis_quant(
+            **get_synthetic_emis_quant_paths, link_resolution=link_resolution
+        )["emis_quant_agg"]
+        county_tots_list.append(
+            emis_quant_agg.groupby(
+                ["year", "stcntyfips", "scc", "pollutant"], observed=True
+            )[["em_quant", "county_carr_friy_yardnm_fuel_consmp_by_yr"]].sum()
+        )
+    county_tots_agg_first, county_tots_link = county_tots_list
+    assert county_tots_agg_first.index.equals(county_tots_link.index)
+    assert np.allclose(county_tots_agg_first, county_tots_link, rtol=1e-9)
+
+
+def test_emis_quant_star_join_eq_groupby():
+    emis_quant_ = pd.DataFrame(
+        {
+            "year": pd.array([2020, 2020, 2020, 2021, 2020], dtype="Int32"),
+            "stcntyfips": [48003, 48001, 48001, 48001, 48001],
+            "county_name": ["Andrews", "Anderson", "Anderson", "Anderson", "Anderson"],
+            "dat_cat_code": "NONPOINT",
+            "sector_description": "Mobile - Locomotives",
+            "scc_description_level_1": "Mobile Sources",
+            "scc_description_level_2": "Railroad Equipment",
+            "scc_description_level_3": "Diesel",
+            "scc": [2285002006, 2285002010, 2285002010, 2285002010, 2285002010],
+            "scc_description_level_4": [
+                "Line Haul Locomotives: Class I Operations",
+                "Yard Locomotives",
+                "Yard Locomotives",
+                "Yard Locomotives",
+                "Yard Locomotives",
+            ],
+            "eis_facility_id": [-99, 101, 101, 101, 101],
+            "yardname_v1": [-99, "Yard A", "Yard A", "Yard A", "Yard A"],
+            "pol_type": ["CAP", "CAP", "CAP", "CAP", np.nan],
+            "pollutant": ["NOX", "NOX", "NOX", "CO", np.nan],
+            "pol_desc": ["Nitrogen Oxides"] * 3 + ["Carbon Monoxide", np.nan],
+            "em_fac": [1.0, 2.0, 4.0, 3.0, np.nan],
+            "em_quant": [10.0, 20.0, 40.0, 30.0, np.nan],
+            "county_carr_friy_yardnm_fuel_consmp_by_yr": [10.0, 10, 10, 10, 10],
+            "county_carr_friy_yardnm_miles_by_yr": [1.0, 1, 1, 1, 1],
+            "site_latitude": [-99, 31.8, 31.8, 31.8, 31.8],
+            "site_longitude": [-99, -95.6, -95.6, -95.6, -95.6],
+        }
+    )
+    emis_quant_star = emisquant.get_emis_quant_star(emis_quant_)
+    emis_quant_agg = emisquant.join_emis_quant_dims(
+        emis_quant_fact_=emis_quant_star["emis_quant_fact"],
+        emis_quant_dims_=emis_quant_star["emis_quant_dims"],
+    )
+    emis_quant_agg_expected = (
+        emis_quant_.groupby(emisquant.EMIS_QUANT_AGG_COLS[:15])
+        .agg(
+            em_fac=("em_fac", "mean"),
+            em_quant=("em_quant", "sum"),
+            county_carr_friy_yardnm_fuel_consmp_by_yr=(
+                "county_carr_friy_yardnm_fuel_consmp_by_yr",
+                "sum",
+            ),
+            county_carr_friy_yardnm_miles_by_yr=(
+                "county_carr_friy_yardnm_miles_by_yr",
+                "sum",
+            ),
+            site_latitude=("site_latitude", "first"),
+            site_longitude=("site_longitude", "first"),
+        )
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(emis_quant_agg, emis_quant_agg_expected)
+    assert len(emis_quant_star["emis_quant_fact"]) == 3
+    assert len(emis_quant_star["emis_quant_dims"]["pollutant"]) == 2
+
+
+def test_emis_quant_star_missing_scc():
+    # An scc_description_level_4 with no emission rates has no scc; the row
+    # is dropped, as in the groupby on the descriptive columns.
+    emis_quant_ = pd.DataFrame(
+        {
+            "year": [2020, 2020, 2020],
+            "stcntyfips": [48001, 48001, 48003],
+            "county_name": ["Anderson", "Anderson", "Andrews"],
+            "dat_cat_code": "NONPOINT",
+            "sector_description": "Mobile - Locomotives",
+            "scc_description_level_1": "Mobile Sources",
+            "scc_description_level_2": "Railroad Equipment",
+            "scc_description_level_3": "Diesel",
+            "scc": [2285002006, np.nan, np.nan],
+            "scc_description_level_4": [
+                "Line Haul Locomotives: Class I Operations",
+                "Line Haul Locomotives: Commuter Lines",
+                np.nan,
+            ],
+            "eis_facility_id": -99,
+            "yardname_v1": -99,
+            "pol_type": "CAP",
+            "pollutant": "NOX",
+            "pol_desc": "Nitrogen Oxides",
+            "em_fac": [1.0, np.nan, np.nan],
+            "em_quant": [10.0, np.nan, np.nan],
+            "county_carr_friy_yardnm_fuel_consmp_by_yr": [10.0, 5.0, 5.0],
+            "county_carr_friy_yardnm_miles_by_yr": [1.0, 1.0, 1.0],
+            "site_latitude": -99,
+            "site_longitude": -99,
+        }
+    )
+    emis_quant_star = emisquant.get_emis_quant_star(emis_quant_)
+    emis_quant_agg = emisquant.join_emis_quant_dims(
+        emis_quant_fact_=emis_quant_star["emis_quant_fact"],
+        emis_quant_dims_=emis_quant_star["emis_quant_dims"],
+    )
+    assert emis_quant_agg.scc.tolist() == [2285002006]
+    assert emis_quant_agg.em_quant.tolist() == [10.0]
+
+
+def test_proj_fac_array_eq_merge_proj_fac():
+    proj_fac = pd.DataFrame(
+        {
+            "rr_group": ["Class I", "Class I", "Class III", "Passenger"],
+            "year": [2011, 2012, 2011, 2012],
+            "proj_fac": [1.0, 1.1, 0.9, 1.2],
+        }
+    )
+    # Commuter has no projection factors and Class III has none for 2012.
+    proj_fac_arr = emisquant.get_proj_fac_array(
+        proj_fac,
+        rr_groups=["Passenger", "Class I", "Commuter", "Class III"],
+        years=[2011, 2012],
+    )
+    assert np.array_equal(
+        proj_fac_arr,
+        np.array([[np.nan, 1.2], [1.0, 1.1], [np.nan, np.nan], [0.9, np.nan]]),
+        equal_nan=True,
+    )
+
+    fuel_consump = pd.DataFrame(
+        {
+            "fraarcid": [1, 2, 3, 4],
+            "net": "M",
+            "miles": [1.0, 2.0, 3.0, 4.0],
+            "stcntyfips": [48001, 48001, 48003, 48003],
+            "carrier": ["UP", "UP", "TXGN", "AMTK"],
+            "friylab": "Fcat",
+            "rr_netgrp": "Freight",
+            "rr_group": ["Class I", "Class I", "Class III", "Passenger"],
+            "link_fuel_consmp": [10.0, 20.0, 30.0, 40.0],
+        }
+    )
+    years = np.arange(2011, 2051)
+    fuel_consump_prj_by_grp = emisquant.project_fuel_consump_by_cnty_grp(
+        fuel_consump, proj_fac, years=years
+    )
+    # Project every link by merging the projection factors, then sum.
+    grp_cols = ["year", "stcntyfips", "carrier", "rr_group"]
+    link_fuel_consump_prj = (
+        emisquant.project_filt_fuel_consump(fuel_consump, proj_fac)
+        .dropna(subset=["fraarcid"])
+        .groupby(grp_cols)
+        .link_fuel_consmp_by_yr.sum()
+    )
+    grp_fuel_consump_prj = fuel_consump_prj_by_grp.set_index(
+        grp_cols
+    ).county_carr_friy_yardnm_fuel_consmp_by_yr
+    assert len(fuel_consump_prj_by_grp) == 3 * len(years)
+    assert np.allclose(
+        grp_fuel_consump_prj,
+        link_fuel_consump_prj.reindex(grp_fuel_consump_prj.index),
+    )
@@ -7,7 +7,11 @@ import pytest
 import pandas as pd
 import numpy as np
 from locoerlt.utilis import PATH_RAW, PATH_INTERIM, get_out_file_tsmp
-from locoerlt.emisrt import hap_speciation_mult
+from locoerlt.emisrt import (
+    hap_speciation_mult,
+    get_speciation_matrices,
+    EmissionFactorCube,
+)
 
 st = get_out_file_tsmp()
 
@@ -196,6 +200,26 @@ def test_hap_speciation(get_out_emis_fac, hap_speciation):
     assert np.allclose(test_df.em_fac_y, test_df.em_fac_x)
 
 
+def test_speciation_matrices(hap_speciation):
+    speciation_mats_dict = get_speciation_matrices(hap_speciation)
+    speciation_rows = speciation_mats_dict["speciation_rows"]
+    mat_multiplication_factor = [
+        speciation_mats_dict["speciation_mats"][scc][
+            hap_code,
+            speciation_mats_dict["parent_pollutants"].get_loc(input_pollutant_code),
+        ]
+        for scc, hap_code, input_pollutant_code in zip(
+            speciation_rows.scc,
+            speciation_rows.hap_code,
+            speciation_rows.input_pollutant_code,
+        )
+    ]
+    assert len(speciation_rows) == len(hap_speciation)
+    assert np.allclose(
+        mat_multiplication_factor, speciation_rows.multiplication_factor
+    )
+
+
 def test_lead_speciation(get_out_emis_fac):
     pm10_fac = (
         get_out_emis_fac.loc[lambda df: (df.pollutant.isin(["PM10-PRI"]))]
@@ -230,3 +254,22 @@ def test_all_year_pollutant_scc_present(get_out_emis_fac):
         == 1
     )
     assert is_1_value_in_all_grp_
+
+
+def test_emis_fac_cube_to_long_eq_emis_fac(get_out_emis_fac):
+    emis_fac_cube = EmissionFactorCube.from_long(get_out_emis_fac)
+    sort_cols = ["scc", "pollutant", "anals_yr"]
+    emis_fac_long = (
+        emis_fac_cube.to_long().sort_values(sort_cols).reset_index(drop=True)
+    )
+    out_emis_fac = (
+        get_out_emis_fac.filter(items=emis_fac_long.columns)
+        .sort_values(sort_cols)
+        .reset_index(drop=True)
+    )
+    assert emis_fac_cube.em_fac.shape == (
+        out_emis_fac.scc.nunique(),
+        out_emis_fac.pollutant.nunique(),
+        out_emis_fac.anals_yr.nunique(),
+    )
+    pd.testing.assert_frame_equal(emis_fac_long, out_emis_fac, check_dtype=False)
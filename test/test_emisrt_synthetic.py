@@ -0,0 +1,204 @@
+"""
+Tests emisrt module on the synthetic EPA inputs from benchmarks.synthetic.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from locoei import emisrt
+from benchmarks.synthetic import write_epa_inputs
+
+
+@pytest.fixture(scope="module")
+def get_synthetic_emis_rt_paths(tmp_path_factory):
+    path_interim = str(tmp_path_factory.mktemp("synthetic"))
+    write_epa_inputs(path_interim, np.random.default_rng(0))
+    return dict(
+        path_exp_pol_list_=os.path.join(
+            path_interim, "epa_pol_list", "np_expected_poll_list_complete_v1.xlsx"
+        ),
+        path_hap_speciation_=os.path.join(
+            path_interim,
+            "epa_speciation_table",
+            "power_query",
+            "AugmentationProfileAssignmentFactors_Rail_2285002xxx_04072021.xlsx",
+        ),
+        path_nox_pm10_hc_epa_em_fac_=os.path.join(
+            path_interim,
+            "epa_emission_rates",
+            "epa_2009_emission_rates_nox_pm10_hc.xlsx",
+        ),
+    )
+
+
+def get_em_fac_res_dict(
+    path_exp_pol_list_, path_hap_speciation_, path_nox_pm10_hc_epa_em_fac_
+) -> dict:
+    """Emission rates by pollutant group, as get_emis_rt builds them."""
+    speciation_2020_fil = emisrt.hap_speciation_mult(path_hap_speciation_)
+    nox_pm10_hc_epa_em_fac_impute = emisrt.epa_tech_report_fac(
+        path_nox_pm10_hc_epa_em_fac_
+    )
+    em_fac_df_template = emisrt.em_fac_template(
+        all_pol_df=emisrt.expected_pol_list(path_exp_pol_list_),
+        speciation_df=speciation_2020_fil,
+    )
+    em_fac_res_dict = {
+        "co2": emisrt.co2_fac(em_fac_df_template),
+        "co": emisrt.co_fac(em_fac_df_template),
+        "nh3": emisrt.nh3_fac(em_fac_df_template),
+        "so2": emisrt.so2_fac(em_fac_df_template),
+    }
+    for pol_nm, pollutant, epa_2009_rts in [
+        ("nox", "NOX", nox_pm10_hc_epa_em_fac_impute),
+        ("pm10", "PM10-PRI", nox_pm10_hc_epa_em_fac_impute),
+        ("pm25", "PM25-PRI", emisrt.create_pm25_fac(nox_pm10_hc_epa_em_fac_impute)),
+        ("voc", "VOC", emisrt.create_voc_fac(nox_pm10_hc_epa_em_fac_impute)),
+    ]:
+        em_fac_res_dict[pol_nm] = emisrt.epa_2009_proj_table_fac(
+            em_fac_df_template_=em_fac_df_template,
+            pollutant=pollutant,
+            epa_2009_rts=epa_2009_rts,
+        )
+    em_fac_res_dict["hap"] = emisrt.hap_fac(
+        voc_pm25_em_fac_list=[em_fac_res_dict["pm25"], em_fac_res_dict["voc"]],
+        speciation_2020_fil_=speciation_2020_fil,
+    )
+    em_fac_res_dict["pb"] = emisrt.hap_fac(
+        voc_pm25_em_fac_list=[em_fac_res_dict["pm10"]],
+        speciation_2020_fil_=emisrt.pb_speciation_builder(speciation_2020_fil),
+        pol_type="CAP",
+    )
+    return em_fac_res_dict
+
+
+def test_emis_fac_cube_to_long_eq_concat(get_synthetic_emis_rt_paths):
+    emis_fac_cube = emisrt.get_emis_rt(**get_synthetic_emis_rt_paths)
+    # Long table get_emis_rt returned before the cube.
+    emis_rt_concat = (
+        pd.concat(get_em_fac_res_dict(**get_synthetic_emis_rt_paths).values())
+        .assign(
+            pollutant=lambda df: df.pollutant.astype(str),
+            anals_yr=lambda df: df.anals_yr.astype(int),
+        )
+        .reset_index(drop=True)
+    )
+    emis_rt_long = emis_fac_cube.to_long()
+    assert emis_fac_cube.em_fac.shape == (
+        emis_rt_concat.scc.nunique(),
+        emis_rt_concat.pollutant.nunique(),
+        emis_rt_concat.anals_yr.nunique(),
+    )
+    assert len(emis_rt_long) == len(emis_rt_concat)
+    emis_rt_long = emis_rt_long.astype(
+        {
+            col: object
+            for col in emis_rt_long.columns
+            if isinstance(emis_rt_long[col].dtype, pd.CategoricalDtype)
+        }
+    )
+    pd.testing.assert_frame_equal(
+        emis_rt_long,
+        emis_rt_concat.filter(items=emis_rt_long.columns),
+        check_dtype=False,
+    )
+    emis_fac_cube_csv = emisrt.EmissionFactorCube.from_long(emis_rt_long)
+    assert emis_fac_cube_csv.pol_df.pollutant.tolist() == (
+        emis_fac_cube.pol_df.pollutant.tolist()
+    )
+    assert np.array_equal(
+        emis_fac_cube_csv.em_fac, emis_fac_cube.em_fac, equal_nan=True
+    )
+
+
+def get_hap_fac_merge(voc_pm25_em_fac_list, speciation_2020_fil_) -> pd.DataFrame:
+    """HAP emission rates from the speciation table exploded by year and
+    merged with the parent pollutant rates, as before the matrices."""
+    scc_cols = [
+        "dat_cat_code",
+        "scc",
+        "scc_description_level_1",
+        "scc_description_level_2",
+        "scc_description_level_3",
+        "scc_description_level_4",
+        "sector_description",
+    ]
+    voc_pm25_fac_df_1 = pd.concat(voc_pm25_em_fac_list).assign(
+        anals_yr=lambda df: df.anals_yr.astype(int)
+    )
+    return (
+        speciation_2020_fil_.assign(
+            anals_yr=[list(np.arange(2011, 2051, 1))] * len(speciation_2020_fil_)
+        )
+        .explode("anals_yr")
+        .assign(anals_yr=lambda df: df.anals_yr.astype(int))
+        .merge(
+            voc_pm25_fac_df_1.rename(columns={"em_fac": "em_fac_input_pol"}).drop(
+                columns=["pol_type"]
+            ),
+            left_on=scc_cols
+            + ["input_pollutant_code", "input_pollutant_description", "anals_yr"],
+            right_on=scc_cols + ["pollutant", "pol_desc", "anals_yr"],
+            how="left",
+        )
+        .assign(
+            pollutant=lambda df: df.output_pollutant_code.astype(str),
+            em_fac=lambda df: df.em_fac_input_pol * df.multiplication_factor,
+        )
+        .filter(items=["scc", "pollutant", "anals_yr", "em_fac"])
+    )
+
+
+def test_speciation_matrices_eq_speciation_merge(get_synthetic_emis_rt_paths):
+    speciation_2020_fil = emisrt.hap_speciation_mult(
+        get_synthetic_emis_rt_paths["path_hap_speciation_"]
+    )
+    speciation_mats_dict = emisrt.get_speciation_matrices(speciation_2020_fil)
+    speciation_rows = speciation_mats_dict["speciation_rows"]
+    assert len(speciation_rows) == len(speciation_2020_fil)
+    assert np.allclose(
+        [
+            speciation_mats_dict["speciation_mats"][scc][
+                hap_code,
+                speciation_mats_dict["parent_pollutants"].get_loc(input_pollutant_code),
+            ]
+            for scc, hap_code, input_pollutant_code in zip(
+                speciation_rows.scc,
+                speciation_rows.hap_code,
+                speciation_rows.input_pollutant_code,
+            )
+        ],
+        speciation_rows.multiplication_factor,
+    )
+
+    em_fac_res_dict = get_em_fac_res_dict(**get_synthetic_emis_rt_paths)
+    sort_cols = ["scc", "pollutant", "anals_yr"]
+    for pol_nm, voc_pm25_em_fac_list, speciation_df in [
+        (
+            "hap",
+            [em_fac_res_dict["pm25"], em_fac_res_dict["voc"]],
+            speciation_2020_fil,
+        ),
+        (
+            "pb",
+            [em_fac_res_dict["pm10"]],
+            emisrt.pb_speciation_builder(speciation_2020_fil),
+        ),
+    ]:
+        hap_fac_mat = (
+            em_fac_res_dict[pol_nm]
+            .assign(
+                pollutant=lambda df: df.pollutant.astype(str),
+                anals_yr=lambda df: df.anals_yr.astype(int),
+            )
+            .filter(items=sort_cols + ["em_fac"])
+            .sort_values(sort_cols)
+            .reset_index(drop=True)
+        )
+        hap_fac_merge = (
+            get_hap_fac_merge(voc_pm25_em_fac_list, speciation_df)
+            .sort_values(sort_cols)
+            .reset_index(drop=True)
+        )
+        assert hap_fac_mat.em_fac.notna().all()
+        pd.testing.assert_frame_equal(hap_fac_mat, hap_fac_merge, check_dtype=False)
@@ -0,0 +1,167 @@
+"""
+Tests fuelcsmp module on small synthetic inputs.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from locoei.fuelcsmp import (
+    read_natrail,
+    natrail_st_partitions_are_current,
+    explode_trk_right_oper,
+    get_milemix_alloc_matrix,
+    get_alloc_vals,
+)
+
+
+@pytest.fixture()
+def get_natrail_path(tmp_path):
+    path_natrail = tmp_path / "North_American_Rail_Lines.csv"
+    pd.DataFrame(
+        {
+            "FRAARCID": [1, 2, 3],
+            "STATEAB": ["TX", "TX", "OK"],
+            "NET": ["M", "Y", "M"],
+            "MILES": [1.0, 2.0, 3.0],
+        }
+    ).to_csv(path_natrail, index=False)
+    return str(path_natrail)
+
+
+def test_read_natrail_rewrites_stale_partitions(get_natrail_path, tmp_path):
+    path_st_partition_dir = str(tmp_path / "natrail_by_state")
+    natrail_tx = read_natrail(
+        get_natrail_path,
+        filter_st=("TX",),
+        path_st_partition_dir_=path_st_partition_dir,
+    )
+    assert natrail_tx.FRAARCID.tolist() == [1, 2]
+    assert natrail_st_partitions_are_current(get_natrail_path, path_st_partition_dir)
+    # Only the partition directory is left next to the national file.
+    assert sorted(os.listdir(tmp_path)) == [
+        "North_American_Rail_Lines.csv",
+        "natrail_by_state",
+    ]
+
+    pd.DataFrame(
+        {
+            "FRAARCID": [1, 2, 3, 4],
+            "STATEAB": ["TX", "TX", "OK", "TX"],
+            "NET": ["M", "Y", "M", "S"],
+            "MILES": [1.0, 2.0, 3.0, 4.0],
+        }
+    ).to_csv(get_natrail_path, index=False)
+    assert not natrail_st_partitions_are_current(
+        get_natrail_path, path_st_partition_dir
+    )
+    natrail_tx = read_natrail(
+        get_natrail_path,
+        filter_st=("TX",),
+        path_st_partition_dir_=path_st_partition_dir,
+    )
+    assert natrail_tx.FRAARCID.tolist() == [1, 2, 4]
+
+
+def test_read_natrail_no_rows_raises(get_natrail_path, tmp_path):
+    with pytest.raises(ValueError, match="No rail lines"):
+        read_natrail(
+            get_natrail_path,
+            filter_st=("NM",),
+            path_st_partition_dir_=str(tmp_path / "natrail_by_state"),
+        )
+    with pytest.raises(ValueError, match="No rail lines"):
+        read_natrail(get_natrail_path, filter_st=("OK",), filter_net=("Y",))
+
+
+def test_explode_trk_right_oper_eq_row_explode():
+    trk_right_cols = ("rrowner1", "rrowner2", "trkrghts1", "trkrghts2")
+    strail_2020 = pd.DataFrame(
+        {
+            "fraarcid": [11, 12, 13, 14, 15],
+            "miles": [1.0, 2.0, 3.0, 4.0, 5.0],
+            # Duplicate operators on a link, missing operators, and a link
+            # with no operator.
+            "rrowner1": ["UP", "BNSF", None, "UP", np.nan],
+            "rrowner2": ["UP", np.nan, "KCS", None, None],
+            "trkrghts1": ["AMTK", "UP", "KCS", "BNSF", np.nan],
+            "trkrghts2": [None, "BNSF", "TXGN", "AMTK", None],
+        },
+        index=[5, 3, 9, 1, 7],
+    )
+    # Per-row explode that explode_trk_right_oper replaced.
+    row_explode = (
+        strail_2020.assign(
+            all_oper=lambda df: df[list(trk_right_cols)].apply(set, axis=1)
+        )
+        .explode("all_oper")
+        .dropna(subset=["all_oper"])
+        .drop(columns=list(trk_right_cols))
+        .rename(columns={"all_oper": "carrier"})
+    )
+    vectorized_explode = explode_trk_right_oper(
+        strail_2020, trk_right_cols=trk_right_cols
+    )
+    # Operators of a link come out in column order instead of set order.
+    sort_cols = ["fraarcid", "carrier"]
+    pd.testing.assert_frame_equal(
+        vectorized_explode.sort_values(sort_cols),
+        row_explode.sort_values(sort_cols),
+    )
+    assert vectorized_explode.carrier.tolist() == [
+        "UP",
+        "AMTK",
+        "BNSF",
+        "UP",
+        "KCS",
+        "TXGN",
+        "UP",
+        "BNSF",
+        "AMTK",
+    ]
+    assert 15 not in vectorized_explode.fraarcid.tolist()
+
+
+def test_milemix_alloc_matrix_eq_merge_milemix():
+    links = pd.DataFrame(
+        {
+            "stcntyfips": [48001, 48001, 48001, 48003, 48003, 48005],
+            "carrier": ["UP", "UP", "BNSF", "UP", "UP", "KCS"],
+            "friylab": ["Fcat"] * 6,
+            "miles": [1.0, 3.0, 4.0, 2.0, 2.0, 5.0],
+        },
+        index=[10, 11, 12, 13, 14, 15],
+    )
+    # KCS in 48005 has no county fuel; 48007 has fuel but no links.
+    cnty_fuel = pd.DataFrame(
+        {
+            "stcntyfips": [48001, 48001, 48003, 48007],
+            "carrier": ["UP", "BNSF", "UP", "UP"],
+            "friylab": ["Fcat"] * 4,
+            "cnty_fuel_consmp": [80.0, 40.0, 10.0, 7.0],
+        }
+    )
+    milemx_alloc = get_milemix_alloc_matrix(
+        links_=links,
+        alloc_cols=["stcntyfips", "carrier", "friylab"],
+        milemix_cols=["stcntyfips", "friylab"],
+    )
+    alloc_vals = get_alloc_vals(alloc_keys_=milemx_alloc["alloc_keys"], vals_=cnty_fuel)
+    link_fuel_consmp = (
+        milemx_alloc["alloc_mat"] @ alloc_vals.cnty_fuel_consmp.to_numpy()
+    )
+    # Mile mix by group transform and fuel by merge, as before the matrix.
+    merge_milemix = (
+        links.assign(
+            totnetmiles=lambda df: df.groupby(
+                ["stcntyfips", "friylab"]
+            ).miles.transform("sum"),
+            milemx=lambda df: df.miles / df.totnetmiles,
+        )
+        .merge(cnty_fuel, on=["stcntyfips", "carrier", "friylab"], how="left")
+        .assign(link_fuel_consmp=lambda df: df.milemx * df.cnty_fuel_consmp)
+    )
+    assert milemx_alloc["alloc_mat"].shape == (6, 4)
+    assert np.allclose(milemx_alloc["totnetmiles"], merge_milemix.totnetmiles)
+    assert np.allclose(milemx_alloc["milemx"], merge_milemix.milemx)
+    assert np.allclose(link_fuel_consmp, merge_milemix.link_fuel_consmp, equal_nan=True)
+    assert np.isnan(link_fuel_consmp[-1])
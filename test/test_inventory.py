@@ -0,0 +1,57 @@
+"""
+Tests inventory module.
+"""
+import os
+import pandas as pd
+import pytest
+from locoei.utilis import read_artifact
+from locoei.inventory import INVENTORY_OUTPUT_FILES, write_inventory_outputs
+
+
+@pytest.fixture()
+def get_inventory():
+    return {
+        output_nm: pd.DataFrame({"year": [2019, 2020], "em_quant": [1.5, 2.5]})
+        for output_nm in INVENTORY_OUTPUT_FILES
+    }
+
+
+def test_write_requested_outputs_only(get_inventory, tmp_path):
+    path_out_dir = str(tmp_path / "inventory")
+    write_inventory_outputs(
+        inventory_=get_inventory,
+        path_out_dir_=path_out_dir,
+        outputs_to_write=("cntr_emis_quant", "uncntr_emis_quant"),
+    )
+    assert sorted(os.listdir(path_out_dir)) == [
+        "cntr_emis_quant.csv",
+        "uncntr_emis_quant.csv",
+    ]
+    pd.testing.assert_frame_equal(
+        pd.read_csv(os.path.join(path_out_dir, "cntr_emis_quant.csv"), index_col=0),
+        get_inventory["cntr_emis_quant"],
+    )
+
+
+def test_write_unknown_output_raises(get_inventory, tmp_path):
+    with pytest.raises(AssertionError):
+        write_inventory_outputs(
+            inventory_=get_inventory,
+            path_out_dir_=str(tmp_path),
+            outputs_to_write=("emis_quant_loco_agg",),
+        )
+
+
+def test_write_parquet_outputs(get_inventory, tmp_path):
+    path_out_dir = str(tmp_path / "inventory")
+    write_inventory_outputs(
+        inventory_=get_inventory,
+        path_out_dir_=path_out_dir,
+        outputs_to_write=("uncntr_cntr_emis_quant",),
+        output_format="parquet",
+    )
+    assert os.listdir(path_out_dir) == ["uncntr_cntr_emis_quant"]
+    pd.testing.assert_frame_equal(
+        read_artifact(os.path.join(path_out_dir, "uncntr_cntr_emis_quant")),
+        get_inventory["uncntr_cntr_emis_quant"],
+    )
@@ -0,0 +1,74 @@
+"""
+Tests multistate module.
+"""
+import os
+import pandas as pd
+import pytest
+from locoei.multistate import (
+    get_state_input_paths,
+    get_state_fips,
+    get_state_cls1_carriers,
+    run_multistate_inventory,
+)
+from benchmarks.synthetic import make_synthetic_inputs, write_multistate_inputs
+
+
+@pytest.fixture()
+def get_state_raw_dir(tmp_path):
+    path_st_raw = tmp_path / "states" / "OK"
+    path_st_raw.mkdir(parents=True)
+    pd.DataFrame(
+        {"CNTY_NM": ["Adair", "Alfalfa"], "FIPS_ST_CNTY_CD": [40001, 40003]}
+    ).to_csv(path_st_raw / "County_Boundaries.csv", index=False)
+    pd.DataFrame(
+        {
+            "RRCarrier": ["BNSF", "UP", "AOK"],
+            "LineHaul": [100.0, 50.0, 10.0],
+            "Yard": [10.0, 5.0, 1.0],
+        }
+    ).to_csv(path_st_raw / "RR_2019FuelUsage.csv", index=False)
+    pd.DataFrame(
+        {
+            "carrier": ["BNSF", "CSXT", "UP", "AOK"],
+            "rr_group": ["Class I", "Class I", "Class I", "Class III"],
+        }
+    ).to_csv(tmp_path / "rail_carrier_grp2020.csv")
+    return str(tmp_path)
+
+
+def test_state_inputs(get_state_raw_dir):
+    path_st_inputs = get_state_input_paths("OK", get_state_raw_dir)
+    assert path_st_inputs["path_county"] == os.path.join(
+        get_state_raw_dir, "states", "OK", "County_Boundaries.csv"
+    )
+    assert get_state_fips(path_st_inputs["path_county"]) == 40
+    assert get_state_cls1_carriers(
+        path_fueluserail2019_=path_st_inputs["path_fueluserail2019"],
+        path_rail_carrier_grp_=os.path.join(
+            get_state_raw_dir, "rail_carrier_grp2020.csv"
+        ),
+    ) == ("BNSF", "UP")
+
+
+def test_run_multistate_inventory(tmp_path):
+    synth_inputs = make_synthetic_inputs(
+        str(tmp_path), states=("TX", "OK"), links_per_county=1
+    )
+    write_multistate_inputs(synth_inputs)
+    multistate_kwargs = dict(
+        states=("TX", "OK"),
+        path_raw_=synth_inputs["path_raw"],
+        path_interim_=synth_inputs["path_interim"],
+        cls1_carriers_by_st={},
+    )
+    multistate_res = run_multistate_inventory(workers=2, **multistate_kwargs)
+    emis_quant_agg = multistate_res["emis_quant_agg"]
+    assert set(multistate_res["metrics"].stateab) == {"TX", "OK"}
+    assert set(emis_quant_agg.stateab) == {"TX", "OK"}
+    assert (
+        emis_quant_agg.loc[lambda df: df.stateab == "OK", "stcntyfips"] // 1000 == 40
+    ).all()
+    multistate_serial_res = run_multistate_inventory(workers=1, **multistate_kwargs)
+    pd.testing.assert_frame_equal(
+        multistate_serial_res["emis_quant_agg"], emis_quant_agg
+    )
@@ -0,0 +1,105 @@
+"""
+Tests pipeline module.
+"""
+import os
+import pytest
+from locoei.pipeline import Stage, get_stage_order, run_pipeline, hash_file
+
+
+def copy_upper(path_in_, path_out_):
+    with open(path_in_) as fi, open(path_out_, "w") as fo:
+        fo.write(fi.read().upper())
+
+
+def count_chars(path_in_, path_other_, sep, path_out_):
+    with open(path_in_) as fi, open(path_other_) as fi_other, open(
+        path_out_, "w"
+    ) as fo:
+        fo.write(f"{len(fi.read())}{sep}{len(fi_other.read())}")
+
+
+@pytest.fixture()
+def get_stages(tmp_path):
+    path_raw_a = tmp_path / "raw_a.txt"
+    path_raw_b = tmp_path / "raw_b.txt"
+    path_raw_a.write_text("narl")
+    path_raw_b.write_text("txled")
+    path_upper = str(tmp_path / "upper.txt")
+    stages = [
+        Stage(
+            name="count",
+            func=count_chars,
+            inputs={"path_in_": path_upper, "path_other_": str(path_raw_b)},
+            params={"sep": ","},
+            outputs={"path_out_": str(tmp_path / "count.txt")},
+        ),
+        Stage(
+            name="upper",
+            func=copy_upper,
+            inputs={"path_in_": str(path_raw_a)},
+            params={},
+            outputs={"path_out_": path_upper},
+        ),
+    ]
+    return {
+        "stages": stages,
+        "path_manifest": str(tmp_path / "manifest.json"),
+        "path_raw_a": path_raw_a,
+        "path_raw_b": path_raw_b,
+    }
+
+
+def test_stage_order(get_stages):
+    assert [stage.name for stage in get_stage_order(get_stages["stages"])] == [
+        "upper",
+        "count",
+    ]
+
+
+def test_circular_dependency_raises(tmp_path):
+    path_a = str(tmp_path / "a.txt")
+    path_b = str(tmp_path / "b.txt")
+    stages = [
+        Stage("a", copy_upper, {"path_in_": path_b}, {}, {"path_out_": path_a}),
+        Stage("b", copy_upper, {"path_in_": path_a}, {}, {"path_out_": path_b}),
+    ]
+    with pytest.raises(ValueError):
+        get_stage_order(stages)
+
+
+def test_unchanged_stages_are_skipped(get_stages):
+    first_run = run_pipeline(get_stages["stages"], get_stages["path_manifest"])
+    second_run = run_pipeline(get_stages["stages"], get_stages["path_manifest"])
+    assert first_run == {"upper": "ran", "count": "ran"}
+    assert second_run == {"upper": "skipped", "count": "skipped"}
+
+
+def test_only_downstream_of_changed_input_reruns(get_stages):
+    run_pipeline(get_stages["stages"], get_stages["path_manifest"])
+    get_stages["path_raw_b"].write_text("txled counties")
+    assert run_pipeline(get_stages["stages"], get_stages["path_manifest"]) == {
+        "upper": "skipped",
+        "count": "ran",
+    }
+
+
+def test_param_change_and_missing_output_rerun(get_stages):
+    stages = get_stages["stages"]
+    run_pipeline(stages, get_stages["path_manifest"])
+    os.remove(stages[1].outputs["path_out_"])
+    stages[0] = stages[0]._replace(params={"sep": ";"})
+    assert run_pipeline(stages, get_stages["path_manifest"]) == {
+        "upper": "ran",
+        "count": "ran",
+    }
+
+
+def test_hash_directory(tmp_path):
+    path_artifact = tmp_path / "emis_quant_loco_agg"
+    (path_artifact / "year=2020").mkdir(parents=True)
+    path_part = path_artifact / "year=2020" / "part-0.parquet"
+    path_part.write_text("nox")
+    dir_hash = hash_file(str(path_artifact))
+    assert hash_file(str(path_artifact)) == dir_hash
+    path_part.write_text("co")
+    assert hash_file(str(path_artifact)) != dir_hash
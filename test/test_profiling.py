@@ -0,0 +1,41 @@
+"""
+Tests profiling module.
+"""
+import json
+import pandas as pd
+from locoei.profiling import (
+    profile_run,
+    profile_block,
+    profile_stage,
+    write_profile_report,
+)
+
+
+@profile_stage
+def double_rows(df_):
+    with profile_block("concat", in_rows=len(df_)) as record:
+        df_double = pd.concat([df_, df_])
+        record["out_rows"] = len(df_double)
+    return df_double
+
+
+def test_profile_stage_off():
+    assert len(double_rows(pd.DataFrame({"a": [1, 2]}))) == 4
+
+
+def test_profile_run(tmp_path):
+    with profile_run() as profile_records:
+        double_rows(pd.DataFrame({"a": [1, 2, 3]}))
+    assert [
+        (record["stage"], record["depth"], record["in_rows"], record["out_rows"])
+        for record in profile_records
+    ] == [("double_rows", 0, 3, 6), ("concat", 1, 3, 6)]
+    assert all(record["wall_sec"] >= 0 for record in profile_records)
+    # Stages run after the with block are not recorded.
+    double_rows(pd.DataFrame({"a": [1]}))
+    assert len(profile_records) == 2
+    path_report = write_profile_report(profile_records, tmp_path)
+    with open(path_report["path_report_json"]) as fi:
+        assert json.load(fi)["stages"] == profile_records
+    with open(path_report["path_report_txt"]) as fi:
+        assert "  concat" in fi.read()
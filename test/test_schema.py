@@ -0,0 +1,41 @@
+"""
+Tests schema module.
+"""
+import pandas as pd
+import pytest
+from locoei.schema import cast_categoricals, FIXED_CATEGORIES
+
+
+def test_cast_categoricals_keeps_sort_and_merge():
+    fuel_consump = pd.DataFrame(
+        {
+            "carrier": ["UP", "BNSF", "KCS", "UP"],
+            "rr_group": ["Class I", "Class I", "Class I", "Class I"],
+            "friylab": ["IYcat", "Fcat", "Fcat", "Fcat"],
+            "miles": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+    fuel_consump_cat = cast_categoricals(fuel_consump)
+    assert list(fuel_consump_cat.rr_group.cat.categories) == (
+        FIXED_CATEGORIES["rr_group"]
+    )
+    assert list(fuel_consump_cat.carrier.cat.categories) == ["BNSF", "KCS", "UP"]
+    pd.testing.assert_frame_equal(
+        fuel_consump_cat.groupby(["carrier", "friylab"], observed=True)
+        .miles.sum()
+        .reset_index()
+        .astype({"carrier": object, "friylab": object}),
+        fuel_consump.groupby(["carrier", "friylab"]).miles.sum().reset_index(),
+    )
+    friylab_fac = cast_categoricals(
+        pd.DataFrame({"friylab": ["Fcat", "IYcat"], "fac": [1.0, 2.0]})
+    )
+    assert isinstance(
+        fuel_consump_cat.merge(friylab_fac, on="friylab").friylab.dtype,
+        pd.CategoricalDtype,
+    )
+
+
+def test_cast_categoricals_unknown_fixed_value():
+    with pytest.raises(AssertionError):
+        cast_categoricals(pd.DataFrame({"rr_group": ["Class I", "Class II"]}))
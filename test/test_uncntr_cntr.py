@@ -16,12 +16,10 @@ path_emisquant_agg = glob.glob(
     os.path.join(PATH_PROCESSED, "emis_quant_loco_agg_[0-9]*-*-*.csv")
 )[0]
 
-path_uncntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-)[0]
-
-path_cntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+# The uncontrolled and controlled emission quantities are sibling columns of
+# one csv.
+path_uncntr_cntr_emisquant = glob.glob(
+    os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
 )[0]
 
 path_txled_counties = os.path.join(PATH_RAW, "txled_counties.csv")
@@ -45,21 +43,16 @@ def get_emis_quant_agg():
 
 
 @pytest.fixture()
-def get_uncntr_emisquant():
-    return pd.read_csv(path_uncntr_emisquant, index_col=0)
-
-
-@pytest.fixture()
-def get_cntr_emisquant():
-    return pd.read_csv(path_cntr_emisquant, index_col=0)
+def get_uncntr_cntr_emisquant():
+    return pd.read_csv(path_uncntr_cntr_emisquant, index_col=0)
 
 
 def test_controlled_emis_quant(
-    get_emis_quant_agg, get_cntr_emisquant, get_txled_counties
+    get_emis_quant_agg, get_uncntr_cntr_emisquant, get_txled_counties
 ):
     us_ton_to_grams = 907185
     test_emisquant = get_emis_quant_agg.merge(
-        get_cntr_emisquant,
+        get_uncntr_cntr_emisquant,
         on=[
             "year",
             "stcntyfips",
@@ -101,13 +94,13 @@ def test_controlled_emis_quant(
 @pytest.mark.parametrize("analysis_year_deri_benefits", [27206.2667])
 def test_uncontrolled_emis_quant(
     get_emis_quant_agg,
-    get_uncntr_emisquant,
+    get_uncntr_cntr_emisquant,
     get_txled_counties,
     analysis_year_deri_benefits,
 ):
     us_ton_to_grams = 907185
     test_emisquant = get_emis_quant_agg.merge(
-        get_uncntr_emisquant,
+        get_uncntr_cntr_emisquant,
         on=[
             "year",
             "stcntyfips",
@@ -7,10 +7,7 @@ from lxml import etree as lxml_etree
 import glob
 import pandas as pd
 from locoerlt.utilis import PATH_RAW, PATH_INTERIM, PATH_PROCESSED, get_snake_case_dict
-from locoerlt.uncntr_cntr_cersxml import (
-    clean_up_cntr_emisquant,
-    clean_up_uncntr_emisquant,
-)
+from locoerlt.uncntr_cntr_cersxml import clean_up_uncntr_cntr_emisquant
 
 path_erg_cntr = os.path.join(PATH_RAW, "ERG", "rail2020-controlled-v2.xml")
 path_erg_uncntr = os.path.join(PATH_RAW, "ERG", "rail2020-Uncontrolled.xml")
@@ -28,11 +25,10 @@ path_out_cntr = os.path.join(
 )
 
 
-path_uncntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-)[0]
-path_cntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+# The uncontrolled and controlled emission quantities are sibling columns of
+# one csv.
+path_uncntr_cntr_emisquant = glob.glob(
+    os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
 )[0]
 path_erg_tti_comp = os.path.join(PATH_PROCESSED, "tti_erg_statewide_comp.xlsx")
 
@@ -139,7 +135,14 @@ def get_annual_o3d_emissions_df_from_xml(
     return {"annual_df": annual_df, "o3d_df": o3d_df}
 
 
-def test_cntr_input_output_data_equal():
+@pytest.fixture(scope="module")
+def get_uncntr_cntr_emisquant_2020():
+    return clean_up_uncntr_cntr_emisquant(
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant
+    )
+
+
+def test_cntr_input_output_data_equal(get_uncntr_cntr_emisquant_2020):
     cntr_tree = ET.parse(path_out_cntr)
     annual_o3d_dict = get_annual_o3d_emissions_df_from_xml(
         templ_tree=cntr_tree,
@@ -149,9 +152,7 @@ def test_cntr_input_output_data_equal():
     )
     annual_df = annual_o3d_dict["annual_df"]
     o3d_df = annual_o3d_dict["o3d_df"]
-    cntr_emisquant_2020_fil_scc = clean_up_cntr_emisquant(
-        path_cntr_emisquant_=path_cntr_emisquant
-    )["raw_data"]
+    cntr_emisquant_2020_fil_scc = get_uncntr_cntr_emisquant_2020["cntr"]["raw_data"]
 
     test_data_annual = pd.merge(
         cntr_emisquant_2020_fil_scc,
@@ -177,7 +178,7 @@ def test_cntr_input_output_data_equal():
     ), "Input not equal to output. Check the xml creation."
 
 
-def test_uncntr_input_output_data_equal():
+def test_uncntr_input_output_data_equal(get_uncntr_cntr_emisquant_2020):
     uncntr_tree = ET.parse(path_out_uncntr)
     annual_o3d_dict = get_annual_o3d_emissions_df_from_xml(
         templ_tree=uncntr_tree,
@@ -187,9 +188,7 @@ def test_uncntr_input_output_data_equal():
     )
     annual_df = annual_o3d_dict["annual_df"]
     o3d_df = annual_o3d_dict["o3d_df"]
-    uncntr_emisquant_2020_fil_scc = clean_up_uncntr_emisquant(
-        path_uncntr_emisquant_=path_uncntr_emisquant
-    )["raw_data"]
+    uncntr_emisquant_2020_fil_scc = get_uncntr_cntr_emisquant_2020["uncntr"]["raw_data"]
 
     test_data_annual = pd.merge(
         uncntr_emisquant_2020_fil_scc,
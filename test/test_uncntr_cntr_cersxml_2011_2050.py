@@ -7,10 +7,7 @@ from lxml import etree as lxml_etree
 import glob
 import pandas as pd
 from locoerlt.utilis import PATH_RAW, PATH_INTERIM, PATH_PROCESSED, get_snake_case_dict
-from locoerlt.uncntr_cntr_cersxml_2011_2050 import (
-    clean_up_cntr_emisquant,
-    clean_up_uncntr_emisquant,
-)
+from locoerlt.uncntr_cntr_cersxml_2011_2050 import get_emisquant_yr_partitions
 
 path_out_uncntr = os.path.join(
     r"C:\Users\a-bibeka\PycharmProjects\Loco-ERLT\data" r"\processed\TexAER_XMLs"
@@ -18,11 +15,10 @@ path_out_uncntr = os.path.join(
 path_out_cntr = os.path.join(
     r"C:\Users\a-bibeka\PycharmProjects\Loco-ERLT\data" r"\processed\TexAER_XMLs"
 )
-path_uncntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-)[0]
-path_cntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+# The uncontrolled and controlled emission quantities are sibling columns of
+# one csv.
+path_uncntr_cntr_emisquant = glob.glob(
+    os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
 )[0]
 path_erg_tti_comp = os.path.join(PATH_PROCESSED, "tti_erg_statewide_comp.xlsx")
 
@@ -129,8 +125,16 @@ def get_annual_o3d_emissions_df_from_xml(
     return {"annual_df": annual_df, "o3d_df": o3d_df}
 
 
+@pytest.fixture(scope="module")
+def get_emisquant_yr_dicts():
+    return get_emisquant_yr_partitions(
+        path_uncntr_cntr_emisquant_=path_uncntr_cntr_emisquant,
+        years=list(range(2011, 2051)),
+    )
+
+
 @pytest.mark.parametrize("year", range(2011, 2051), ids=range(2011, 2051))
-def test_cntr_input_output_data_equal(year):
+def test_cntr_input_output_data_equal(year, get_emisquant_yr_dicts):
     path_out_cntr_fi = os.path.join(path_out_cntr, f"cntr_{year}_TexAER.xml")
     cntr_tree = ET.parse(path_out_cntr_fi)
     annual_o3d_dict = get_annual_o3d_emissions_df_from_xml(
@@ -141,9 +145,7 @@ def test_cntr_input_output_data_equal(year):
     )
     annual_df = annual_o3d_dict["annual_df"]
     o3d_df = annual_o3d_dict["o3d_df"]
-    cntr_emisquant_yr_fil_scc = clean_up_cntr_emisquant(
-        path_cntr_emisquant_=path_cntr_emisquant, year_=year
-    )["raw_data"]
+    cntr_emisquant_yr_fil_scc = get_emisquant_yr_dicts["cntr"][year]["raw_data"]
 
     test_data_annual = pd.merge(
         cntr_emisquant_yr_fil_scc,
@@ -170,7 +172,7 @@ def test_cntr_input_output_data_equal(year):
 
 
 @pytest.mark.parametrize("year", range(2011, 2051), ids=range(2011, 2051))
-def test_uncntr_input_output_data_equal(year):
+def test_uncntr_input_output_data_equal(year, get_emisquant_yr_dicts):
     path_out_uncntr_fi = os.path.join(path_out_uncntr, f"uncntr_{year}_TexAER.xml")
     uncntr_tree = ET.parse(path_out_uncntr_fi)
     annual_o3d_dict = get_annual_o3d_emissions_df_from_xml(
@@ -181,9 +183,7 @@ def test_uncntr_input_output_data_equal(year):
     )
     annual_df = annual_o3d_dict["annual_df"]
     o3d_df = annual_o3d_dict["o3d_df"]
-    uncntr_emisquant_yr_fil_scc = clean_up_uncntr_emisquant(
-        path_uncntr_emisquant_=path_uncntr_emisquant, year_=year
-    )["raw_data"]
+    uncntr_emisquant_yr_fil_scc = get_emisquant_yr_dicts["uncntr"][year]["raw_data"]
 
     test_data_annual = pd.merge(
         uncntr_emisquant_yr_fil_scc,
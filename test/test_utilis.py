@@ -0,0 +1,157 @@
+"""
+Tests utilis module.
+"""
+import os
+import pandas as pd
+from locoei.utilis import (
+    EXCEL_CACHE_DIR_ENV,
+    read_excel_cached,
+    get_excel_cache_stats,
+    reset_excel_cache_stats,
+    get_county_fips_index,
+    resolve_county_fips,
+    expand_intervals,
+    get_interval_year_matrix,
+    write_artifact,
+    read_artifact,
+)
+
+
+def test_read_excel_cached(tmp_path):
+    path_excel = tmp_path / "proj_fac.xlsx"
+    path_cache_dir = tmp_path / "excel_cache"
+    proj_fac = pd.DataFrame({"Year": [2019, 2020], "Freight": [1.0, 1.05]})
+    proj_fac.to_excel(path_excel, sheet_name="Recommended_Proj", index=False)
+    reset_excel_cache_stats()
+    excel_dfs = [
+        read_excel_cached(
+            path_excel, "Recommended_Proj", path_cache_dir_=path_cache_dir
+        )
+        for _ in range(2)
+    ]
+    assert get_excel_cache_stats() == {"hits": 1, "misses": 1}
+    for excel_df in excel_dfs:
+        pd.testing.assert_frame_equal(excel_df, proj_fac)
+    # Different read options are cached separately.
+    excel_df_year = read_excel_cached(
+        path_excel, "Recommended_Proj", path_cache_dir_=path_cache_dir, usecols=["Year"]
+    )
+    assert get_excel_cache_stats() == {"hits": 1, "misses": 2}
+    pd.testing.assert_frame_equal(excel_df_year, proj_fac[["Year"]])
+
+
+def test_read_excel_cached_default_dir(tmp_path, monkeypatch):
+    path_excel = tmp_path / "proj_fac.xlsx"
+    pd.DataFrame({"Year": [2019, 2020]}).to_excel(path_excel, index=False)
+    # The default cache directory is resolved when reading.
+    monkeypatch.setenv(EXCEL_CACHE_DIR_ENV, str(tmp_path / "excel_cache"))
+    read_excel_cached(path_excel)
+    assert len(os.listdir(tmp_path / "excel_cache")) == 1
+    monkeypatch.setenv(EXCEL_CACHE_DIR_ENV, "")
+    reset_excel_cache_stats()
+    read_excel_cached(path_excel)
+    assert get_excel_cache_stats() == {"hits": 0, "misses": 0}
+
+
+def test_resolve_county_fips(tmp_path):
+    path_county = tmp_path / "Texas_County_Boundaries.csv"
+    pd.DataFrame(
+        {
+            "CNTY_NM": ["Harris", "El Paso", "Dallas"],
+            "FIPS_ST_CNTY_CD": [48201, 48141, 48113],
+        }
+    ).to_csv(path_county, index=False)
+    county_fips_res = resolve_county_fips(
+        pd.Series([" harris", "EL PASO ", "Gotham"]),
+        get_county_fips_index(path_county),
+    )
+    assert county_fips_res["stcntyfips"].tolist()[:2] == [48201, 48141]
+    assert county_fips_res["stcntyfips"].isna().tolist() == [False, False, True]
+    assert county_fips_res["unresolved"] == ["Gotham"]
+
+
+def test_expand_intervals():
+    starts, ends = [2011, 2015, 2020, 2013], [2014, 2015, 2022, 2014]
+    interval_rows = expand_intervals(starts, ends)
+    exploded = (
+        pd.Series([range(st, end) for st, end in zip(starts, ends)])
+        .explode()
+        .dropna()
+    )
+    assert interval_rows["row_idx"].tolist() == exploded.index.tolist()
+    assert interval_rows["value"].tolist() == exploded.tolist()
+
+
+def test_get_interval_year_matrix():
+    grants = pd.DataFrame(
+        {
+            "region": ["Austin", "Austin", "Houston"],
+            "year": [2010, 2012, 2011],
+            "end_year": [2013, 2014, 2012],
+            "nox_red": [1.0, 2.0, 4.0],
+        }
+    )
+    grant_matrix = get_interval_year_matrix(
+        grants, "region", "nox_red", years=[2011, 2012, 2013, 2014]
+    )
+    assert grant_matrix.loc["Austin"].tolist() == [1.0, 3.0, 2.0, 0.0]
+    assert grant_matrix.loc["Houston"].tolist() == [4.0, 0.0, 0.0, 0.0]
+
+
+def test_artifact_projection_and_pruning(tmp_path):
+    path_artifact = str(tmp_path / "uncntr_cntr_emis_quant")
+    emis_quant = pd.DataFrame(
+        {
+            "year": [2020, 2020, 2021, 2021],
+            "pollutant": pd.Categorical(["NOX", "PM25-PRI", "NOX", "CO"]),
+            "stcntyfips": [48001, 48003, 48001, 48005],
+            "yardname_v1": [-99, "Tower 55", -99, None],
+            "em_quant_ton": [1.5, 0.25, 3.0, 0.125],
+        }
+    )
+    write_artifact(emis_quant, path_artifact)
+    assert sorted(os.listdir(os.path.join(path_artifact, "year=2020"))) == [
+        "pollutant=NOX",
+        "pollutant=PM25-PRI",
+    ]
+    emis_quant_read = read_artifact(path_artifact)
+    assert emis_quant_read.pollutant.dtype == "category"
+    assert emis_quant_read.yardname_v1.tolist()[:2] == ["-99", "Tower 55"]
+    # The 2021 partitions are not read when filtering to 2020.
+    for dir_path, _, file_nms in os.walk(os.path.join(path_artifact, "year=2021")):
+        for file_nm in file_nms:
+            with open(os.path.join(dir_path, file_nm), "wb") as fo:
+                fo.write(b"not parquet")
+    emis_quant_2020 = read_artifact(
+        path_artifact, columns=["stcntyfips", "em_quant_ton"], filters={"year": 2020}
+    )
+    pd.testing.assert_frame_equal(
+        emis_quant_2020,
+        emis_quant.loc[lambda df: df.year == 2020, ["stcntyfips", "em_quant_ton"]],
+    )
+
+
+def test_artifact_keeps_unused_categories(tmp_path):
+    path_artifact = str(tmp_path / "emis_quant")
+    emis_quant = pd.DataFrame(
+        {
+            "year": [2020, 2020, 2021],
+            "pollutant": pd.Categorical(
+                ["CO", "NOX", "PM"], categories=["CO", "NOX", "PM", "VOC"]
+            ),
+            "pol_type": pd.Categorical(
+                ["CAP", "CAP", "CAP"], categories=["HAP", "CAP"], ordered=True
+            ),
+            "em_quant_ton": [1.5, 0.25, 3.0],
+        }
+    )
+    write_artifact(emis_quant, path_artifact)
+    pd.testing.assert_frame_equal(read_artifact(path_artifact), emis_quant)
+    emis_quant_2021 = read_artifact(path_artifact, filters={"year": 2021})
+    assert emis_quant_2021.pollutant.cat.categories.tolist() == [
+        "CO",
+        "NOX",
+        "PM",
+        "VOC",
+    ]
+    assert emis_quant_2021.pol_type.dtype == emis_quant.pol_type.dtype
@@ -7,11 +7,10 @@ import glob
 import pandas as pd
 from locoerlt.utilis import PATH_PROCESSED
 
-path_uncntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "uncntr_emis_quant_[0-9]*-*-*.csv")
-)[0]
-path_cntr_emisquant = glob.glob(
-    os.path.join(PATH_PROCESSED, "cntr_emis_quant_[0-9]*-*-*.csv")
+# The uncontrolled and controlled emission quantities are sibling columns of
+# one csv.
+path_uncntr_cntr_emisquant = glob.glob(
+    os.path.join(PATH_PROCESSED, "uncntr_cntr_emis_quant_[0-9]*-*-*.csv")
 )[0]
 path_uncntr_yard_xml = os.path.join(
     PATH_PROCESSED, "eis_stagging_tables", "yard_bridgetool_uncntr.xml"
@@ -111,7 +110,16 @@ def get_annual_o3d_emissions_df_from_xml(
     return {"annual_df": annual_df, "o3d_df": o3d_df}
 
 
-def test_uncntr_input_output_data_equal():
+@pytest.fixture(scope="module")
+def get_uncntr_cntr_emisquant_yard_2020():
+    uncntr_cntr_emisquant = pd.read_csv(path_uncntr_cntr_emisquant)
+    return uncntr_cntr_emisquant.loc[
+        lambda df: (df.scc_description_level_4 == "Yard Locomotives")
+        & (df.year == 2020)
+    ].rename(columns={"eis_facility_id": "eis_fac_id"})
+
+
+def test_uncntr_input_output_data_equal(get_uncntr_cntr_emisquant_yard_2020):
     uncntr_tree = ET.parse(path_uncntr_yard_xml)
     annual_o3d_dict = get_annual_o3d_emissions_df_from_xml(
         templ_tree=uncntr_tree,
@@ -120,26 +128,16 @@ def test_uncntr_input_output_data_equal():
     )
     annual_df = annual_o3d_dict["annual_df"]
     o3d_df = annual_o3d_dict["o3d_df"]
-    uncntr_emisquant = pd.read_csv(path_uncntr_emisquant)
-    uncntr_emisquant_yard_2020 = (
-        uncntr_emisquant.loc[
-            lambda df: (df.scc_description_level_4 == "Yard Locomotives")
-            & (df.year == 2020)
+    uncntr_emisquant_yard_2020 = get_uncntr_cntr_emisquant_yard_2020.assign(
+        uncontrolled_em_quant_ton_daily=lambda df: df.uncontrolled_em_quant_ton / 365
+    ).filter(
+        items=[
+            "stcntyfips",
+            "eis_fac_id",
+            "pollutant",
+            "uncontrolled_em_quant_ton",
+            "uncontrolled_em_quant_ton_daily",
         ]
-        .rename(columns={"eis_facility_id": "eis_fac_id"})
-        .assign(
-            uncontrolled_em_quant_ton_daily=lambda df: df.uncontrolled_em_quant_ton
-            / 365
-        )
-        .filter(
-            items=[
-                "stcntyfips",
-                "eis_fac_id",
-                "pollutant",
-                "uncontrolled_em_quant_ton",
-                "uncontrolled_em_quant_ton_daily",
-            ]
-        )
     )
 
     test_data_annual = pd.merge(
@@ -165,7 +163,7 @@ def test_uncntr_input_output_data_equal():
     ), "Input not equal to output. Check the xml creation."
 
 
-def test_cntr_input_output_data_equal():
+def test_cntr_input_output_data_equal(get_uncntr_cntr_emisquant_yard_2020):
     cntr_tree = ET.parse(path_cntr_yard_xml)
     annual_o3d_dict = get_annual_o3d_emissions_df_from_xml(
         templ_tree=cntr_tree,
@@ -174,25 +172,16 @@ def test_cntr_input_output_data_equal():
     )
     annual_df = annual_o3d_dict["annual_df"]
     o3d_df = annual_o3d_dict["o3d_df"]
-    cntr_emisquant = pd.read_csv(path_cntr_emisquant)
-    cntr_emisquant_yard_2020 = (
-        cntr_emisquant.loc[
-            lambda df: (df.scc_description_level_4 == "Yard Locomotives")
-            & (df.year == 2020)
+    cntr_emisquant_yard_2020 = get_uncntr_cntr_emisquant_yard_2020.assign(
+        controlled_em_quant_ton_daily=lambda df: df.controlled_em_quant_ton / 365
+    ).filter(
+        items=[
+            "stcntyfips",
+            "eis_fac_id",
+            "pollutant",
+            "controlled_em_quant_ton",
+            "controlled_em_quant_ton_daily",
         ]
-        .rename(columns={"eis_facility_id": "eis_fac_id"})
-        .assign(
-            controlled_em_quant_ton_daily=lambda df: df.controlled_em_quant_ton / 365
-        )
-        .filter(
-            items=[
-                "stcntyfips",
-                "eis_fac_id",
-                "pollutant",
-                "controlled_em_quant_ton",
-                "controlled_em_quant_ton_daily",
-            ]
-        )
     )
 
     test_data_annual = pd.merge(